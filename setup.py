@@ -53,6 +53,9 @@ setup(
             "aiohttp",
             "azure-storage-blob",
         ],
+        "orjson": [
+            "orjson",
+        ],
     },
     install_requires=[
         "alembic",
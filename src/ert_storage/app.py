@@ -1,44 +1,18 @@
-import json
 from enum import Enum
 from typing import Any
 from fastapi import FastAPI, Request, status
-from fastapi.responses import Response, RedirectResponse
+from fastapi.responses import RedirectResponse, Response
 
 from ert_storage.endpoints import router as endpoints_router
 from ert_storage.exceptions import ErtStorageError
+from ert_storage.ext.json_codec import JSONResponse
+from ert_storage.loop_monitor import LoopMonitorMiddleware
+from ert_storage.metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware
+from ert_storage.profiling import ProfilingMiddleware
 
 from sqlalchemy.orm.exc import NoResultFound
 
 
-class JSONEncoder(json.JSONEncoder):
-    """
-    Custom JSON encoder with support for Python 3.4 enums
-    """
-
-    def default(self, obj: Any) -> Any:
-        if isinstance(obj, Enum):
-            return obj.name
-        return super().default(obj)
-
-
-class JSONResponse(Response):
-    """A replacement for Starlette's JSONResponse that permits NaNs."""
-
-    media_type = "application/json"
-
-    def render(self, content: Any) -> bytes:
-        return (
-            JSONEncoder(
-                ensure_ascii=False,
-                allow_nan=True,
-                indent=None,
-                separators=(",", ":"),
-            )
-            .encode(content)
-            .encode("utf-8")
-        )
-
-
 app = FastAPI(
     title="ERT Storage API",
     version="0.1.2",
@@ -61,6 +35,22 @@ async def initialize_database() -> None:
         await create_container_if_not_exist()
 
 
+@app.on_event("startup")
+async def monitor_event_loop() -> None:
+    from ert_storage.loop_monitor import start_loop_monitor
+
+    start_loop_monitor()
+
+
+@app.on_event("shutdown")
+async def shutdown_workers() -> None:
+    from ert_storage.loop_monitor import stop_loop_monitor
+    from ert_storage.workers import shutdown_worker_pool
+
+    stop_loop_monitor()
+    shutdown_worker_pool()
+
+
 @app.exception_handler(NoResultFound)
 async def sqlalchemy_exception_handler(
     request: Request, exc: NoResultFound
@@ -82,7 +72,11 @@ async def ert_storage_error_handler(
             "detail": {
                 **request.query_params,
                 **request.path_params,
-                **exc.args[1],
+                **{
+                    # Enums are written by name, which orjson doesn't support
+                    key: value.name if isinstance(value, Enum) else value
+                    for key, value in exc.args[1].items()
+                },
                 "error": exc.args[0],
             }
         },
@@ -100,4 +94,15 @@ async def healthcheck() -> str:
     return "ALL OK!"
 
 
+@app.get("/metrics", response_class=Response)
+async def metrics() -> Response:
+    """
+    Metrics of this process in the Prometheus text format
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 app.include_router(endpoints_router)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(LoopMonitorMiddleware)
+app.add_middleware(MetricsMiddleware)
@@ -1 +1,4 @@
 from .misfits import calculate_misfits_from_pandas
+from .statistics import RunningStatistics, calculate_statistics
+from .correlations import calculate_top_correlations
+from .downsampling import downsample
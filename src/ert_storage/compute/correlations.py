@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+from typing import Tuple
+
+
+CORRELATION_METHODS = ("pearson", "spearman")
+
+
+def _standardize(matrix: np.ndarray) -> np.ndarray:
+    """
+    Center the columns of `matrix` and scale them to unit norm, so that the
+    Pearson correlation of two columns is their dot product. Constant columns
+    become NaN.
+    """
+    centered = matrix - matrix.mean(axis=0)
+    norm = np.sqrt((centered**2).sum(axis=0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return centered / np.where(norm == 0.0, np.nan, norm)
+
+
+def _rank(matrix: np.ndarray) -> np.ndarray:
+    return pd.DataFrame(matrix).rank(axis=0, method="average").values
+
+
+def calculate_top_correlations(
+    parameters: np.ndarray,
+    responses: np.ndarray,
+    top_k: int,
+    method: str = "pearson",
+    chunk_size: int = 1024,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Correlate every column of `parameters` with every column of `responses`,
+    where the rows of both are the realizations, and return the `top_k`
+    strongest correlations (by absolute value) for each response column.
+
+    The correlations are computed as matrix products over chunks of
+    `chunk_size` response columns, so that the full parameter-response
+    correlation matrix is never held in memory.
+
+    Returns a tuple of (parameter column indices, correlations), each of shape
+    (number of response columns, k) where k is at most `top_k`.
+    """
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"Unknown correlation method '{method}'")
+    if top_k < 1 or parameters.shape[1] == 0:
+        raise ValueError("There must be at least one parameter to correlate with")
+    if parameters.shape[0] != responses.shape[0]:
+        raise ValueError("Parameters and responses must have the same number of rows")
+
+    parameters = np.asarray(parameters, dtype=np.float64)
+    responses = np.asarray(responses, dtype=np.float64)
+    if method == "spearman":
+        parameters = _rank(parameters)
+
+    k = min(top_k, parameters.shape[1])
+    x = _standardize(parameters)
+
+    indices = np.empty((responses.shape[1], k), dtype=np.int64)
+    values = np.empty((responses.shape[1], k), dtype=np.float64)
+    for start in range(0, responses.shape[1], chunk_size):
+        chunk = responses[:, start : start + chunk_size]
+        if method == "spearman":
+            chunk = _rank(chunk)
+        corr = x.T @ _standardize(chunk)
+
+        # Sort by descending absolute correlation, with NaNs last
+        strength = np.nan_to_num(np.abs(corr), nan=-1.0)
+        top = np.argpartition(-strength, k - 1, axis=0)[:k]
+        order = np.argsort(-np.take_along_axis(strength, top, axis=0), axis=0)
+        top = np.take_along_axis(top, order, axis=0)
+
+        stop = start + chunk.shape[1]
+        indices[start:stop] = top.T
+        values[start:stop] = np.take_along_axis(corr, top, axis=0).T
+    return indices, values
@@ -0,0 +1,99 @@
+import warnings
+import numpy as np
+from typing import List
+
+
+DOWNSAMPLING_METHODS = ("lttb", "minmax")
+
+
+def _buckets(n: int, count: int) -> List[np.ndarray]:
+    """
+    Split the points 1..n-2 into `count` buckets of (almost) equal size. The
+    first and last points are always kept.
+    """
+    return [b for b in np.array_split(np.arange(1, n - 1), count) if len(b)]
+
+
+def _lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    n = len(x)
+    buckets = _buckets(n, max_points - 2)
+    selected = np.empty(len(buckets) + 2, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i, bucket in enumerate(buckets):
+        # The next point is the average of the next bucket, or the last point
+        if i + 1 < len(buckets):
+            following = buckets[i + 1]
+            x_c = x[following].mean()
+            y_c = np.nanmean(y[:, following], axis=1, keepdims=True)
+        else:
+            x_c = x[-1]
+            y_c = y[:, -1:]
+        x_a, y_a = x[a], y[:, a : a + 1]
+
+        # Twice the area of the triangle of each candidate, summed over
+        # realizations so that all of them share the selected points
+        areas = np.abs(
+            (x_a - x_c) * (y[:, bucket] - y_a) - (x_a - x[bucket]) * (y_c - y_a)
+        )
+        valid = ~np.all(np.isnan(areas), axis=0)
+        best = bucket[np.argmax(np.where(valid, np.nansum(areas, axis=0), -1.0))]
+        selected[i + 1] = best
+        if valid.any():
+            # Points without any values are kept, but are not used as the
+            # first corner of the next triangle
+            a = best
+    return selected
+
+
+def _minmax(y: np.ndarray, max_points: int) -> np.ndarray:
+    n = y.shape[1]
+    lower = np.nan_to_num(np.nanmin(y, axis=0), nan=np.inf)
+    upper = np.nan_to_num(np.nanmax(y, axis=0), nan=-np.inf)
+    selected = [0, n - 1]
+    if max_points - 2 < 2 and n > 2:
+        # There is only room for one point, so keep the most extreme one
+        center = np.nanmean(y)
+        deviation = np.maximum(upper - center, center - lower)
+        selected.append(1 + int(np.argmax(deviation[1:-1])))
+        return np.unique(selected)
+    for bucket in _buckets(n, (max_points - 2) // 2):
+        selected.append(bucket[np.argmin(lower[bucket])])
+        selected.append(bucket[np.argmax(upper[bucket])])
+    return np.unique(selected)
+
+
+def downsample(
+    x: np.ndarray, y: np.ndarray, max_points: int, method: str = "lttb"
+) -> np.ndarray:
+    """
+    Select at most `max_points` of the columns of `y`, where the rows are
+    realizations and the columns are points along the x-axis `x`, such that
+    plotting the selected points looks like plotting all of them.
+
+    All realizations share the selected columns. With "lttb"
+    (largest-triangle-three-buckets), the point of each bucket that forms the
+    largest triangle with its neighbours, summed over the realizations, is
+    selected. With "minmax", the points with the lowest and highest value of
+    any realization in each bucket are selected.
+
+    Returns the indices of the selected columns in ascending order.
+    """
+    if method not in DOWNSAMPLING_METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}'")
+    if max_points < 3:
+        raise ValueError("At least 3 points are needed to downsample")
+    x = np.asarray(x, dtype=np.float64)
+    y = np.atleast_2d(np.asarray(y, dtype=np.float64))
+    if x.shape != y.shape[1:]:
+        raise ValueError("The x-axis must have the same length as the rows of y")
+
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+    with warnings.catch_warnings():
+        # Columns where every realization is NaN are never selected
+        warnings.simplefilter("ignore", RuntimeWarning)
+        if method == "minmax":
+            return _minmax(y, max_points)
+        return _lttb(x, y, max_points)
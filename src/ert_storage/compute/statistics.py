@@ -0,0 +1,137 @@
+import warnings
+import numpy as np
+import pandas as pd
+from typing import Iterable, List, Optional, Sequence
+
+
+class RunningStatistics:
+    """
+    Column-wise count, mean, M2, min and max of a stream of row chunks. NaNs
+    are treated as missing values and do not contribute to any statistic.
+
+    Chunks are merged using the parallel variant of Welford's algorithm (Chan
+    et al.), so the state is O(columns) no matter how many rows are seen.
+    """
+
+    def __init__(self, columns: int) -> None:
+        self.count = np.zeros(columns, dtype=np.int64)
+        self.mean = np.zeros(columns, dtype=np.float64)
+        self.m2 = np.zeros(columns, dtype=np.float64)
+        self.min = np.full(columns, np.nan, dtype=np.float64)
+        self.max = np.full(columns, np.nan, dtype=np.float64)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        count: Sequence[int],
+        mean: Sequence[float],
+        m2: Sequence[float],
+        min: Sequence[float],
+        max: Sequence[float],
+    ) -> "RunningStatistics":
+        running = cls(len(count))
+        running.count = np.array(count, dtype=np.int64)
+        running.mean = np.array(mean, dtype=np.float64)
+        running.m2 = np.array(m2, dtype=np.float64)
+        running.min = np.array(min, dtype=np.float64)
+        running.max = np.array(max, dtype=np.float64)
+        return running
+
+    @property
+    def columns(self) -> int:
+        return self.count.shape[0]
+
+    def update(self, chunk: np.ndarray) -> None:
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if chunk.ndim == 1:
+            chunk = chunk[np.newaxis, :]
+        if chunk.ndim != 2 or chunk.shape[1] != self.columns:
+            raise ValueError(
+                f"Expected chunk with {self.columns} columns, got shape {chunk.shape}"
+            )
+
+        finite = ~np.isnan(chunk)
+        count_b = finite.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_b = np.where(finite, chunk, 0.0).sum(axis=0) / count_b
+            m2_b = np.where(finite, (chunk - mean_b) ** 2, 0.0).sum(axis=0)
+
+        seen = count_b > 0
+        count = self.count + count_b
+        delta = np.where(seen, mean_b - self.mean, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(seen, count_b / count, 0.0)
+            self.m2 = self.m2 + np.where(
+                seen, m2_b + delta**2 * self.count * weight, 0.0
+            )
+        self.mean = self.mean + delta * weight
+        self.count = count
+        self.min = np.fmin(self.min, np.nanmin(chunk, axis=0, initial=np.inf))
+        self.max = np.fmax(self.max, np.nanmax(chunk, axis=0, initial=-np.inf))
+        self.min[self.count == 0] = np.nan
+        self.max[self.count == 0] = np.nan
+
+    def std(self, ddof: int = 1) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(
+                self.count > ddof, np.sqrt(self.m2 / (self.count - ddof)), np.nan
+            )
+
+    def to_frame(self, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        mean = np.where(self.count > 0, self.mean, np.nan)
+        return pd.DataFrame(
+            [mean, self.std(), self.min, self.max],
+            index=["mean", "std", "min", "max"],
+            columns=columns,
+        )
+
+
+def quantile_label(quantile: float) -> str:
+    """
+    Name of a quantile in the returned statistics, eg. 0.1 -> p10
+    """
+    return f"p{quantile * 100:g}"
+
+
+def calculate_statistics(
+    chunks: Iterable[np.ndarray],
+    quantiles: Sequence[float] = (),
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Compute mean, std, min, max and the given quantiles column-wise over all
+    rows in `chunks`. Each chunk is a 2D array where the rows are realizations.
+
+    Moments are accumulated chunk by chunk. Quantiles need every value of a
+    column at once, so the rows are only retained when quantiles are requested.
+    """
+    running: Optional[RunningStatistics] = None
+    retained: List[np.ndarray] = []
+    for chunk in chunks:
+        chunk = np.atleast_2d(np.asarray(chunk, dtype=np.float64))
+        if running is None:
+            running = RunningStatistics(chunk.shape[1])
+        running.update(chunk)
+        if quantiles:
+            retained.append(chunk)
+
+    if running is None:
+        raise ValueError("No data to compute statistics from")
+
+    df = running.to_frame(columns)
+    if quantiles:
+        with warnings.catch_warnings():
+            # Columns without any values yield NaN, which is what we want
+            warnings.simplefilter("ignore", RuntimeWarning)
+            values = np.nanquantile(np.concatenate(retained), quantiles, axis=0)
+        df = pd.concat(
+            [
+                df,
+                pd.DataFrame(
+                    values,
+                    index=[quantile_label(q) for q in quantiles],
+                    columns=df.columns,
+                ),
+            ]
+        )
+    return df
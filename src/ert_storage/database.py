@@ -8,6 +8,7 @@ from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.orm import Session as SessionType
 from sqlalchemy.sql import text
 
+from ert_storage.metrics import instrument_engine
 from ert_storage.security import security
 
 ENV_RDBMS = "ERT_STORAGE_DATABASE_URL"
@@ -32,6 +33,7 @@ if IS_SQLITE:
     engine = create_engine(URI_RDBMS, connect_args={"check_same_thread": False})
 else:
     engine = create_engine(URI_RDBMS, pool_size=50, max_overflow=100)
+instrument_engine(engine)
 Session: Callable = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
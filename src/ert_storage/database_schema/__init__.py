@@ -1,5 +1,13 @@
-from .record_info import RecordInfo, RecordType, RecordClass
-from .record import Record, F64Matrix, File, FileBlock
+from .record_info import RecordInfo, RecordStatistics, RecordType, RecordClass
+from .record import (
+    Record,
+    F64Matrix,
+    F64MatrixSegment,
+    File,
+    FileBlock,
+    ChunkedArray,
+    ArrayChunk,
+)
 from .ensemble import Ensemble
 from .experiment import Experiment
 from .observation import Observation, ObservationTransformation
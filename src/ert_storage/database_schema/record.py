@@ -1,12 +1,14 @@
-from typing import Any
+from typing import Any, Dict, Optional
 from uuid import uuid4
 
+import numpy as np
+
 import sqlalchemy as sa
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 
-from ert_storage.ext.sqlalchemy_arrays import FloatArray
+from ert_storage.ext.sqlalchemy_arrays import FloatArray, IntArray
 from ert_storage.ext.uuid import UUID
 from ert_storage.database import Base
 
@@ -35,8 +37,11 @@ class Record(Base, UserdataField):
     file_pk = sa.Column(sa.Integer, sa.ForeignKey("file.pk"))
     f64_matrix_pk = sa.Column(sa.Integer, sa.ForeignKey("f64_matrix.pk"))
 
+    chunked_array_pk = sa.Column(sa.Integer, sa.ForeignKey("chunked_array.pk"))
+
     file = relationship("File", cascade="all")
     f64_matrix = relationship("F64Matrix", cascade="all")
+    chunked_array = relationship("ChunkedArray", cascade="all")
 
     observations = relationship(
         "Observation",
@@ -50,7 +55,7 @@ class Record(Base, UserdataField):
         if info.record_type == RecordType.file:
             return self.file.content
         elif info.record_type == RecordType.f64_matrix:
-            return self.f64_matrix.content
+            return self.f64_matrix.to_numpy().tolist()
         else:
             raise NotImplementedError(
                 f"The record type {self.record_type} is not yet implemented"
@@ -104,9 +109,167 @@ class F64Matrix(Base):
     time_updated = sa.Column(
         sa.DateTime, server_default=func.now(), onupdate=func.now()
     )
-    content = sa.Column(FloatArray, nullable=False)
+    content = sa.Column(FloatArray, nullable=True)
     labels = sa.Column(sa.PickleType)
 
+    # Ensemble-wide matrices are stored as little-endian float64 in row-major
+    # order instead of in `content`, so that a realization (row) can be read
+    # by its offset without loading the rest of the matrix. Matrices of other
+    # dtypes are always stored this way, and booleans are packed into bits.
+    data = deferred(sa.Column(sa.LargeBinary, nullable=True))
+    shape = sa.Column(IntArray, nullable=True)
+    dtype = sa.Column(sa.String, nullable=True)
+
+    # Columns appended after the matrix was created, eg. timesteps of a
+    # running forward model. They are only loaded for matrices that have any.
+    segment_count = sa.Column(sa.Integer, nullable=False, default=0, server_default="0")
+    segments = relationship(
+        "F64MatrixSegment",
+        order_by="F64MatrixSegment.segment_index",
+        cascade="all, delete-orphan",
+    )
+
+    DTYPE = np.dtype("<f8")
+
+    # Names of the supported dtypes and how they are stored
+    DTYPES: Dict[str, np.dtype] = {
+        "f64": np.dtype("<f8"),
+        "f32": np.dtype("<f4"),
+        "i64": np.dtype("<i8"),
+        "i32": np.dtype("<i4"),
+        "bool": np.dtype("bool"),
+    }
+
+    @classmethod
+    def storage_dtype(cls, dtype: np.dtype) -> np.dtype:
+        """
+        The supported dtype that can hold values of `dtype` without loss,
+        falling back to float64
+        """
+        if dtype.kind == "b":
+            return cls.DTYPES["bool"]
+        if dtype.kind == "f" and dtype.itemsize <= 4:
+            return cls.DTYPES["f32"]
+        if dtype.kind in "iu":
+            if dtype.itemsize < 4 or (dtype.kind == "i" and dtype.itemsize == 4):
+                return cls.DTYPES["i32"]
+            if dtype.kind == "i" or dtype.itemsize < 8:
+                return cls.DTYPES["i64"]
+            # Values of uint64 above 2**63 would wrap around in int64
+        return cls.DTYPE
+
+    @classmethod
+    def from_numpy(
+        cls, array: np.ndarray, labels: Optional[Any] = None, rows: bool = False
+    ) -> "F64Matrix":
+        """
+        Create a matrix from `array`, keeping its dtype if it is one of the
+        supported ones. If `rows` is set, store it such that each row can be
+        read individually.
+        """
+        array = np.asarray(array)
+        dtype = cls.storage_dtype(array.dtype)
+        if dtype == cls.DTYPES["bool"]:
+            data = np.packbits(array.astype(bool), axis=None).tobytes()
+        elif dtype != cls.DTYPE or (rows and array.ndim == 2):
+            data = np.ascontiguousarray(array, dtype=dtype).tobytes()
+        else:
+            return cls(content=array.astype(cls.DTYPE).tolist(), labels=labels)
+        return cls(
+            data=data,
+            shape=list(array.shape),
+            dtype=None if dtype == cls.DTYPE else dtype.str,
+            labels=labels,
+        )
+
+    @property
+    def numpy_dtype(self) -> np.dtype:
+        return np.dtype(self.dtype) if self.dtype is not None else self.DTYPE
+
+    @property
+    def is_row_addressable(self) -> bool:
+        return (
+            self.shape is not None
+            and len(self.shape) == 2
+            and self.numpy_dtype != self.DTYPES["bool"]
+        )
+
+    def to_numpy(self) -> np.ndarray:
+        if self.shape is not None:
+            dtype = self.numpy_dtype
+            if dtype == self.DTYPES["bool"]:
+                bits = np.unpackbits(
+                    np.frombuffer(self.data, dtype=np.uint8),
+                    count=int(np.prod(self.shape)),
+                )
+                return bits.astype(bool).reshape(self.shape)
+            return np.frombuffer(self.data, dtype=dtype).reshape(self.shape)
+        content = np.asarray(self.content, dtype=np.float64)
+        if self.segment_count:
+            content = np.concatenate(
+                [content]
+                + [
+                    np.asarray(segment.content, dtype=np.float64).reshape(
+                        content.shape[:-1] + (-1,)
+                    )
+                    for segment in self.segments
+                ],
+                axis=-1,
+            )
+        return content
+
+
+class F64MatrixSegment(Base):
+    __tablename__ = "f64_matrix_segment"
+    __table_args__ = (sa.UniqueConstraint("f64_matrix_pk", "segment_index"),)
+
+    pk = sa.Column(sa.Integer, primary_key=True)
+    time_created = sa.Column(sa.DateTime, server_default=func.now())
+    f64_matrix_pk = sa.Column(
+        sa.Integer, sa.ForeignKey("f64_matrix.pk"), nullable=False
+    )
+    segment_index = sa.Column(sa.Integer, nullable=False)
+    content = sa.Column(FloatArray, nullable=False)
+
+
+class ChunkedArray(Base):
+    """
+    N-dimensional array split into a regular grid of chunks of shape
+    `chunk_shape`, so that a hyperslab can be read by loading only the chunks
+    it touches. Chunks at the upper edges may be smaller than `chunk_shape`.
+    """
+
+    __tablename__ = "chunked_array"
+
+    pk = sa.Column(sa.Integer, primary_key=True)
+    id = sa.Column(UUID, unique=True, default=uuid4, nullable=False)
+    time_created = sa.Column(sa.DateTime, server_default=func.now())
+    time_updated = sa.Column(
+        sa.DateTime, server_default=func.now(), onupdate=func.now()
+    )
+    shape = sa.Column(IntArray, nullable=False)
+    chunk_shape = sa.Column(IntArray, nullable=False)
+    dtype = sa.Column(sa.String, nullable=False)
+
+    chunks = relationship(
+        "ArrayChunk", cascade="all, delete-orphan", back_populates="array"
+    )
+
+
+class ArrayChunk(Base):
+    __tablename__ = "array_chunk"
+    __table_args__ = (sa.UniqueConstraint("chunked_array_pk", "index"),)
+
+    pk = sa.Column(sa.Integer, primary_key=True)
+    chunked_array_pk = sa.Column(
+        sa.Integer, sa.ForeignKey("chunked_array.pk"), nullable=False
+    )
+    array = relationship("ChunkedArray", back_populates="chunks")
+
+    # Position of the chunk in the chunk grid, eg. "0.3.1"
+    index = sa.Column(sa.String, nullable=False)
+    data = sa.Column(sa.LargeBinary, nullable=False)
+
 
 class FileBlock(Base):
     __tablename__ = "file_block"
@@ -5,11 +5,13 @@ from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from ert_storage.database import Base
+from ert_storage.ext.sqlalchemy_arrays import FloatArray, IntArray
 
 
 class RecordType(Enum):
     f64_matrix = 1
     file = 2
+    chunked_array = 3
 
 
 class RecordClass(Enum):
@@ -44,3 +46,42 @@ class RecordInfo(Base):
     # Parameter-specific data
     prior_pk = sa.Column(sa.Integer, sa.ForeignKey("prior.pk"), nullable=True)
     prior = relationship("Prior")
+
+    # Matrix-specific data
+    statistics = relationship(
+        "RecordStatistics",
+        uselist=False,
+        cascade="all, delete-orphan",
+        back_populates="record_info",
+    )
+
+
+class RecordStatistics(Base):
+    """
+    Running column-wise aggregates of all matrix records belonging to a
+    RecordInfo, updated as each record is created. The rows of the matrices are
+    the samples, so that the aggregates are taken across realizations.
+    """
+
+    __tablename__ = "record_statistics"
+
+    pk = sa.Column(sa.Integer, primary_key=True)
+    time_created = sa.Column(sa.DateTime, server_default=func.now())
+    time_updated = sa.Column(
+        sa.DateTime, server_default=func.now(), onupdate=func.now()
+    )
+
+    record_info_pk = sa.Column(
+        sa.Integer, sa.ForeignKey("record_info.pk"), unique=True, nullable=False
+    )
+    record_info = relationship("RecordInfo", back_populates="statistics")
+
+    # False if the records have different shapes or labels, in which case the
+    # aggregates are no longer meaningful
+    is_valid = sa.Column(sa.Boolean, nullable=False, default=True)
+    labels = sa.Column(sa.PickleType, nullable=True)
+    count = sa.Column(IntArray, nullable=False, default=[])
+    mean = sa.Column(FloatArray, nullable=False, default=[])
+    m2 = sa.Column(FloatArray, nullable=False, default=[])
+    min = sa.Column(FloatArray, nullable=False, default=[])
+    max = sa.Column(FloatArray, nullable=False, default=[])
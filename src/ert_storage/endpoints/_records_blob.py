@@ -14,6 +14,8 @@ from fastapi.responses import Response, StreamingResponse
 
 from ert_storage import database_schema as ds
 from ert_storage.database import Session, get_db, HAS_AZURE_BLOB_STORAGE
+from ert_storage.endpoints._request_body import read_body
+from ert_storage.metrics import BLOB_DURATION
 
 if HAS_AZURE_BLOB_STORAGE:
     from ert_storage.database import azure_blob_container
@@ -57,7 +59,7 @@ class BlobHandler:
             block_index=block_index,
             record_name=self._name,
             realization_index=self._realization_index,
-            content=await request.body(),
+            content=await read_body(request),
         )
 
     def create_blob(self) -> ds.File:
@@ -89,7 +91,8 @@ class AzureBlobHandler(BlobHandler):
     ) -> ds.File:
         key = f"{self._name}@{self._realization_index}@{uuid4()}"
         blob = azure_blob_container.get_blob_client(key)
-        await blob.upload_blob(file.file)
+        with BLOB_DURATION.timer(backend="azure", operation="upload"):
+            await blob.upload_blob(file.file)
 
         return ds.File(
             filename=file.filename,
@@ -106,7 +109,9 @@ class AzureBlobHandler(BlobHandler):
     ) -> ds.FileBlock:
         block_id = str(uuid4())
         blob = azure_blob_container.get_blob_client(record.file.az_blob)
-        await blob.stage_block(block_id, await request.body())
+        content = await read_body(request)
+        with BLOB_DURATION.timer(backend="azure", operation="stage_block"):
+            await blob.stage_block(block_id, content)
 
         return ds.FileBlock(
             ensemble_pk=record.ensemble_pk,
@@ -135,11 +140,13 @@ class AzureBlobHandler(BlobHandler):
             block.block_id
             for block in sorted(submitted_blocks, key=lambda x: x.block_index)
         ]
-        await blob.commit_block_list(block_ids)
+        with BLOB_DURATION.timer(backend="azure", operation="commit_block_list"):
+            await blob.commit_block_list(block_ids)
 
     async def get_content(self, record: ds.Record) -> Response:
         blob = azure_blob_container.get_blob_client(record.file.az_blob)
-        download = await blob.download_blob()
+        with BLOB_DURATION.timer(backend="azure", operation="download"):
+            download = await blob.download_blob()
 
         async def chunk_generator() -> AsyncGenerator[bytes, None]:
             async for chunk in download.chunks():
@@ -0,0 +1,250 @@
+"""
+Reading of request bodies. Bodies are limited to `ERT_STORAGE_MAX_BODY_SIZE`
+bytes, if it is set, and are rejected as soon as they are known to be larger,
+ie. before anything is read if the request has a Content-Length.
+
+Matrices in formats that can be parsed incrementally are parsed while the body
+is received, rather than after it has been buffered in memory. NPY arrays are
+written directly into a preallocated array, while CSV and Arrow IPC streams are
+fed to their parsers in a thread of the event loop's default executor. These
+threads mostly wait for the body, so they are kept out of the worker pool,
+where a few slow uploads would hold up all other CPU-heavy work.
+"""
+import asyncio
+import contextvars
+import io
+import os
+import queue
+from typing import Any, AsyncIterator, BinaryIO, Callable, List, Optional, TypeVar
+
+import numpy as np
+from fastapi import Request
+from numpy.lib.format import (
+    read_array_header_1_0,
+    read_array_header_2_0,
+    read_magic,
+)
+
+from ert_storage import exceptions as exc
+from ert_storage.profiling import run_profiled
+
+
+ENV_MAX_BODY_SIZE = "ERT_STORAGE_MAX_BODY_SIZE"
+
+# Number of received chunks that may be waiting for the parser
+QUEUE_SIZE = 16
+
+T = TypeVar("T")
+
+
+def get_max_body_size() -> Optional[int]:
+    value = os.getenv(ENV_MAX_BODY_SIZE)
+    if not value:
+        return None
+    return int(value)
+
+
+async def iter_body(request: Request) -> AsyncIterator[bytes]:
+    """
+    Iterate over the chunks of the body of `request` as they are received
+    """
+    limit = get_max_body_size()
+    length = request.headers.get("content-length")
+    if limit is not None and length is not None and length.isdigit():
+        if int(length) > limit:
+            raise _too_large(limit)
+
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if limit is not None and size > limit:
+            raise _too_large(limit)
+        if chunk:
+            yield chunk
+
+
+async def read_body(request: Request) -> bytes:
+    """
+    Read the whole body of `request`, for formats that can't be parsed
+    incrementally
+    """
+    chunks: List[bytes] = []
+    async for chunk in iter_body(request):
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def read_numpy(request: Request) -> np.ndarray:
+    """
+    Read an array in NPY format (as written by `numpy.lib.format.write_array`)
+    into a preallocated array. Raises ValueError if the body is not an array.
+    """
+    chunks = iter_body(request)
+    buffer = bytearray()
+
+    async def fill(size: int) -> None:
+        while len(buffer) < size:
+            try:
+                buffer.extend(await chunks.__anext__())
+            except StopAsyncIteration:
+                raise ValueError("Body is not an array in NPY format")
+
+    # The header is a magic string, a version, the length of the header and
+    # the header itself
+    await fill(8)
+    version = read_magic(io.BytesIO(buffer[:8]))
+    if version == (1, 0):
+        await fill(10)
+        header_size = 10 + int.from_bytes(buffer[8:10], "little")
+    elif version == (2, 0):
+        await fill(12)
+        header_size = 12 + int.from_bytes(buffer[8:12], "little")
+    else:
+        # Version 3.0 is only written for structured dtypes with UTF-8 field
+        # names, which aren't matrices
+        raise ValueError(f"NPY format version {version} is not supported")
+
+    await fill(header_size)
+    header = io.BytesIO(buffer[:header_size])
+    read_magic(header)
+    if version == (1, 0):
+        shape, fortran_order, dtype = read_array_header_1_0(header)
+    else:
+        shape, fortran_order, dtype = read_array_header_2_0(header)
+    if dtype.hasobject:
+        raise ValueError("Arrays of Python objects are not supported")
+
+    # The header is not trusted with an allocation that is larger than the
+    # body, so the size of the array is checked against the size of the body,
+    # or the body is buffered first when its size is not known
+    size = header_size + int(np.prod(shape, dtype=object)) * dtype.itemsize
+    limit = get_max_body_size()
+    if limit is not None and size > limit:
+        raise _too_large(limit)
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit():
+        if size > int(length):
+            raise ValueError("Body is shorter than the array in its header")
+    elif limit is None:
+        async for chunk in chunks:
+            buffer.extend(chunk)
+        if size > len(buffer):
+            raise ValueError("Body is shorter than the array in its header")
+
+    array = np.empty(shape, dtype=dtype, order="F" if fortran_order else "C")
+    target = array.reshape(-1, order="A").view(np.uint8).data
+    position = min(len(buffer) - header_size, len(target))
+    target[:position] = buffer[header_size : header_size + position]
+    buffer.clear()
+
+    async for chunk in chunks:
+        size = min(len(chunk), len(target) - position)
+        target[position : position + size] = chunk[:size]
+        position += size
+    if position != len(target):
+        raise ValueError("Body is shorter than the array in its header")
+    return array
+
+
+async def parse_body(request: Request, parse: Callable[[BinaryIO], T]) -> T:
+    """
+    Call `parse` in the default executor with a file object that reads the
+    body of `request` as it is received
+    """
+    loop = asyncio.get_running_loop()
+    reader = _BodyReader(loop)
+    stream = io.BufferedReader(reader)
+    context = contextvars.copy_context()
+    future: "asyncio.Future[T]" = loop.run_in_executor(
+        None, context.run, run_profiled, parse, stream
+    )
+    try:
+        async for chunk in iter_body(request):
+            if not await reader.put(chunk, future):
+                break
+        else:
+            await reader.put(None, future)
+    except BaseException:
+        reader.abort()
+        await asyncio.wait([future])
+        if not future.cancelled():
+            # The parser fails too, but it is the error of the body that counts
+            future.exception()
+        raise
+    return await future
+
+
+class _BodyReader(io.RawIOBase):
+    """
+    A file object that is read in a worker thread, while the event loop puts
+    the chunks of the body into it
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        super().__init__()
+        self._loop = loop
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(QUEUE_SIZE)
+        self._space = asyncio.Event()
+        self._chunk = memoryview(b"")
+        self._aborted = False
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while not self._chunk:
+            if self._eof:
+                # Parsers may read again after the end of the body
+                return 0
+            chunk = self._queue.get()
+            self._loop.call_soon_threadsafe(self._space.set)
+            if chunk is None:
+                if self._aborted:
+                    raise OSError("The request body was not received")
+                self._eof = True
+                return 0
+            self._chunk = memoryview(chunk)
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+    async def put(self, chunk: Optional[bytes], future: "asyncio.Future[Any]") -> bool:
+        """
+        Put a chunk of the body, or None at the end, into the queue, waiting
+        for space if the parser is behind. Returns False if the parser has
+        already finished.
+        """
+        while not future.done():
+            self._space.clear()
+            try:
+                self._queue.put_nowait(chunk)
+                return True
+            except queue.Full:
+                space = asyncio.ensure_future(self._space.wait())
+                await asyncio.wait([future, space], return_when=asyncio.FIRST_COMPLETED)
+                space.cancel()
+        return False
+
+    def abort(self) -> None:
+        """
+        Make the parser fail at the next read, discarding the chunks that it
+        would never get to
+        """
+        self._aborted = True
+        while True:
+            try:
+                self._queue.put_nowait(None)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+def _too_large(limit: int) -> exc.PayloadTooLargeError:
+    return exc.PayloadTooLargeError(
+        f"Request body is larger than the maximum of {limit} bytes"
+    )
@@ -0,0 +1,369 @@
+import io
+from uuid import UUID, uuid4
+from typing import Any, Dict, List, Mapping, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import sqlalchemy as sa
+from fastapi import APIRouter, Depends, Header, Request, status
+from fastapi.responses import Response
+from sqlalchemy.orm import joinedload, selectinload
+from ert_storage.database import Session, get_db
+from ert_storage import database_schema as ds
+from ert_storage import exceptions as exc
+from ert_storage.ext.json_codec import JSONResponse, loads
+from ert_storage.endpoints._request_body import read_body
+from ert_storage.endpoints.records import (
+    _get_realization_dataframe,
+    _update_record_statistics,
+)
+
+
+router = APIRouter(tags=["analysis"])
+
+
+ANALYSIS_INPUT_DESCRIPTION = """\
+With `application/x-npz`, the payload is a `numpy.savez` archive with the arrays:
+
+- `X`: parameters × realizations
+- `Y`: observed responses × realizations
+- `d`: observation values, aligned with the rows of `Y`
+- `std`: observation errors, aligned with the rows of `Y`
+- `realizations`: realization indices of the columns of `X` and `Y`
+- `parameter_names`: names of the parameter records, in order
+- `parameter_offsets`: rows `parameter_offsets[i]:parameter_offsets[i+1]` of `X`
+  belong to `parameter_names[i]`
+- `parameter_keys` and `observation_keys`: a name for each row of `X` and `Y`
+
+With `application/vnd.apache.arrow.stream`, the payload is a single Arrow table
+with one row per parameter and observed response, and the columns `kind`
+("parameter" or "observation"), `key`, `value`, `std` followed by one column
+per realization.
+"""
+
+
+@router.get(
+    "/ensembles/{ensemble_id}/analysis-input",
+    responses={
+        status.HTTP_200_OK: {
+            "content": {
+                "application/json": {},
+                "application/x-npz": {},
+                "application/vnd.apache.arrow.stream": {},
+            },
+            "description": ANALYSIS_INPUT_DESCRIPTION,
+        }
+    },
+)
+async def get_analysis_input(
+    *,
+    db: Session = Depends(get_db),
+    ensemble_id: UUID,
+    accept: str = Header("application/json"),
+) -> Any:
+    """
+    Get everything that an ensemble smoother update needs in one request: the
+    parameter matrix, the responses at the observed points, and the observation
+    values and errors they are compared against, aligned by realization and by
+    the observations' `x_axis`.
+
+    Only realizations with both parameters and observed responses are included.
+    """
+    ensemble = db.query(ds.Ensemble).filter_by(id=ensemble_id).one()
+    records = (
+        db.query(ds.Record)
+        .options(
+            joinedload(ds.Record.f64_matrix).undefer(ds.F64Matrix.data),
+            selectinload(ds.Record.observations),
+        )
+        .join(ds.RecordInfo)
+        .filter(
+            ds.RecordInfo.name.in_(
+                list(ensemble.parameter_names) + list(ensemble.response_names)
+            )
+        )
+        .filter_by(ensemble_pk=ensemble.pk, record_type=ds.RecordType.f64_matrix)
+        .all()
+    )
+
+    by_name: Dict[str, List[ds.Record]] = {}
+    for record in records:
+        by_name.setdefault(record.name, []).append(record)
+
+    parameter_names = [name for name in ensemble.parameter_names if name in by_name]
+    parameter_frames = [
+        _get_realization_dataframe(by_name[name]) for name in parameter_names
+    ]
+    parameter_offsets = np.cumsum([0] + [df.shape[1] for df in parameter_frames])
+
+    observation_keys: List[str] = []
+    observation_values: List[float] = []
+    observation_errors: List[float] = []
+    response_columns: List[pd.Series] = []
+    for name in ensemble.response_names:
+        observations = {
+            obs.pk: obs
+            for record in by_name.get(name, [])
+            for obs in record.observations
+        }
+        if not observations:
+            continue
+        responses = _get_realization_dataframe(by_name[name])
+        for obs in sorted(observations.values(), key=lambda obs: obs.name):
+            response_columns.extend(_response_columns(responses, name, obs))
+            for x, value, error in zip(obs.x_axis, obs.values, obs.errors):
+                observation_keys.append(f"{obs.name}:{x}")
+                observation_values.append(value)
+                observation_errors.append(error)
+
+    if not parameter_frames and not response_columns:
+        raise exc.NotFoundError(
+            f"Ensemble '{ensemble_id}' has neither parameters nor observed responses"
+        )
+
+    parameters = (
+        pd.concat(parameter_frames, axis=1) if parameter_frames else pd.DataFrame()
+    )
+    responses = (
+        pd.concat(response_columns, axis=1) if response_columns else pd.DataFrame()
+    )
+    if parameters.empty:
+        realizations = responses.index
+    elif responses.empty:
+        realizations = parameters.index
+    else:
+        realizations = parameters.index.intersection(responses.index)
+
+    X = parameters.reindex(realizations).values.T.astype(np.float64)
+    Y = responses.reindex(realizations).values.T.astype(np.float64)
+    if parameters.empty:
+        X = X.reshape(0, len(realizations))
+    if responses.empty:
+        Y = Y.reshape(0, len(realizations))
+
+    bundle = {
+        "X": X,
+        "Y": Y,
+        "d": np.array(observation_values, dtype=np.float64),
+        "std": np.array(observation_errors, dtype=np.float64),
+        "realizations": np.array(realizations, dtype=np.int64),
+        "parameter_names": np.array(parameter_names, dtype=str),
+        "parameter_offsets": parameter_offsets.astype(np.int64),
+        "parameter_keys": np.array(list(parameters.columns), dtype=str),
+        "observation_keys": np.array(observation_keys, dtype=str),
+    }
+    return _get_analysis_input_response(bundle, accept)
+
+
+def _response_columns(
+    responses: pd.DataFrame, name: str, obs: ds.Observation
+) -> List[pd.Series]:
+    """
+    Find the columns of the response dataframe that correspond to the x-axis
+    values of the observation. Labels are compared as numbers or dates when
+    all of them can be parsed as such.
+    """
+    if responses.shape[1] == 1 and responses.columns[0] == name:
+        return [responses.iloc[:, 0]] * len(obs.x_axis)
+
+    labels = [str(column)[len(name) + 1 :] for column in responses.columns]
+    x_axis = [str(x) for x in obs.x_axis]
+    keys = _label_keys(labels + x_axis)
+    positions = dict(zip(keys[: len(labels)], range(len(labels))))
+    x_keys = keys[len(labels) :]
+    missing = [x for x, key in zip(x_axis, x_keys) if key not in positions]
+    if missing:
+        raise exc.UnprocessableError(
+            f"Observation '{obs.name}' has x-axis values {missing} that are not labels of response '{name}'"
+        )
+    return [responses.iloc[:, positions[key]] for key in x_keys]
+
+
+def _label_keys(labels: List[str]) -> List[Any]:
+    for convert in (pd.to_numeric, pd.Timestamp):
+        try:
+            return [convert(label) for label in labels]
+        except (ValueError, TypeError):
+            continue
+    return labels
+
+
+def _get_analysis_input_response(
+    bundle: Mapping[str, np.ndarray], accept: Optional[str]
+) -> Any:
+    if accept == "application/x-npz":
+        stream = io.BytesIO()
+        np.savez(stream, **bundle)
+        return Response(content=stream.getvalue(), media_type=accept)
+    if accept == "application/vnd.apache.arrow.stream":
+        n_params = bundle["X"].shape[0]
+        n_obs = bundle["Y"].shape[0]
+        matrix = np.concatenate([bundle["X"], bundle["Y"]])
+        table = pa.table(
+            {
+                "kind": ["parameter"] * n_params + ["observation"] * n_obs,
+                "key": list(bundle["parameter_keys"])
+                + list(bundle["observation_keys"]),
+                "value": np.concatenate([np.full(n_params, np.nan), bundle["d"]]),
+                "std": np.concatenate([np.full(n_params, np.nan), bundle["std"]]),
+                **{
+                    str(real): matrix[:, i]
+                    for i, real in enumerate(bundle["realizations"])
+                },
+            }
+        )
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(content=sink.getvalue().to_pybytes(), media_type=accept)
+    return JSONResponse(dict(bundle))
+
+
+@router.post("/ensembles/{ensemble_id}/parameters", response_model=Mapping[str, UUID])
+async def post_ensemble_parameters(
+    *,
+    db: Session = Depends(get_db),
+    ensemble_id: UUID,
+    content_type: str = Header("application/json"),
+    request: Request,
+) -> Mapping[str, UUID]:
+    """
+    Write all parameter records of an ensemble at once, typically the posterior
+    of an update. The body uses the same layout as the analysis input, either
+    as an `application/x-npz` archive or as the equivalent JSON object:
+
+    - `X`: parameters × realizations
+    - `parameter_names`: names of the parameter records
+    - `parameter_offsets`: rows `parameter_offsets[i]:parameter_offsets[i+1]` of
+      `X` are stored as the ensemble-wide record `parameter_names[i]`
+    - `realizations` (optional): realization indices of the columns of `X`
+    - `parameter_keys` (optional): a "<name>:<label>" key for each row of `X`
+
+    All records are validated up front and created in a single transaction.
+    Returns the id of each created record.
+    """
+    try:
+        if content_type == "application/x-npz":
+            with np.load(io.BytesIO(await read_body(request))) as npz:
+                body = {key: npz[key] for key in npz.files}
+        elif content_type == "application/json":
+            body = loads(await read_body(request))
+        else:
+            raise exc.UnprocessableError(f"Unsupported content type '{content_type}'")
+        X = np.asarray(body["X"], dtype=np.float64)
+        names = [str(name) for name in body["parameter_names"]]
+        offsets = [int(offset) for offset in body["parameter_offsets"]]
+        realizations = body.get("realizations")
+        keys = body.get("parameter_keys")
+    except (KeyError, TypeError, ValueError) as parse_exc:
+        raise exc.UnprocessableError(f"Invalid parameter matrix: {parse_exc}")
+
+    if X.ndim != 2:
+        raise exc.UnprocessableError("Parameter matrix must be two-dimensional")
+    if (
+        len(offsets) != len(names) + 1
+        or offsets[0] != 0
+        or offsets[-1] != X.shape[0]
+        or any(a > b for a, b in zip(offsets, offsets[1:]))
+    ):
+        raise exc.UnprocessableError(
+            f"Parameter offsets {offsets} do not partition the {X.shape[0]} rows"
+        )
+    if realizations is None:
+        realizations = list(range(X.shape[1]))
+    realizations = [int(real) for real in realizations]
+    if len(realizations) != X.shape[1]:
+        raise exc.UnprocessableError(
+            "The number of realizations does not match the columns of the matrix"
+        )
+    if len(set(realizations)) != len(realizations) or any(
+        real < 0 for real in realizations
+    ):
+        raise exc.UnprocessableError(
+            f"Realization indices {realizations} must be unique and non-negative"
+        )
+    if len(set(names)) != len(names):
+        raise exc.UnprocessableError(f"Non unique parameter names {names}")
+
+    ensemble = db.query(ds.Ensemble).filter_by(id=ensemble_id).one()
+    unknown = set(names) - set(ensemble.parameter_names)
+    if unknown:
+        raise exc.UnprocessableError(
+            f"Records {sorted(unknown)} are not parameters of ensemble '{ensemble_id}'"
+        )
+    if ensemble.size != -1 and not set(realizations) <= set(
+        ensemble.active_realizations
+    ):
+        raise exc.ExpectationError(
+            f"Realization indices {realizations} outside of allowed realization indices {ensemble.active_realizations}"
+        )
+    if ensemble.size == -1 and realizations:
+        # Without a size, the ensemble has as many realizations as it has
+        # records for, or as are uploaded here
+        (last,) = (
+            db.query(sa.func.max(ds.Record.realization_index))
+            .join(ds.Record.record_info)
+            .filter(ds.RecordInfo.ensemble_pk == ensemble.pk)
+            .one()
+        )
+        count = max(len(realizations), last + 1 if last is not None else 0)
+        if max(realizations) >= count:
+            raise exc.ExpectationError(
+                f"Realization indices {realizations} outside of the {count} realizations of ensemble '{ensemble_id}'"
+            )
+    existing = [
+        name
+        for (name,) in db.query(ds.RecordInfo.name)
+        .filter(ds.RecordInfo.name.in_(names))
+        .filter_by(ensemble_pk=ensemble.pk)
+    ]
+    if existing:
+        raise exc.ConflictError(
+            f"Records {existing} for ensemble '{ensemble_id}' already exist"
+        )
+
+    # Ensemble-wide records are indexed by realization, so realizations that
+    # are not part of the upload become rows of NaN
+    rows = max(realizations) + 1 if realizations else 0
+    ids = {}
+    for name, start, stop in zip(names, offsets, offsets[1:]):
+        content = np.full((rows, stop - start), np.nan)
+        content[realizations] = X[start:stop].T
+        record = ds.Record(
+            id=uuid4(),
+            record_info=ds.RecordInfo(
+                ensemble=ensemble,
+                name=name,
+                record_class=ds.RecordClass.parameter,
+                record_type=ds.RecordType.f64_matrix,
+                statistics=ds.RecordStatistics(),
+            ),
+            f64_matrix=ds.F64Matrix.from_numpy(
+                content,
+                _parameter_labels(name, keys, start, stop, rows),
+                rows=True,
+            ),
+            realization_index=None,
+        )
+        _update_record_statistics(
+            db, record.record_info, [(content, record.f64_matrix.labels)]
+        )
+        db.add(record)
+        ids[name] = record.id
+    db.commit()
+    return ids
+
+
+def _parameter_labels(
+    name: str, keys: Optional[Any], start: int, stop: int, rows: int
+) -> Optional[List[List[str]]]:
+    if keys is None:
+        return None
+    prefix = f"{name}:"
+    labels = [str(key) for key in keys[start:stop]]
+    if not all(label.startswith(prefix) for label in labels):
+        return None
+    return [
+        [label[len(prefix) :] for label in labels],
+        [str(index) for index in range(rows)],
+    ]
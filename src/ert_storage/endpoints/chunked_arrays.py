@@ -0,0 +1,302 @@
+import io
+import itertools
+from uuid import UUID
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from fastapi import APIRouter, Depends, Header, Query, Request, status
+from fastapi.responses import Response
+from numpy.lib.format import write_array
+from ert_storage.database import Session, get_db
+from ert_storage import database_schema as ds, json_schema as js
+from ert_storage import exceptions as exc
+from ert_storage.ext.json_codec import JSONResponse, loads_array
+from ert_storage.endpoints._request_body import read_body, read_numpy
+from ert_storage.endpoints.records import (
+    REALIZATIONS_DESCRIPTION,
+    _create_record,
+    _get_record_class,
+    _parse_index_ranges,
+    new_record,
+)
+
+router = APIRouter(tags=["record"])
+
+# Default number of elements in a chunk, ie. 1 MiB of float64
+CHUNK_SIZE = 2**17
+
+# Maximum number of chunks loaded from the database at a time
+CHUNK_QUERY_SIZE = 256
+
+CHUNKS_DESCRIPTION = """\
+Comma-separated shape of the chunks, eg. `64,64,16`. Defaults to chunks of
+about 1 MiB.
+"""
+
+SLICES_DESCRIPTION = """\
+Comma-separated selection for each axis of the array, eg. `10:20,:,3`. An axis
+is selected with `start:stop`, where either may be left out, or a single index,
+which keeps the axis with length 1. Axes that are not given are selected
+entirely.
+"""
+
+
+def new_record_array(
+    *,
+    db: Session = Depends(get_db),
+    record: ds.Record = Depends(new_record),
+) -> ds.Record:
+    record.record_info.record_class = _get_record_class(
+        record.record_info.ensemble, record.name
+    )
+    record.record_info.record_type = ds.RecordType.chunked_array
+    return record
+
+
+@router.post(
+    "/ensembles/{ensemble_id}/records/{name}/array", response_model=js.RecordOut
+)
+async def post_ensemble_record_array(
+    *,
+    db: Session = Depends(get_db),
+    record: ds.Record = Depends(new_record_array),
+    chunks: Optional[str] = Query(None, description=CHUNKS_DESCRIPTION),
+    content_type: str = Header("application/x-numpy"),
+    request: Request,
+) -> js.RecordOut:
+    """
+    Assign an n-dimensional array, such as a grid parameter, to the given
+    `name` record. The array is stored in chunks, so that a part of it can be
+    fetched without reading all of it. For an ensemble-wide record the first
+    axis is the realization.
+    """
+    try:
+        if content_type == "application/x-numpy":
+            array = await read_numpy(request)
+        elif content_type == "application/json":
+            array = loads_array(await read_body(request))
+        else:
+            raise exc.UnprocessableError(f"Unsupported content type '{content_type}'")
+        array = np.asarray(array, dtype=np.float64)
+    except ValueError:
+        raise exc.UnprocessableError(f"Record '{record.name}' needs to be an array")
+    if array.ndim == 0 or array.size == 0:
+        raise exc.UnprocessableError(
+            f"Record '{record.name}' needs to be a non-empty array"
+        )
+
+    if chunks is None:
+        chunk_shape = _default_chunk_shape(array.shape)
+    else:
+        chunk_shape = _parse_shape(chunks)
+        if len(chunk_shape) != array.ndim or min(chunk_shape) < 1:
+            raise exc.UnprocessableError(
+                f"Chunk shape {chunk_shape} does not match array of shape {array.shape}"
+            )
+
+    dtype = np.dtype("<f8")
+    chunked_array = ds.ChunkedArray(
+        shape=list(array.shape), chunk_shape=list(chunk_shape), dtype=dtype.str
+    )
+    for index in itertools.product(*_chunk_ranges(array.shape, chunk_shape)):
+        region = tuple(
+            slice(i * size, (i + 1) * size) for i, size in zip(index, chunk_shape)
+        )
+        chunked_array.chunks.append(
+            ds.ArrayChunk(
+                index=_chunk_key(index),
+                data=np.ascontiguousarray(array[region], dtype=dtype).tobytes(),
+            )
+        )
+    record.chunked_array = chunked_array
+    return _create_record(db, record)
+
+
+@router.get(
+    "/ensembles/{ensemble_id}/records/{name}/array",
+    responses={
+        status.HTTP_200_OK: {
+            "content": {
+                "application/json": {},
+                "application/x-numpy": {},
+                "application/x-npz": {},
+            },
+            "description": "An array where the first axis is the realization, in "
+            "ascending order, followed by the selected hyperslab. JSON and npz "
+            "also contain the realization indices as `realizations`.",
+        }
+    },
+)
+async def get_ensemble_record_array(
+    *,
+    db: Session = Depends(get_db),
+    ensemble_id: UUID,
+    name: str,
+    realizations: Optional[str] = Query(None, description=REALIZATIONS_DESCRIPTION),
+    slices: Optional[str] = Query(None, description=SLICES_DESCRIPTION),
+    accept: str = Header("application/json"),
+) -> Any:
+    """
+    Fetch a hyperslab of a chunked array record across realizations, eg. a
+    layer or a column of a grid parameter. Only the chunks that intersect the
+    hyperslab are read.
+    """
+    selected = _parse_index_ranges(realizations) if realizations is not None else None
+    query = (
+        db.query(ds.Record)
+        .join(ds.RecordInfo)
+        .filter_by(name=name, record_type=ds.RecordType.chunked_array)
+        .join(ds.Ensemble)
+        .filter_by(id=ensemble_id)
+    )
+    if selected is not None:
+        query = query.filter(
+            (ds.Record.realization_index == None)
+            | ds.Record.realization_index.in_(selected)
+        )
+    records = query.order_by(ds.Record.realization_index).all()
+    if not records:
+        raise exc.NotFoundError(f"Array record '{name}' not found")
+
+    parts: List[np.ndarray] = []
+    indices: List[np.ndarray] = []
+    for record in records:
+        shape = record.chunked_array.shape
+        if record.realization_index is None:
+            # The first axis of an ensemble-wide array is the realization
+            reals = np.arange(shape[0])
+            if selected is not None:
+                reals = reals[np.isin(reals, selected)]
+            selection = [reals] + _parse_slices(slices, shape[1:])
+            indices.append(reals)
+        else:
+            selection = _parse_slices(slices, shape)
+            indices.append(np.array([record.realization_index]))
+        part = _read_hyperslab(db, record.chunked_array, selection)
+        if record.realization_index is not None:
+            part = part[np.newaxis]
+        parts.append(part)
+
+    if len({part.shape[1:] for part in parts}) > 1:
+        raise exc.UnprocessableError(
+            f"Arrays of record '{name}' do not have the same shape"
+        )
+    data = np.concatenate(parts)
+    reals = np.concatenate(indices)
+    order = np.argsort(reals, kind="stable")
+    data, reals = data[order], reals[order]
+
+    if accept == "application/x-numpy":
+        stream = io.BytesIO()
+        write_array(stream, data)
+        return Response(content=stream.getvalue(), media_type=accept)
+    if accept == "application/x-npz":
+        stream = io.BytesIO()
+        np.savez(stream, data=data, realizations=reals)
+        return Response(content=stream.getvalue(), media_type=accept)
+    return JSONResponse({"realizations": reals, "data": data})
+
+
+def _parse_shape(value: str) -> Tuple[int, ...]:
+    try:
+        return tuple(int(n) for n in value.split(","))
+    except ValueError:
+        raise exc.UnprocessableError(f"Invalid shape '{value}'")
+
+
+def _parse_slices(value: Optional[str], shape: Sequence[int]) -> List[np.ndarray]:
+    """
+    Parse a selection such as "10:20,:,3" into the selected indices of each
+    axis of an array of the given shape
+    """
+    parts = value.split(",") if value else []
+    if len(parts) > len(shape):
+        raise exc.UnprocessableError(
+            f"Selection '{value}' has more axes than the array ({len(shape)})"
+        )
+    selection = []
+    for axis, size in enumerate(shape):
+        part = parts[axis].strip() if axis < len(parts) else ":"
+        try:
+            if ":" in part:
+                start, _, stop = part.partition(":")
+                indices = np.arange(size)[
+                    slice(int(start) if start else None, int(stop) if stop else None)
+                ]
+            else:
+                indices = np.array([int(part)])
+        except ValueError:
+            raise exc.UnprocessableError(f"Invalid selection '{part}' of axis {axis}")
+        if len(indices) == 0 or not 0 <= indices[0] <= indices[-1] < size:
+            raise exc.UnprocessableError(
+                f"Selection '{part}' is outside of axis {axis} with length {size}"
+            )
+        selection.append(indices)
+    return selection
+
+
+def _read_hyperslab(
+    db: Session, array: ds.ChunkedArray, selection: Sequence[np.ndarray]
+) -> np.ndarray:
+    """
+    Read the elements at the outer product of the indices in `selection`,
+    loading only the chunks that contain them
+    """
+    chunk_shape = array.chunk_shape
+    dtype = np.dtype(array.dtype)
+    result = np.full([len(indices) for indices in selection], np.nan, dtype=dtype)
+
+    # For each axis, the chunks that are touched and the positions in the
+    # result that each of them fills
+    touched: List[Dict[int, np.ndarray]] = []
+    for indices, size in zip(selection, chunk_shape):
+        chunk_of = indices // size
+        touched.append(
+            {int(i): np.flatnonzero(chunk_of == i) for i in np.unique(chunk_of)}
+        )
+
+    keys = {
+        _chunk_key(index): index
+        for index in itertools.product(*(sorted(axis) for axis in touched))
+    }
+    key_list = list(keys)
+    for start in range(0, len(key_list), CHUNK_QUERY_SIZE):
+        rows = (
+            db.query(ds.ArrayChunk.index, ds.ArrayChunk.data)
+            .filter_by(chunked_array_pk=array.pk)
+            .filter(ds.ArrayChunk.index.in_(key_list[start : start + CHUNK_QUERY_SIZE]))
+        )
+        for key, data in rows:
+            index = keys[key]
+            origin = [i * size for i, size in zip(index, chunk_shape)]
+            extent = [
+                min(size, length - o)
+                for size, length, o in zip(chunk_shape, array.shape, origin)
+            ]
+            chunk = np.frombuffer(data, dtype=dtype).reshape(extent)
+            positions = [axis[i] for axis, i in zip(touched, index)]
+            local = [
+                indices[pos] - o
+                for indices, pos, o in zip(selection, positions, origin)
+            ]
+            result[np.ix_(*positions)] = chunk[np.ix_(*local)]
+    return result
+
+
+def _default_chunk_shape(shape: Sequence[int]) -> Tuple[int, ...]:
+    """
+    Halve the longest axis of the chunk until it has at most `CHUNK_SIZE`
+    elements
+    """
+    chunk = list(shape)
+    while np.prod(chunk) > CHUNK_SIZE:
+        axis = int(np.argmax(chunk))
+        chunk[axis] = (chunk[axis] + 1) // 2
+    return tuple(chunk)
+
+
+def _chunk_ranges(shape: Sequence[int], chunk_shape: Sequence[int]) -> List[range]:
+    return [range(-(-length // size)) for length, size in zip(shape, chunk_shape)]
+
+
+def _chunk_key(index: Sequence[int]) -> str:
+    return ".".join(str(i) for i in index)
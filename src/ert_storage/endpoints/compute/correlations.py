@@ -0,0 +1,85 @@
+from uuid import UUID
+from typing import Any, Dict, List, Mapping
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import joinedload
+from ert_storage.database import Session, get_db
+from ert_storage import database_schema as ds
+from ert_storage import exceptions as exc
+from ert_storage.compute import calculate_top_correlations
+from ert_storage.compute.correlations import CORRELATION_METHODS
+from ert_storage.endpoints.records import _get_realization_dataframe
+from ert_storage.workers import run_in_worker
+
+router = APIRouter(tags=["correlations"])
+
+
+@router.get(
+    "/compute/correlations",
+    response_model=Mapping[str, List[Dict[str, Any]]],
+)
+async def get_correlations(
+    *,
+    db: Session = Depends(get_db),
+    ensemble_id: UUID,
+    method: str = "pearson",
+    top_k: int = 10,
+) -> Mapping[str, List[Dict[str, Any]]]:
+    """
+    Correlate every parameter of the ensemble with every response across
+    realizations, and return the `top_k` most strongly correlated parameters
+    for each response. `method` is either "pearson" or "spearman".
+
+    Matrix-valued records contribute one column per label, named
+    "<record name>:<label>".
+    """
+    if method not in CORRELATION_METHODS:
+        raise exc.UnprocessableError(
+            f"Correlation method must be one of {CORRELATION_METHODS}"
+        )
+    if top_k < 1:
+        raise exc.UnprocessableError("top_k must be positive")
+
+    ensemble = db.query(ds.Ensemble).filter_by(id=ensemble_id).one()
+    records = (
+        db.query(ds.Record)
+        .options(joinedload(ds.Record.f64_matrix).undefer(ds.F64Matrix.data))
+        .join(ds.RecordInfo)
+        .filter(
+            ds.RecordInfo.name.in_(
+                list(ensemble.parameter_names) + list(ensemble.response_names)
+            )
+        )
+        .filter_by(ensemble_pk=ensemble.pk, record_type=ds.RecordType.f64_matrix)
+        .all()
+    )
+    parameters = _get_realization_dataframe(
+        rec for rec in records if rec.name in ensemble.parameter_names
+    )
+    responses = _get_realization_dataframe(
+        rec for rec in records if rec.name in ensemble.response_names
+    )
+
+    realizations = parameters.dropna().index.intersection(responses.index)
+    if parameters.empty or responses.empty or len(realizations) < 2:
+        raise exc.UnprocessableError(
+            "At least two realizations with both parameters and responses are required"
+        )
+    parameters = parameters.loc[realizations]
+    responses = responses.loc[realizations]
+
+    indices, values = await run_in_worker(
+        calculate_top_correlations,
+        parameters.values,
+        responses.values,
+        top_k,
+        method,
+    )
+
+    parameter_names = parameters.columns
+    return {
+        response: [
+            {"parameter": parameter_names[index], "correlation": value}
+            for index, value in zip(indices[i].tolist(), values[i].tolist())
+        ]
+        for i, response in enumerate(responses.columns)
+    }
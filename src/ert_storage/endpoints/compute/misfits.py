@@ -10,6 +10,8 @@ from ert_storage.database import Session, get_db
 from ert_storage import database_schema as ds, json_schema as js
 from ert_storage import exceptions as exc
 from ert_storage.compute import calculate_misfits_from_pandas, misfits
+from ert_storage.ext.csv_codec import to_csv
+from ert_storage.workers import run_in_worker
 
 router = APIRouter(tags=["misfits"])
 
@@ -58,7 +60,7 @@ async def get_response_misfits(
     observation_df = None
     response_dict = {}
     for response in responses:
-        data_df = pd.DataFrame(response.f64_matrix.content)
+        data_df = pd.DataFrame(response.f64_matrix.to_numpy())
         labels = response.f64_matrix.labels
         if labels is not None:
             data_df.columns = labels[0]
@@ -73,12 +75,15 @@ async def get_response_misfits(
             )
 
     try:
-        result_df = calculate_misfits_from_pandas(
-            response_dict, observation_df, summary_misfits
+        result_df = await run_in_worker(
+            calculate_misfits_from_pandas,
+            response_dict,
+            observation_df,
+            summary_misfits,
         )
     except Exception as misfits_exc:
         raise exc.UnprocessableError(f"Unable to compute misfits: {misfits_exc}")
     return Response(
-        content=result_df.to_csv().encode(),
+        content=await run_in_worker(to_csv, result_df),
         media_type="text/csv",
     )
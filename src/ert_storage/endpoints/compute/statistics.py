@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from uuid import UUID
+from typing import Any, Iterator, List, Optional
+from fastapi import APIRouter, Depends, Header, Query, status
+from fastapi.responses import Response
+from sqlalchemy.orm import joinedload
+from ert_storage.database import Session, get_db
+from ert_storage import database_schema as ds
+from ert_storage import exceptions as exc
+from ert_storage.compute import RunningStatistics, calculate_statistics
+from ert_storage.endpoints.records import _get_record_resonse
+
+router = APIRouter(tags=["statistics"])
+
+# Number of records loaded from the database at a time
+STATISTICS_CHUNK_SIZE = 100
+
+
+@router.get(
+    "/ensembles/{ensemble_id}/records/{name}/statistics",
+    responses={
+        status.HTTP_200_OK: {
+            "description": "Statistics as rows (mean, std, min, max, then the "
+            "requested quantiles, eg. p10, p50, p90) and the record's labels as columns.",
+        }
+    },
+)
+async def get_record_statistics(
+    *,
+    db: Session = Depends(get_db),
+    ensemble_id: UUID,
+    name: str,
+    quantiles: List[float] = Query([0.1, 0.5, 0.9]),
+    running: bool = False,
+    accept: str = Header("application/json"),
+) -> Response:
+    """
+    Compute column-wise statistics of a matrix record across all realizations.
+    The rows of the matrices are the realizations, so an ensemble-wide record
+    and one record per realization are treated the same way.
+
+    If `running` is set, return the mean, std, min and max that are maintained
+    as each realization is uploaded, without reading any of the records. This
+    is cheap enough to poll while an ensemble is still being evaluated, but
+    quantiles are not available.
+    """
+    if running:
+        stats = _get_running_statistics(db, ensemble_id, name)
+        if stats is not None:
+            return await _get_record_resonse(stats, accept)
+        quantiles = []
+
+    if any(not 0.0 <= q <= 1.0 for q in quantiles):
+        raise exc.UnprocessableError(f"Quantiles {quantiles} must be within [0, 1]")
+
+    records = (
+        db.query(ds.Record)
+        .options(joinedload(ds.Record.f64_matrix).undefer(ds.F64Matrix.data))
+        .join(ds.RecordInfo)
+        .filter_by(name=name, record_type=ds.RecordType.f64_matrix)
+        .join(ds.Ensemble)
+        .filter_by(id=ensemble_id)
+        .order_by(ds.Record.realization_index)
+        .yield_per(STATISTICS_CHUNK_SIZE)
+    )
+
+    columns: Optional[List[Any]] = None
+    records_seen = 0
+
+    def chunks() -> Iterator[np.ndarray]:
+        nonlocal columns, records_seen
+        rows: List[np.ndarray] = []
+        for index, record in enumerate(records):
+            records_seen += 1
+            labels = record.f64_matrix.labels
+            record_columns = labels[0] if labels is not None else None
+            if index == 0:
+                columns = record_columns
+            elif record_columns != columns:
+                raise exc.UnprocessableError(
+                    f"Records of '{name}' do not share the same labels"
+                )
+            rows.append(np.atleast_2d(record.f64_matrix.to_numpy()))
+            if len(rows) == STATISTICS_CHUNK_SIZE:
+                yield _stack(rows, name)
+                rows = []
+        if rows:
+            yield _stack(rows, name)
+
+    try:
+        stats = calculate_statistics(chunks(), quantiles)
+    except ValueError as stats_exc:
+        if not records_seen:
+            raise exc.NotFoundError(f"No matrix records named '{name}' found")
+        raise exc.UnprocessableError(f"Unable to compute statistics: {stats_exc}")
+    if columns is not None:
+        stats.columns = columns
+    return await _get_record_resonse(stats, accept)
+
+
+def _get_running_statistics(
+    db: Session, ensemble_id: UUID, name: str
+) -> Optional[pd.DataFrame]:
+    stats = (
+        db.query(ds.RecordStatistics)
+        .join(ds.RecordInfo)
+        .filter_by(name=name, record_type=ds.RecordType.f64_matrix)
+        .join(ds.Ensemble)
+        .filter_by(id=ensemble_id)
+        .one_or_none()
+    )
+    if stats is None or not stats.is_valid or not stats.count:
+        return None
+    return RunningStatistics.from_arrays(
+        stats.count, stats.mean, stats.m2, stats.min, stats.max
+    ).to_frame(stats.labels)
+
+
+def _stack(rows: List[np.ndarray], name: str) -> np.ndarray:
+    try:
+        return np.concatenate(rows, axis=0)
+    except ValueError:
+        raise exc.UnprocessableError(
+            f"Records of '{name}' do not have the same number of columns"
+        )
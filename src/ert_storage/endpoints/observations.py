@@ -2,6 +2,7 @@ from uuid import UUID
 
 from fastapi import APIRouter, Depends, Body
 from typing import List, Any, Mapping, Optional
+from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.attributes import flag_modified
 from ert_storage.database import Session, get_db
 from ert_storage import database_schema as ds, json_schema as js
@@ -44,7 +45,7 @@ def get_observations(
     *, db: Session = Depends(get_db), experiment_id: UUID
 ) -> List[js.ObservationOut]:
     experiment = db.query(ds.Experiment).filter_by(id=experiment_id).one()
-    return [_observation_from_db(obs) for obs in experiment.observations]
+    return [_observation_from_db(obs) for obs in _get_observations(db, experiment.pk)]
 
 
 @router.get(
@@ -54,7 +55,9 @@ def get_observations_with_transformation(
     *, db: Session = Depends(get_db), ensemble_id: UUID
 ) -> List[js.ObservationOut]:
     ens = db.query(ds.Ensemble).filter_by(id=ensemble_id).one()
-    experiment = ens.experiment
+    # Loaded first, so that the observations of the transformations are found
+    # in the session without a query each
+    observations = _get_observations(db, ens.experiment_pk)
     update = ens.parent
     transformations = (
         {trans.observation.name: trans for trans in update.observation_transformations}
@@ -62,9 +65,7 @@ def get_observations_with_transformation(
         else {}
     )
 
-    return [
-        _observation_from_db(obs, transformations) for obs in experiment.observations
-    ]
+    return [_observation_from_db(obs, transformations) for obs in observations]
 
 
 @router.put("/observations/{obs_id}/userdata")
@@ -111,6 +112,17 @@ async def get_observation_userdata(
     return obs.userdata
 
 
+def _get_observations(db: Session, experiment_pk: int) -> List[ds.Observation]:
+    # The records of all observations are read in a single query
+    return (
+        db.query(ds.Observation)
+        .options(selectinload(ds.Observation.records))
+        .filter_by(experiment_pk=experiment_pk)
+        .order_by(ds.Observation.pk)
+        .all()
+    )
+
+
 def _observation_from_db(
     obs: ds.Observation, transformations: Optional[Mapping[str, Any]] = None
 ) -> js.ObservationOut:
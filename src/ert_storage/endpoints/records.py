@@ -1,10 +1,24 @@
-import json
 from uuid import uuid4, UUID
 import io
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 from enum import Enum
-from typing import Any, Mapping, Dict, Optional, List, AsyncGenerator
+from typing import (
+    Any,
+    Mapping,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    List,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+    AsyncGenerator,
+    BinaryIO,
+)
 import sqlalchemy as sa
 from fastapi import (
     APIRouter,
@@ -12,6 +26,7 @@ from fastapi import (
     Depends,
     File,
     Header,
+    Query,
     Request,
     UploadFile,
     status,
@@ -19,11 +34,21 @@ from fastapi import (
 from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.attributes import flag_modified
 from ert_storage.database import Session, get_db
 from ert_storage import database_schema as ds, json_schema as js
 from ert_storage import exceptions as exc
+from ert_storage.compute import RunningStatistics, downsample
+from ert_storage.ext.csv_codec import read_csv, to_csv
+from ert_storage.ext.json_codec import JSONResponse, dumps, loads_array
+from ert_storage.workers import run_in_worker
+from ert_storage.endpoints._request_body import (
+    parse_body,
+    read_body,
+    read_numpy,
+)
 from ert_storage.endpoints._records_blob import (
     get_blob_handler,
     get_blob_handler_from_record,
@@ -35,12 +60,68 @@ from fastapi.logger import logger
 
 router = APIRouter(tags=["record"])
 
+# Maximum number of values in a single IN clause
+BULK_QUERY_SIZE = 1000
+
 
 class ListRecords(BaseModel):
     ensemble: Mapping[str, str]
     forward_model: Mapping[str, str]
 
 
+class Precision(str, Enum):
+    f64 = "f64"
+    f32 = "f32"
+
+
+PRECISION_DESCRIPTION = """\
+Reduce the precision of floating-point data for transfer, eg. for plotting.
+With `f32`, binary formats are downcast to float32 and text formats use the
+shortest representation of the float32 value. The stored data is unchanged.
+"""
+
+DECIMALS_DESCRIPTION = """\
+Round floating-point data to this number of decimals for transfer. The stored
+data is unchanged.
+"""
+
+
+class Downsampling(str, Enum):
+    lttb = "lttb"
+    minmax = "minmax"
+
+
+MAX_POINTS_DESCRIPTION = """\
+Downsample each realization to at most this many points along the x-axis (the
+columns) for plotting. All realizations share the selected points. The
+`downsampling` method is either `lttb` (largest-triangle-three-buckets) or
+`minmax`, which keeps the extremes of each bucket.
+"""
+
+# Streamed responses are sent in chunks of about this many bytes
+STREAM_CHUNK_SIZE = 1 << 16
+
+BINARY_MIMETYPES = (
+    "application/x-numpy",
+    "application/x-npz",
+    "application/x-parquet",
+    "application/vnd.apache.arrow.stream",
+)
+
+# Formats that _get_record_resonse encodes into a single response body
+ENCODED_MIMETYPES = (
+    "application/x-numpy",
+    "text/csv",
+    "application/x-parquet",
+    "application/vnd.apache.arrow.stream",
+)
+
+STREAMING_MIMETYPES = (
+    "application/json",
+    "application/x-ndjson",
+)
+
+
 def get_record_by_name(
     *,
     db: Session = Depends(get_db),
@@ -77,13 +158,71 @@ def get_record_by_name(
     raise exc.NotFoundError(f"Record not found")
 
 
+REALIZATIONS_DESCRIPTION = """\
+Comma-separated realization indices and inclusive ranges, eg. `0,2,5-9`.
+"""
+
+# Upper bound on the number of indices in a selection, so that a range such as
+# `0-999999999` is rejected rather than expanded
+MAX_INDEX_SELECTION = 100_000
+
+
+def _parse_index_ranges(value: str) -> List[int]:
+    """
+    Parse a selection of indices such as "0,2,5-9" into a sorted list
+    """
+    indices: Set[int] = set()
+    try:
+        for part in value.split(","):
+            start, sep, stop = part.strip().partition("-")
+            if sep:
+                first, last = int(start), int(stop)
+                if first > last:
+                    raise ValueError
+                if last - first >= MAX_INDEX_SELECTION - len(indices):
+                    raise exc.UnprocessableError(
+                        f"Index selection '{value}' selects more than "
+                        f"{MAX_INDEX_SELECTION} indices"
+                    )
+                indices.update(range(first, last + 1))
+            else:
+                indices.add(int(start))
+    except ValueError:
+        raise exc.UnprocessableError(f"Invalid index selection '{value}'")
+    if len(indices) > MAX_INDEX_SELECTION:
+        raise exc.UnprocessableError(
+            f"Index selection '{value}' selects more than {MAX_INDEX_SELECTION} indices"
+        )
+    return sorted(indices)
+
+
 def get_records_by_name(
     *,
     db: Session = Depends(get_db),
     ensemble_id: UUID,
     name: str,
     realization_index: Optional[int] = None,
+    realizations: Optional[str] = Query(None, description=REALIZATIONS_DESCRIPTION),
 ) -> List[ds.Record]:
+    if realizations is not None:
+        # Only read the matrices of the selected realizations. Ensemble-wide
+        # records contain all realizations, so they are always read.
+        records = (
+            db.query(ds.Record)
+            .options(joinedload(ds.Record.f64_matrix))
+            .filter(
+                (ds.Record.realization_index == None)
+                | ds.Record.realization_index.in_(_parse_index_ranges(realizations))
+            )
+            .join(ds.RecordInfo)
+            .filter_by(name=name, record_type=ds.RecordType.f64_matrix)
+            .join(ds.Ensemble)
+            .filter_by(id=ensemble_id)
+        ).all()
+        if not records:
+            raise exc.NotFoundError(f"Record not found")
+        return records
+
     records = (
         db.query(ds.Record)
         .filter_by(realization_index=realization_index)
@@ -165,6 +304,14 @@ def new_record(
     )
 
 
+def _get_record_class(ensemble: ds.Ensemble, name: str) -> ds.RecordClass:
+    if name in ensemble.parameter_names:
+        return ds.RecordClass.parameter
+    elif name in ensemble.response_names:
+        return ds.RecordClass.response
+    return ds.RecordClass.other
+
+
 def new_record_file(
     *,
     db: Session = Depends(get_db),
@@ -181,14 +328,7 @@ def new_record_matrix(
     record: ds.Record = Depends(new_record),
     prior: Optional[str] = None,
 ) -> ds.Record:
-    ensemble = record.record_info.ensemble
-    if record.name in ensemble.parameter_names:
-        record_class = ds.RecordClass.parameter
-    elif record.name in ensemble.response_names:
-        record_class = ds.RecordClass.response
-    else:
-        record_class = ds.RecordClass.other
-
+    record_class = _get_record_class(record.record_info.ensemble, record.name)
     if prior is not None:
         if record_class is not ds.RecordClass.parameter:
             raise exc.UnprocessableError(
@@ -198,6 +338,7 @@ def new_record_matrix(
 
     record.record_info.record_class = record_class
     record.record_info.record_type = ds.RecordType.f64_matrix
+    record.record_info.statistics = ds.RecordStatistics()
     return record
 
 
@@ -287,34 +428,8 @@ async def post_ensemble_record_matrix(
         )
         content_type = "text/csv"
 
-    labels = None
-
     try:
-        if content_type == "application/json":
-            content = np.array(await request.json(), dtype=np.float64)
-        elif content_type == "application/x-numpy":
-            from numpy.lib.format import read_array
-
-            stream = io.BytesIO(await request.body())
-            content = read_array(stream)
-        elif content_type == "text/csv":
-            stream = io.BytesIO(await request.body())
-            df = pd.read_csv(stream, index_col=0, float_precision="round_trip")
-            content = df.values
-            labels = [
-                [str(v) for v in df.columns.values],
-                [str(v) for v in df.index.values],
-            ]
-        elif content_type == "application/x-parquet":
-            stream = io.BytesIO(await request.body())
-            df = pd.read_parquet(stream)
-            content = df.values
-            labels = [
-                [v for v in df.columns.values],
-                [v for v in df.index.values],
-            ]
-        else:
-            raise ValueError()
+        content, labels = await _parse_matrix(content_type, request)
     except ValueError:
         if record.realization_index is None:
             message = f"Ensemble-wide record '{record.name}' for needs to be a matrix"
@@ -334,12 +449,265 @@ async def post_ensemble_record_matrix(
                 "must have dimensionality of at least 2"
             )
 
-    matrix_obj = ds.F64Matrix(content=content.tolist(), labels=labels)
+    matrix_obj = await run_in_worker(
+        ds.F64Matrix.from_numpy, content, labels, record.realization_index is None
+    )
 
     record.f64_matrix = matrix_obj
     return _create_record(db, record)
 
 
+async def _parse_matrix(
+    content_type: str, request: Request
+) -> Tuple[np.ndarray, Optional[List[List[Any]]]]:
+    """
+    Parse the body of a matrix upload into its content and its labels, if the
+    format has them. Raises ValueError if the body is not a matrix.
+    """
+    if content_type == "application/json":
+        return await run_in_worker(loads_array, await read_body(request)), None
+    elif content_type == "application/x-numpy":
+        return await read_numpy(request), None
+    elif content_type == "text/csv":
+        df = await parse_body(request, read_csv)
+        # CSV does not carry a dtype, so it is always float64
+        df = df.astype(np.float64)
+        return df.values, [
+            [str(v) for v in df.columns.values],
+            [str(v) for v in df.index.values],
+        ]
+    elif content_type == "application/x-parquet":
+        df = await run_in_worker(_read_parquet, await read_body(request))
+        return _dataframe_values(df), [
+            [v for v in df.columns.values],
+            [v for v in df.index.values],
+        ]
+    elif content_type == "application/vnd.apache.arrow.stream":
+        df = await parse_body(request, _read_arrow_stream)
+        return _dataframe_values(df), [
+            [str(v) for v in df.columns.values],
+            [str(v) for v in df.index.values],
+        ]
+    raise ValueError(f"Unsupported content type '{content_type}'")
+
+
+def _read_parquet(content: bytes) -> pd.DataFrame:
+    return pd.read_parquet(io.BytesIO(content))
+
+
+def _read_arrow_stream(source: BinaryIO) -> pd.DataFrame:
+    return pa.ipc.open_stream(source).read_all().to_pandas()
+
+
+def _dataframe_values(df: pd.DataFrame) -> np.ndarray:
+    """
+    The values of a dataframe, keeping their dtype when all columns share one
+    """
+    values = df.values
+    if values.dtype == object:
+        values = values.astype(np.float64)
+    return values
+
+
+@router.post(
+    "/ensembles/{ensemble_id}/records/{name}/append", response_model=js.RecordOut
+)
+async def append_ensemble_record_matrix(
+    *,
+    db: Session = Depends(get_db),
+    ensemble_id: UUID,
+    name: str,
+    realization_index: int,
+    content_type: str = Header("application/json"),
+    request: Request,
+) -> Any:
+    """
+    Append columns, such as the newest timesteps of a running forward model, to
+    the matrix of the given realization. The record is created by the first
+    append. For labeled formats the columns are the new x-axis labels.
+
+    Appended columns are stored as separate segments, so the existing data is
+    never rewritten, and each append is visible to readers once it has been
+    committed as a whole.
+    """
+    try:
+        content, labels = await _parse_matrix(content_type, request)
+    except ValueError:
+        raise exc.UnprocessableError(
+            f"Forward-model record '{name}' for realization {realization_index} needs to be a matrix"
+        )
+
+    record = (
+        db.query(ds.Record)
+        .filter_by(realization_index=realization_index)
+        .join(ds.RecordInfo)
+        .filter_by(name=name)
+        .join(ds.Ensemble)
+        .filter_by(id=ensemble_id)
+        .one_or_none()
+    )
+    if record is None:
+        record = new_record_matrix(
+            db=db,
+            record=new_record(
+                db=db,
+                ensemble_id=ensemble_id,
+                name=name,
+                realization_index=realization_index,
+            ),
+        )
+        # Appended segments are float64, so the matrix is as well
+        record.f64_matrix = ds.F64Matrix.from_numpy(content.astype(np.float64), labels)
+        return _create_record(db, record)
+
+    if record.record_type != ds.RecordType.f64_matrix:
+        raise exc.ConflictError(f"Record '{name}' is not a matrix")
+
+    # Lock the matrix so that concurrent appends are ordered
+    matrix = (
+        db.query(ds.F64Matrix)
+        .filter_by(pk=record.f64_matrix_pk)
+        .with_for_update()
+        .populate_existing()
+        .one()
+    )
+    if matrix.content is None:
+        raise exc.ConflictError(
+            f"Record '{name}' is not a float64 matrix and cannot be appended to"
+        )
+    leading_shape = np.shape(matrix.content)[:-1]
+    try:
+        if content.ndim == 1:
+            content = content.reshape(leading_shape + (-1,))
+    except ValueError:
+        pass
+    if content.ndim == 0 or content.shape[:-1] != leading_shape:
+        raise exc.UnprocessableError(
+            f"Appended data of shape {content.shape} does not match record '{name}'"
+        )
+    if (matrix.labels is None) != (labels is None):
+        raise exc.UnprocessableError(
+            f"Appended data must be labeled if and only if record '{name}' is labeled"
+        )
+    if matrix.labels is not None and labels is not None:
+        if set(labels[0]) & set(matrix.labels[0]):
+            raise exc.ConflictError(
+                f"Some of the appended labels already exist in record '{name}'"
+            )
+        matrix.labels = [list(matrix.labels[0]) + list(labels[0]), matrix.labels[1]]
+
+    offset = np.shape(matrix.to_numpy())[-1]
+    db.add(
+        ds.F64MatrixSegment(
+            f64_matrix_pk=matrix.pk,
+            segment_index=matrix.segment_count,
+            content=content.tolist(),
+        )
+    )
+    matrix.segment_count += 1
+    try:
+        db.flush()
+    except IntegrityError:
+        # Another append of the same realization came first, where the
+        # database doesn't support locking the matrix
+        db.rollback()
+        raise exc.ConflictError(
+            f"Record '{name}' was appended to concurrently, try again"
+        )
+
+    _append_record_statistics(
+        db,
+        record.record_info_pk,
+        content,
+        offset,
+        matrix.labels[0] if matrix.labels is not None else None,
+    )
+    db.commit()
+    return record
+
+
+REALIZATION_MATRICES_DESCRIPTION = """\
+The first axis of the uploaded data is the realization:
+
+- `application/json` and `application/x-numpy`: an array where `data[i]` is the
+  matrix of realization `realization_index[i]`
+- `text/csv`, `application/x-parquet`: a dataframe with one row per realization,
+  indexed by realization index, with the labels as columns
+- `application/vnd.apache.arrow.stream`: a table with a `realization_index`
+  column and the labels as the remaining columns
+
+If `realization_index` is not given, the realization indices are taken from the
+dataframe index, or are `0..N-1` for arrays.
+"""
+
+
+@router.post(
+    "/ensembles/{ensemble_id}/records/{name}/matrices",
+    response_model=Mapping[str, List[UUID]],
+    description=REALIZATION_MATRICES_DESCRIPTION,
+)
+async def post_ensemble_record_matrices(
+    *,
+    db: Session = Depends(get_db),
+    ensemble_id: UUID,
+    name: str,
+    realization_index: Optional[List[int]] = Query(None),
+    content_type: str = Header("application/json"),
+    request: Request,
+) -> Mapping[str, List[UUID]]:
+    """
+    Assign matrices to many realizations of the `name` record in one request.
+    Returns the ids of the created records in realization order.
+    """
+    try:
+        content, columns, index = await _parse_realization_matrices(
+            content_type, request
+        )
+    except ValueError:
+        raise exc.UnprocessableError(
+            f"Record '{name}' needs to be a matrix for each realization"
+        )
+
+    ensemble = db.query(ds.Ensemble).filter_by(id=ensemble_id).one()
+    realizations = realization_index or index or list(range(len(content)))
+    return _create_realization_records(
+        db, ensemble, {name: (content, columns, realizations)}
+    )
+
+
+@router.post(
+    "/ensembles/{ensemble_id}/records/matrices",
+    response_model=Mapping[str, List[UUID]],
+)
+async def post_ensemble_records_matrices(
+    *,
+    db: Session = Depends(get_db),
+    ensemble_id: UUID,
+    realization_index: Optional[List[int]] = Query(None),
+    request: Request,
+) -> Mapping[str, List[UUID]]:
+    """
+    Assign matrices to many realizations of many records in one request. The
+    body is an `application/x-npz` archive with one array per record name,
+    where the first axis of each array is the realization.
+    """
+    try:
+        with np.load(io.BytesIO(await read_body(request))) as npz:
+            contents = {key: npz[key] for key in npz.files}
+    except (OSError, ValueError):
+        raise exc.UnprocessableError("Body needs to be an npz archive of matrices")
+
+    ensemble = db.query(ds.Ensemble).filter_by(id=ensemble_id).one()
+    return _create_realization_records(
+        db,
+        ensemble,
+        {
+            name: (content, None, realization_index or list(range(len(content))))
+            for name, content in contents.items()
+        },
+    )
+
+
 @router.put("/ensembles/{ensemble_id}/records/{name}/userdata")
 async def replace_record_userdata(
     *,
@@ -458,6 +826,13 @@ To parse data using Python, assuming ERT Storage is running on `http://localhost
 ```
 """
 
+GET_NDJSON_DESCRIPTION = """\
+One JSON object per line and realization, with the realization index and the
+row of data, eg. `{"realization_index":0,"data":[11.5,12.5,13.5]}`. Like
+`application/json`, the response is streamed, so that it can be consumed one
+realization at a time.
+"""
+
 
 @router.get(
     "/ensembles/{ensemble_id}/records/{name}",
@@ -496,6 +871,14 @@ To parse data using Python, assuming ERT Storage is running on `http://localhost
                         }
                     }
                 },
+                "application/x-ndjson": {
+                    "examples": {
+                        "success": {
+                            "summary": "Fetch data as one JSON line per realization",
+                            "description": GET_NDJSON_DESCRIPTION,
+                        }
+                    }
+                },
             },
         }
     },
@@ -507,7 +890,15 @@ async def get_ensemble_record(
     records: List[ds.Record] = Depends(get_records_by_name),
     accept: str = Header("application/json"),
     realization_index: Optional[int] = None,
+    realizations: Optional[str] = Query(None, description=REALIZATIONS_DESCRIPTION),
     label: Optional[str] = None,
+    labels: Optional[List[str]] = Query(None),
+    label_start: Optional[str] = None,
+    label_end: Optional[str] = None,
+    precision: Precision = Query(Precision.f64, description=PRECISION_DESCRIPTION),
+    decimals: Optional[int] = Query(None, ge=0, description=DECIMALS_DESCRIPTION),
+    max_points: Optional[int] = Query(None, ge=3, description=MAX_POINTS_DESCRIPTION),
+    downsampling: Downsampling = Downsampling.lttb,
 ) -> Any:
     """
     Get record with a given `name`. If `realization_index` is not set, look for
@@ -517,6 +908,12 @@ async def get_ensemble_record(
     If label is provided it is assumed the record data is of the form {"a": 1, "b": 2}
     and will return only the data for the provided label (i.e. label = "a" -> return: [[1]])
 
+    A subset of the matrix can be selected with `realizations` (eg. `0,2,5-9`),
+    `labels` (repeated for each label) and the inclusive label range
+    `label_start`/`label_end`. Numeric and date labels, such as the x-axis of a
+    response, are compared by value. Only the records of the selected
+    realizations are read, and the rows are always the realization indices.
+
 
     Records support multiple data formats. In particular:
     - Matrix:
@@ -534,9 +931,39 @@ async def get_ensemble_record(
     if _type == ds.RecordType.file:
         return await bh.get_content(records[0])
 
+    if (
+        realizations is not None
+        or labels is not None
+        or label_start is not None
+        or label_end is not None
+    ):
+        if realization_index is not None or label is not None:
+            raise exc.UnprocessableError(
+                "Use either 'realization_index' and 'label' or the selection "
+                "parameters 'realizations', 'labels', 'label_start' and 'label_end'"
+            )
+        data_frame = _get_selected_dataframe(
+            db,
+            records,
+            _parse_index_ranges(realizations) if realizations is not None else None,
+            labels,
+            label_start,
+            label_end,
+        )
+        data_frame = await run_in_worker(
+            _prepare_dataframe,
+            data_frame,
+            accept,
+            max_points,
+            downsampling,
+            precision,
+            decimals,
+        )
+        return await _get_record_resonse(data_frame, accept)
+
     df_list = []
     for record in records:
-        data_df = _get_record_dataframe(record, realization_index, label)
+        data_df = _get_record_dataframe(db, record, realization_index, label)
         df_list.append(data_df)
 
     # Combine data for each realization into one dataframe
@@ -544,9 +971,140 @@ async def get_ensemble_record(
     # Sort data by realization number
     data_frame.sort_index(axis=0, inplace=True)
 
+    data_frame = await run_in_worker(
+        _prepare_dataframe,
+        data_frame,
+        accept,
+        max_points,
+        downsampling,
+        precision,
+        decimals,
+    )
     return await _get_record_resonse(data_frame, accept)
 
 
+RECORD_QUERY_DESCRIPTION = """\
+Data of each record is a matrix where the rows are realizations and the columns
+are labels. The formats are:
+
+- `application/json`: an object mapping each record name to an object with
+  `realizations`, `labels` and `data`
+- `application/x-npz`: a `numpy.savez` archive where `<name>` is the matrix,
+  `<name>.realizations` the realization indices of its rows and `<name>.labels`
+  the labels of its columns
+- `application/vnd.apache.arrow.stream`: a table in long format with the
+  columns `name`, `realization_index`, `label` and `value`
+"""
+
+
+@router.post(
+    "/ensembles/{ensemble_id}/records/query",
+    responses={
+        status.HTTP_200_OK: {
+            "content": {
+                "application/json": {},
+                "application/x-npz": {},
+                "application/vnd.apache.arrow.stream": {},
+            },
+            "description": RECORD_QUERY_DESCRIPTION,
+        }
+    },
+)
+async def query_ensemble_records(
+    *,
+    db: Session = Depends(get_db),
+    ensemble_id: UUID,
+    query: js.RecordQueryIn,
+    accept: str = Header("application/json"),
+    precision: Precision = Query(Precision.f64, description=PRECISION_DESCRIPTION),
+    decimals: Optional[int] = Query(None, ge=0, description=DECIMALS_DESCRIPTION),
+    max_points: Optional[int] = Query(None, ge=3, description=MAX_POINTS_DESCRIPTION),
+    downsampling: Downsampling = Downsampling.lttb,
+) -> Any:
+    """
+    Fetch the data of many matrix records of an ensemble at once, optionally
+    only for some realizations and labels. All records are loaded with a
+    single query.
+    """
+    records_query = (
+        db.query(ds.Record)
+        .options(joinedload(ds.Record.f64_matrix).undefer(ds.F64Matrix.data))
+        .join(ds.RecordInfo)
+        .filter(ds.RecordInfo.name.in_(query.names))
+        .filter_by(record_type=ds.RecordType.f64_matrix)
+        .join(ds.Ensemble)
+        .filter_by(id=ensemble_id)
+    )
+    if query.realization_indices is not None:
+        records_query = records_query.filter(
+            (ds.Record.realization_index == None)
+            | ds.Record.realization_index.in_(query.realization_indices)
+        )
+
+    by_name: Dict[str, List[ds.Record]] = {}
+    for record in records_query:
+        by_name.setdefault(record.name, []).append(record)
+    missing = [name for name in query.names if name not in by_name]
+    if missing:
+        raise exc.NotFoundError(f"Records {missing} not found")
+
+    frames = {}
+    for name in query.names:
+        df = _get_realization_dataframe(by_name[name], prefix_name=False)
+        if query.realization_indices is not None:
+            df = df.loc[df.index.isin(query.realization_indices)]
+        if query.labels is not None:
+            df = df.loc[:, df.columns.isin(query.labels)]
+        frames[name] = _reduce_precision(
+            _downsample_dataframe(df, max_points, downsampling),
+            accept,
+            precision,
+            decimals,
+        )
+
+    if accept == "application/x-npz":
+        arrays = {}
+        for name, df in frames.items():
+            arrays[name] = df.values
+            arrays[f"{name}.realizations"] = df.index.values.astype(np.int64)
+            arrays[f"{name}.labels"] = np.array([str(c) for c in df.columns])
+        stream = io.BytesIO()
+        np.savez(stream, **arrays)
+        return Response(content=stream.getvalue(), media_type=accept)
+    if accept == "application/vnd.apache.arrow.stream":
+        table = pa.concat_tables(
+            [
+                pa.table(
+                    {
+                        "name": pa.array(
+                            [name] * df.size, pa.string()
+                        ).dictionary_encode(),
+                        "realization_index": np.repeat(df.index.values, df.shape[1]),
+                        "label": pa.array(
+                            [str(c) for c in df.columns] * df.shape[0], pa.string()
+                        ).dictionary_encode(),
+                        "value": df.values.reshape(-1),
+                    }
+                )
+                for name, df in frames.items()
+            ]
+        ).unify_dictionaries()
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(content=sink.getvalue().to_pybytes(), media_type=accept)
+    return JSONResponse(
+        {
+            name: {
+                "realizations": df.index.values,
+                "labels": df.columns.tolist(),
+                "data": df.values,
+            }
+            for name, df in frames.items()
+        }
+    )
+
+
 @router.get("/ensembles/{ensemble_id}/records/{name}/labels", response_model=List[str])
 async def get_record_labels(
     *,
@@ -588,24 +1146,28 @@ async def get_ensemble_parameters(
     *, db: Session = Depends(get_db), ensemble_id: UUID
 ) -> List[Dict[str, Any]]:
     ensemble = db.query(ds.Ensemble).filter_by(id=ensemble_id).one()
+    # The labels of the first record of each parameter, read in one query
+    first_records = (
+        db.query(sa.func.min(ds.Record.pk))
+        .join(ds.RecordInfo)
+        .filter(ds.RecordInfo.name.in_(list(ensemble.parameter_names)))
+        .filter_by(ensemble_pk=ensemble.pk)
+        .group_by(ds.Record.record_info_pk)
+    )
+    labels: Dict[str, Optional[List[List[str]]]] = dict(
+        db.query(ds.RecordInfo.name, ds.F64Matrix.labels)
+        .select_from(ds.Record)
+        .join(ds.RecordInfo)
+        .join(ds.F64Matrix)
+        .filter(ds.Record.pk.in_(first_records))
+    )
+
     parameters = []
     for name in ensemble.parameter_names:
         param = {"name": name, "labels": []}
-        record = (
-            db.query(ds.Record)
-            .join(ds.RecordInfo)
-            .filter_by(name=name)
-            .join(ds.Ensemble)
-            .filter_by(id=ensemble_id)
-            .first()
-        )
-        if record is None:
-            parameters.append(param)
-            continue
-
-        if record.f64_matrix and record.f64_matrix.labels:
-            param["labels"] = record.f64_matrix.labels[0]
-
+        record_labels = labels.get(name)
+        if record_labels:
+            param["labels"] = record_labels[0]
         parameters.append(param)
     return parameters
 
@@ -620,6 +1182,10 @@ async def get_ensemble_records(
         rec.name: rec
         for rec in (
             db.query(ds.Record)
+            .options(
+                contains_eager(ds.Record.record_info),
+                selectinload(ds.Record.observations),
+            )
             .join(ds.RecordInfo)
             .join(ds.Ensemble)
             .filter_by(id=ensemble_id)
@@ -639,6 +1205,10 @@ async def get_record_data(
     db: Session = Depends(get_db),
     record_id: UUID,
     accept: Optional[str] = Header(default="application/json"),
+    precision: Precision = Query(Precision.f64, description=PRECISION_DESCRIPTION),
+    decimals: Optional[int] = Query(None, ge=0, description=DECIMALS_DESCRIPTION),
+    max_points: Optional[int] = Query(None, ge=3, description=MAX_POINTS_DESCRIPTION),
+    downsampling: Downsampling = Downsampling.lttb,
 ) -> Any:
     if accept == "application/x-dataframe":
         logger.warning(
@@ -651,7 +1221,16 @@ async def get_record_data(
         bh = get_blob_handler_from_record(db, record)
         return await bh.get_content(record)
 
-    dataframe = _get_record_dataframe(record, None, None)
+    dataframe = _get_record_dataframe(db, record, None, None)
+    dataframe = await run_in_worker(
+        _prepare_dataframe,
+        dataframe,
+        accept,
+        max_points,
+        downsampling,
+        precision,
+        decimals,
+    )
     return await _get_record_resonse(dataframe, accept)
 
 
@@ -665,6 +1244,10 @@ def get_ensemble_responses(
         rec.name: rec
         for rec in (
             db.query(ds.Record)
+            .options(
+                contains_eager(ds.Record.record_info),
+                selectinload(ds.Record.observations),
+            )
             .join(ds.RecordInfo)
             .filter_by(record_class=ds.RecordClass.response)
             .join(ds.Ensemble)
@@ -675,6 +1258,7 @@ def get_ensemble_responses(
 
 
 def _get_record_dataframe(
+    db: Session,
     record: ds.Record,
     realization_index: Optional[int],
     label: Optional[str],
@@ -690,16 +1274,22 @@ def _get_record_dataframe(
     if content_is_labeled and label_specified and label not in labels[0]:
         raise exc.UnprocessableError(f"Record label '{label}' not found!")
 
+    matrix = record.f64_matrix
     if realization_index is None or record.realization_index is not None:
-        matrix_content = record.f64_matrix.content
-    elif record.realization_index is None:
-        matrix_content = record.f64_matrix.content[realization_index]
-    if not isinstance(matrix_content[0], List):
-        matrix_content = [matrix_content]
+        matrix_content = matrix.to_numpy()
+    elif matrix.is_row_addressable:
+        matrix_content = _read_matrix_rows(db, matrix, [realization_index])[0]
+    else:
+        matrix_content = matrix.to_numpy()[realization_index]
+    if matrix_content.ndim < 2:
+        matrix_content = np.atleast_2d(matrix_content)
+    elif matrix_content.ndim > 2:
+        # Dataframes are two-dimensional, so keep the inner axes as lists
+        matrix_content = matrix_content.tolist()
 
     if content_is_labeled and label_specified:
         lbl_idx = labels[0].index(label)
-        data = pd.DataFrame([[c[lbl_idx]] for c in matrix_content])
+        data = pd.DataFrame(np.asarray(matrix_content)[:, [lbl_idx]])
         data.columns = [label]
     elif content_is_labeled:
         data = pd.DataFrame(matrix_content)
@@ -719,41 +1309,355 @@ def _get_record_dataframe(
     return data
 
 
+def _get_realization_dataframe(
+    records: Iterable[ds.Record], prefix_name: bool = True
+) -> pd.DataFrame:
+    """
+    Combine matrix records into a single dataframe indexed by realization. The
+    rows of ensemble-wide records are the realizations.
+
+    If `prefix_name` is set, the columns are named "<record name>:<label>" so
+    that different records can be combined. Otherwise the columns are the
+    labels of the records.
+    """
+    frames: Dict[str, List[pd.DataFrame]] = {}
+    for record in records:
+        content = record.f64_matrix.to_numpy()
+        labels = record.f64_matrix.labels
+        if record.realization_index is not None:
+            content = content.reshape(1, -1)
+            index = [record.realization_index]
+        else:
+            content = content.reshape(content.shape[0], -1)
+            index = list(range(content.shape[0]))
+
+        if not prefix_name:
+            has_labels = labels is not None and len(labels[0]) == content.shape[1]
+            columns = labels[0] if has_labels else list(range(content.shape[1]))
+        elif labels is not None and len(labels[0]) == content.shape[1]:
+            columns = [f"{record.name}:{label}" for label in labels[0]]
+        elif content.shape[1] == 1:
+            columns = [record.name]
+        else:
+            columns = [f"{record.name}:{i}" for i in range(content.shape[1])]
+        frames.setdefault(record.name, []).append(
+            pd.DataFrame(content, index=index, columns=columns)
+        )
+
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(
+        [pd.concat(dfs, axis=0) for dfs in frames.values()], axis=1
+    ).sort_index()
+
+
+def _get_selected_dataframe(
+    db: Session,
+    records: Iterable[ds.Record],
+    realizations: Optional[List[int]],
+    labels: Optional[List[str]],
+    label_start: Optional[str],
+    label_end: Optional[str],
+) -> pd.DataFrame:
+    """
+    Combine matrix records into a dataframe indexed by realization, keeping
+    only the selected realizations and columns. Columns are selected before
+    the data is converted to a dataframe.
+    """
+    frames = []
+    for record in records:
+        if record.record_info.record_type != ds.RecordType.f64_matrix:
+            raise exc.ExpectationError("Non matrix record not supported")
+        matrix = record.f64_matrix
+        if record.realization_index is None and matrix.is_row_addressable:
+            # Only read the selected rows, and the range of columns that
+            # contains the selected columns
+            index = np.arange(matrix.shape[0])
+            if realizations is not None:
+                index = index[np.isin(index, realizations)]
+            columns = _matrix_columns(matrix, matrix.shape[1])
+            selected = _select_labels(columns, labels, label_start, label_end)
+            start, stop = (selected[0], selected[-1] + 1) if len(selected) else (0, 0)
+            content = _read_matrix_rows(db, matrix, index, start, stop)
+            frames.append(
+                pd.DataFrame(
+                    content[:, selected - start],
+                    index=index,
+                    columns=[columns[i] for i in selected],
+                )
+            )
+            continue
+
+        content = matrix.to_numpy()
+        if record.realization_index is not None:
+            content = content.reshape(1, -1)
+            index = np.array([record.realization_index])
+        else:
+            content = content.reshape(content.shape[0], -1)
+            index = np.arange(content.shape[0])
+
+        columns = _matrix_columns(matrix, content.shape[1])
+        selected = _select_labels(columns, labels, label_start, label_end)
+
+        rows = np.ones(len(index), dtype=bool)
+        if realizations is not None:
+            rows = np.isin(index, realizations)
+        frames.append(
+            pd.DataFrame(
+                content[np.ix_(rows, selected)],
+                index=index[rows],
+                columns=[columns[i] for i in selected],
+            )
+        )
+
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, axis=0).sort_index()
+
+
+def _matrix_columns(matrix: ds.F64Matrix, count: int) -> List[Any]:
+    if matrix.labels is not None:
+        return list(matrix.labels[0])
+    return list(range(count))
+
+
+def _read_matrix_rows(
+    db: Session,
+    matrix: ds.F64Matrix,
+    rows: Union[Sequence[int], np.ndarray],
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Read columns `start:stop` of the given rows of a row-addressable matrix,
+    without loading the rest of it
+    """
+    height, width = matrix.shape
+    start = int(start)
+    stop = width if stop is None else int(stop)
+    if any(not 0 <= row < height for row in rows):
+        raise exc.NotFoundError(
+            f"Realization index out of range for matrix with {height} rows"
+        )
+    dtype = matrix.numpy_dtype
+    itemsize = dtype.itemsize
+    length = (stop - start) * itemsize
+    buffers: List[bytes] = []
+    for chunk in range(0, len(rows), BULK_QUERY_SIZE):
+        # SQL strings are 1-indexed
+        slices = [
+            sa.func.substr(
+                ds.F64Matrix.data, (int(row) * width + start) * itemsize + 1, length
+            )
+            for row in rows[chunk : chunk + BULK_QUERY_SIZE]
+        ]
+        buffers.extend(db.query(*slices).filter(ds.F64Matrix.pk == matrix.pk).one())
+    return np.frombuffer(b"".join(buffers), dtype=dtype).reshape(
+        len(rows), stop - start
+    )
+
+
+def _select_labels(
+    columns: Sequence[Any],
+    labels: Optional[List[str]],
+    label_start: Optional[str],
+    label_end: Optional[str],
+) -> np.ndarray:
+    """
+    Find the positions of the columns that are in `labels` and within the
+    inclusive range [`label_start`, `label_end`]. Labels are compared as
+    numbers or dates when all of them can be parsed as such.
+    """
+    selected = np.ones(len(columns), dtype=bool)
+    if labels is not None:
+        selected &= np.isin([str(column) for column in columns], labels)
+    if label_start is not None or label_end is not None:
+        values, start, end = _comparable_labels(columns, label_start, label_end)
+        if start is not None:
+            selected &= values >= start
+        if end is not None:
+            selected &= values <= end
+    return np.flatnonzero(selected)
+
+
+def _comparable_labels(
+    columns: Sequence[Any], start: Optional[str], end: Optional[str]
+) -> Tuple[np.ndarray, Any, Any]:
+    bounds = [bound for bound in (start, end) if bound is not None]
+    for convert in (pd.to_numeric, pd.to_datetime):
+        try:
+            values = convert(pd.Series([str(column) for column in columns]))
+            converted = convert(pd.Series(bounds))
+        except (ValueError, TypeError):
+            continue
+        it = iter(converted)
+        return (
+            values.values,
+            next(it) if start is not None else None,
+            next(it) if end is not None else None,
+        )
+    return np.array([str(column) for column in columns]), start, end
+
+
+def _downsample_dataframe(
+    dataframe: pd.DataFrame,
+    max_points: Optional[int],
+    method: Downsampling = Downsampling.lttb,
+) -> pd.DataFrame:
+    """
+    Keep at most `max_points` of the columns of `dataframe`, where the rows are
+    realizations and the columns are the x-axis
+    """
+    if max_points is None or dataframe.shape[1] <= max_points:
+        return dataframe
+    selected = downsample(
+        _label_axis(dataframe.columns), dataframe.values, max_points, method.value
+    )
+    return dataframe.iloc[:, selected]
+
+
+def _label_axis(columns: Sequence[Any]) -> np.ndarray:
+    """
+    Position of each label along the x-axis: its value if all labels are
+    numbers or dates, otherwise its order
+    """
+    labels = pd.Series([str(column) for column in columns])
+    for convert in (pd.to_numeric, pd.to_datetime):
+        try:
+            values = np.asarray(convert(labels))
+        except (ValueError, TypeError):
+            continue
+        if values.dtype.kind == "M":
+            values = values.astype(np.int64)
+        return values.astype(np.float64)
+    return np.arange(len(columns), dtype=np.float64)
+
+
+def _reduce_precision(
+    dataframe: pd.DataFrame,
+    accept: Optional[str],
+    precision: Precision = Precision.f64,
+    decimals: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Round and/or downcast floating-point data before it is encoded as `accept`
+    """
+    if precision is Precision.f64 and decimals is None:
+        return dataframe
+    values = dataframe.values
+    if values.dtype.kind != "f":
+        return dataframe
+    if decimals is not None:
+        values = np.round(values, decimals)
+    if precision is Precision.f32:
+        values = values.astype(np.float32)
+        if accept not in BINARY_MIMETYPES:
+            # Text is written from float64, so round-trip through the shortest
+            # string that identifies the float32 value
+            values = values.astype(str).astype(np.float64)
+    return pd.DataFrame(values, index=dataframe.index, columns=dataframe.columns)
+
+
+def _prepare_dataframe(
+    dataframe: pd.DataFrame,
+    accept: Optional[str],
+    max_points: Optional[int],
+    downsampling: Downsampling,
+    precision: Precision,
+    decimals: Optional[int],
+) -> pd.DataFrame:
+    return _reduce_precision(
+        _downsample_dataframe(dataframe, max_points, downsampling),
+        accept,
+        precision,
+        decimals,
+    )
+
+
 async def _get_record_resonse(
     dataframe: pd.DataFrame,
     accept: Optional[str],
 ) -> Response:
+    if accept in ENCODED_MIMETYPES:
+        # Encoding is done in the worker pool, so that large matrices don't
+        # block the event loop
+        content = await run_in_worker(_encode_dataframe, dataframe, accept)
+        return Response(content=content, media_type=accept)
+    if accept == "application/x-ndjson":
+        return StreamingResponse(
+            _stream_ndjson(dataframe), media_type="application/x-ndjson"
+        )
+    else:
+        if dataframe.values.shape[0] == 1:
+            return JSONResponse(dataframe.values[0])
+        return StreamingResponse(
+            _stream_json_rows(dataframe.values), media_type="application/json"
+        )
+
+
+def _encode_dataframe(dataframe: pd.DataFrame, accept: str) -> bytes:
     if accept == "application/x-numpy":
         from numpy.lib.format import write_array
 
+        values = dataframe.values
+        if values.dtype == object:
+            values = np.array(values.tolist())
         stream = io.BytesIO()
-        write_array(stream, np.array(dataframe.values.tolist()))
-
-        return Response(
-            content=stream.getvalue(),
-            media_type=accept,
-        )
+        write_array(stream, values)
+        return stream.getvalue()
     if accept == "text/csv":
-        return Response(
-            content=dataframe.to_csv().encode(),
-            media_type=accept,
-        )
+        return to_csv(dataframe)
     if accept == "application/x-parquet":
         stream = io.BytesIO()
-        dataframe.to_parquet(stream)
-        return Response(
-            content=stream.getvalue(),
-            media_type=accept,
+        # Parquet requires the column names to be strings
+        dataframe.set_axis([str(c) for c in dataframe.columns], axis=1).to_parquet(
+            stream
         )
-    else:
-        if dataframe.values.shape[0] == 1:
-            content = dataframe.values[0].tolist()
-        else:
-            content = dataframe.values.tolist()
-        return Response(
-            content=json.dumps(content),
-            media_type="application/json",
+        return stream.getvalue()
+    if accept == "application/vnd.apache.arrow.stream":
+        table = pa.Table.from_pandas(
+            dataframe.set_axis([str(c) for c in dataframe.columns], axis=1)
         )
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    raise ValueError(f"Unsupported content type '{accept}'")
+
+
+def _stream_json_rows(values: np.ndarray) -> Iterator[bytes]:
+    """
+    Encode a matrix as a JSON array of its rows, one row at a time. Starlette
+    runs synchronous iterators in a thread pool, so that encoding a large
+    matrix doesn't block the event loop.
+    """
+    chunk = [b"["]
+    size = 1
+    for i, row in enumerate(values):
+        if i > 0:
+            chunk.append(b",")
+        chunk.append(dumps(row))
+        size += len(chunk[-1])
+        if size >= STREAM_CHUNK_SIZE:
+            yield b"".join(chunk)
+            chunk = []
+            size = 0
+    chunk.append(b"]")
+    yield b"".join(chunk)
+
+
+def _stream_ndjson(dataframe: pd.DataFrame) -> Iterator[bytes]:
+    chunk: List[bytes] = []
+    size = 0
+    for index, row in zip(dataframe.index, dataframe.values):
+        chunk.append(dumps({"realization_index": index, "data": row}) + b"\n")
+        size += len(chunk[-1])
+        if size >= STREAM_CHUNK_SIZE:
+            yield b"".join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b"".join(chunk)
 
 
 def _create_record(
@@ -763,7 +1667,7 @@ def _create_record(
     nested = db.begin_nested()
     try:
         db.add(record)
-        db.commit()
+        db.flush()
     except IntegrityError:
         # Assuming this is a UNIQUE constraint failure due to an existing
         # record_info with the same name and ensemble. Try to fetch the
@@ -794,9 +1698,303 @@ def _create_record(
             record_info=old_record_info,
             f64_matrix=record.f64_matrix,
             file=record.file,
+            chunked_array=record.chunked_array,
             realization_index=record.realization_index,
         )
         db.add(record)
-        db.commit()
+
+    if record.record_type == ds.RecordType.f64_matrix:
+        _update_record_statistics(
+            db,
+            record.record_info,
+            [(record.f64_matrix.to_numpy(), record.f64_matrix.labels)],
+        )
+    db.commit()
 
     return record
+
+
+async def _parse_realization_matrices(
+    content_type: str, request: Request
+) -> Tuple[Any, Optional[List[Any]], Optional[List[int]]]:
+    """
+    Parse the body of a multi-realization upload into the data, where the first
+    axis is the realization, and the column labels and realization indices if
+    the format has them.
+    """
+    df: pd.DataFrame
+    if content_type == "application/json":
+        return await run_in_worker(loads_array, await read_body(request)), None, None
+    elif content_type == "application/x-numpy":
+        return await read_numpy(request), None, None
+    elif content_type == "text/csv":
+        df = await parse_body(request, read_csv)
+        df = df.astype(np.float64)
+        columns = [str(v) for v in df.columns.values]
+    elif content_type == "application/x-parquet":
+        df = await run_in_worker(_read_parquet, await read_body(request))
+        columns = [v for v in df.columns.values]
+    elif content_type == "application/vnd.apache.arrow.stream":
+        df = await parse_body(request, _read_arrow_stream)
+        if "realization_index" in df.columns:
+            df = df.set_index("realization_index")
+        columns = [str(v) for v in df.columns.values]
+    else:
+        raise ValueError(f"Unsupported content type '{content_type}'")
+
+    content = _dataframe_values(df)[:, np.newaxis, :]
+    return content, columns, [int(v) for v in df.index.values]
+
+
+def _create_realization_records(
+    db: Session,
+    ensemble: ds.Ensemble,
+    uploads: Mapping[str, Tuple[Any, Optional[List[Any]], List[int]]],
+) -> Dict[str, List[UUID]]:
+    """
+    Create one matrix record per realization for each record name in
+    `uploads`, which maps to (data, column labels, realization indices) where
+    the first axis of data is the realization.
+
+    Validation is done once for the whole upload, and the matrices and records
+    are inserted with one executemany statement each rather than one ORM
+    insert per realization.
+    """
+    for name, (content, _, realizations) in uploads.items():
+        if len(realizations) != len(content):
+            raise exc.UnprocessableError(
+                f"Record '{name}' has {len(content)} matrices but {len(realizations)} realization indices"
+            )
+        if len(set(realizations)) != len(realizations):
+            raise exc.UnprocessableError(
+                f"Non unique realization indices for record '{name}'"
+            )
+        if ensemble.size != -1 and not set(realizations) <= set(
+            ensemble.active_realizations
+        ):
+            raise exc.ExpectationError(
+                f"Realization indices {realizations} outside of allowed realization indices {ensemble.active_realizations}"
+            )
+
+    names = list(uploads)
+    uploaded = {
+        name: set(realizations) for name, (_, _, realizations) in uploads.items()
+    }
+    conflicts = [
+        (name, index)
+        for name, index in db.query(ds.RecordInfo.name, ds.Record.realization_index)
+        .join(ds.Record.record_info)
+        .filter(ds.RecordInfo.ensemble_pk == ensemble.pk, ds.RecordInfo.name.in_(names))
+        if index is None or index in uploaded[name]
+    ]
+    if conflicts:
+        raise exc.ConflictError(
+            f"Records {sorted(set(name for name, _ in conflicts))} for ensemble '{ensemble.id}' already exist",
+        )
+
+    record_infos = {
+        info.name: info
+        for info in db.query(ds.RecordInfo)
+        .filter(ds.RecordInfo.ensemble_pk == ensemble.pk, ds.RecordInfo.name.in_(names))
+        .all()
+    }
+    for name in names:
+        if name not in record_infos:
+            record_infos[name] = ds.RecordInfo(
+                ensemble=ensemble,
+                name=name,
+                record_class=_get_record_class(ensemble, name),
+                record_type=ds.RecordType.f64_matrix,
+                statistics=ds.RecordStatistics(),
+            )
+            db.add(record_infos[name])
+        elif record_infos[name].record_type != ds.RecordType.f64_matrix:
+            raise exc.ConflictError(
+                "Record type of new record does not match previous record type",
+                new_record_type=ds.RecordType.f64_matrix,
+                old_record_type=record_infos[name].record_type,
+            )
+    db.flush()
+
+    matrices = []
+    records = []
+    ids: Dict[str, List[UUID]] = {}
+    for name, (content, columns, realizations) in uploads.items():
+        ids[name] = []
+        info_matrices = []
+        for matrix, realization in zip(content, realizations):
+            labels = [columns, [str(realization)]] if columns is not None else None
+            matrix_id = uuid4()
+            matrix_obj = ds.F64Matrix.from_numpy(np.atleast_1d(matrix), labels)
+            matrices.append(
+                {
+                    "id": matrix_id,
+                    "content": matrix_obj.content,
+                    "data": matrix_obj.data,
+                    "shape": matrix_obj.shape,
+                    "dtype": matrix_obj.dtype,
+                    "labels": labels,
+                }
+            )
+            records.append(
+                {
+                    "id": uuid4(),
+                    "record_info_pk": record_infos[name].pk,
+                    "f64_matrix_id": matrix_id,
+                    "realization_index": realization,
+                    "userdata": {},
+                }
+            )
+            ids[name].append(records[-1]["id"])
+            info_matrices.append((matrix, labels))
+        _update_record_statistics(db, record_infos[name], info_matrices)
+
+    if matrices:
+        db.execute(sa.insert(ds.F64Matrix.__table__), matrices)
+        matrix_pks = {}
+        matrix_ids = [matrix["id"] for matrix in matrices]
+        for start in range(0, len(matrix_ids), BULK_QUERY_SIZE):
+            matrix_pks.update(
+                db.query(ds.F64Matrix.id, ds.F64Matrix.pk).filter(
+                    ds.F64Matrix.id.in_(matrix_ids[start : start + BULK_QUERY_SIZE])
+                )
+            )
+        for record in records:
+            record["f64_matrix_pk"] = matrix_pks[record.pop("f64_matrix_id")]
+        db.execute(sa.insert(ds.Record.__table__), records)
+    db.commit()
+    return ids
+
+
+def _update_record_statistics(
+    db: Session,
+    record_info: ds.RecordInfo,
+    matrices: Sequence[Tuple[Any, Optional[List[List[Any]]]]],
+) -> None:
+    """
+    Merge the rows of new matrix records, given as (content, labels) pairs, into
+    the running statistics of their RecordInfo, in the same transaction as the
+    records are created. The row is locked so that concurrent uploads of other
+    realizations don't overwrite each other's contribution.
+    """
+    stats = None
+    if record_info.pk is not None:
+        stats = (
+            db.query(ds.RecordStatistics)
+            .filter_by(record_info_pk=record_info.pk)
+            .with_for_update()
+            .populate_existing()
+            .one_or_none()
+        )
+    if stats is None:
+        # RecordInfos created before statistics were introduced. If they
+        # already have records, statistics of the new ones alone would be
+        # wrong, so they are marked as invalid
+        if record_info.statistics is None:
+            has_records = (
+                record_info.pk is not None
+                and db.query(ds.Record.pk)
+                .filter_by(record_info_pk=record_info.pk)
+                .first()
+                is not None
+            )
+            record_info.statistics = ds.RecordStatistics(is_valid=not has_records)
+        stats = record_info.statistics
+    if stats.is_valid is False:
+        return
+
+    running = None
+    if stats.count:
+        running = RunningStatistics.from_arrays(
+            stats.count, stats.mean, stats.m2, stats.min, stats.max
+        )
+    for content, labels in matrices:
+        content = np.atleast_2d(np.asarray(content, dtype=np.float64))
+        columns = labels[0] if labels is not None else None
+        if running is None:
+            running = RunningStatistics(content.shape[-1])
+            stats.labels = columns
+
+        if content.ndim != 2 or stats.labels != columns:
+            stats.is_valid = False
+            return
+        try:
+            running.update(content)
+        except ValueError:
+            stats.is_valid = False
+            return
+
+    if running is None:
+        return
+    stats.is_valid = True
+    _store_running_statistics(stats, running)
+
+
+def _append_record_statistics(
+    db: Session,
+    record_info_pk: int,
+    content: np.ndarray,
+    offset: int,
+    columns: Optional[List[Any]],
+) -> None:
+    """
+    Merge the columns that were appended to the matrix of a realization,
+    starting at column `offset`, into the running statistics of its
+    RecordInfo. `columns` are the labels of the whole matrix after the append.
+    Columns that no other realization has yet are added to the statistics.
+    """
+    stats = (
+        db.query(ds.RecordStatistics)
+        .filter_by(record_info_pk=record_info_pk)
+        .with_for_update()
+        .populate_existing()
+        .one_or_none()
+    )
+    if stats is None or stats.is_valid is False or not stats.count:
+        return
+
+    content = np.atleast_2d(np.asarray(content, dtype=np.float64))
+    width = len(stats.count)
+    end = offset + content.shape[-1]
+    shared = min(width, end)
+    if (
+        content.ndim != 2
+        or offset > width
+        or (stats.labels is None) != (columns is None)
+        or (columns is not None and columns[:shared] != list(stats.labels[:shared]))
+    ):
+        # The realization's columns don't line up with those of the others
+        stats.is_valid = False
+        return
+
+    running = RunningStatistics.from_arrays(
+        stats.count, stats.mean, stats.m2, stats.min, stats.max
+    )
+    if end > width:
+        new = RunningStatistics(end - width)
+        for name in ("count", "mean", "m2", "min", "max"):
+            setattr(
+                running,
+                name,
+                np.concatenate([getattr(running, name), getattr(new, name)]),
+            )
+        if columns is not None:
+            stats.labels = list(stats.labels) + list(columns[width:end])
+
+    appended = RunningStatistics(end - offset)
+    for name in ("count", "mean", "m2", "min", "max"):
+        setattr(appended, name, getattr(running, name)[offset:end])
+    appended.update(content)
+    for name in ("count", "mean", "m2", "min", "max"):
+        getattr(running, name)[offset:end] = getattr(appended, name)
+    _store_running_statistics(stats, running)
+
+
+def _store_running_statistics(
+    stats: ds.RecordStatistics, running: RunningStatistics
+) -> None:
+    stats.count = running.count.tolist()
+    stats.mean = running.mean.tolist()
+    stats.m2 = running.m2.tolist()
+    stats.min = running.min.tolist()
+    stats.max = running.max.tolist()
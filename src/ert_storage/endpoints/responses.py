@@ -1,44 +1,177 @@
-from uuid import uuid4, UUID
+from uuid import UUID
+from typing import Any, Dict, List, Optional
+import numpy as np
 import pandas as pd
 from fastapi import (
     APIRouter,
     Depends,
+    Header,
+    Query,
+    status,
 )
 from fastapi.responses import Response
-from pandas.core.frame import DataFrame
-from ert_storage.database import Session, get_db, HAS_AZURE_BLOB_STORAGE
+from sqlalchemy.orm import joinedload
+from ert_storage.database import Session, get_db
 from ert_storage import database_schema as ds
+from ert_storage.endpoints.records import (
+    BINARY_MIMETYPES,
+    DECIMALS_DESCRIPTION,
+    MAX_POINTS_DESCRIPTION,
+    PRECISION_DESCRIPTION,
+    STREAMING_MIMETYPES,
+    Downsampling,
+    Precision,
+    _get_record_resonse,
+    _prepare_dataframe,
+)
+from ert_storage.workers import run_in_worker
 
 router = APIRouter(tags=["response"])
 
 
-@router.get("/ensembles/{ensemble_id}/responses/{response_name}/data")
+RESPONSE_DATA_DESCRIPTION = """\
+A dataframe with one row per realization, indexed by `realization_index`, and
+the union of the labels of all realizations as columns. Values that a
+realization does not have are NaN. If the matrix of a realization has several
+rows, they are flattened into columns named `<row>:<label>`.
+
+The format is chosen with the Accept header: `text/csv` (the default),
+`application/x-parquet`, `application/vnd.apache.arrow.stream`,
+`application/x-numpy`, `application/json` or `application/x-ndjson`. The
+latter three contain only the values, with the rows in ascending order of
+realization, except that each line of `application/x-ndjson` is an object with
+the `realization_index` and the `data` of one realization. JSON formats are
+streamed one realization at a time.
+"""
+
+
+@router.get(
+    "/ensembles/{ensemble_id}/responses/{response_name}/data",
+    responses={
+        status.HTTP_200_OK: {
+            "content": {
+                "text/csv": {},
+                "application/x-parquet": {},
+                "application/vnd.apache.arrow.stream": {},
+                "application/x-numpy": {},
+                "application/json": {},
+                "application/x-ndjson": {},
+            },
+            "description": RESPONSE_DATA_DESCRIPTION,
+        }
+    },
+)
 async def get_ensemble_response_dataframe(
-    *, db: Session = Depends(get_db), ensemble_id: UUID, response_name: str
+    *,
+    db: Session = Depends(get_db),
+    ensemble_id: UUID,
+    response_name: str,
+    accept: str = Header("text/csv"),
+    precision: Precision = Query(Precision.f64, description=PRECISION_DESCRIPTION),
+    decimals: Optional[int] = Query(None, ge=0, description=DECIMALS_DESCRIPTION),
+    max_points: Optional[int] = Query(None, ge=3, description=MAX_POINTS_DESCRIPTION),
+    downsampling: Downsampling = Downsampling.lttb,
 ) -> Response:
     ensemble = db.query(ds.Ensemble).filter_by(id=ensemble_id).one()
     records = (
         db.query(ds.Record)
+        .options(joinedload(ds.Record.f64_matrix).undefer(ds.F64Matrix.data))
         .filter(ds.Record.realization_index != None)
         .join(ds.RecordInfo)
         .filter_by(
             ensemble_pk=ensemble.pk,
             name=response_name,
             record_class=ds.RecordClass.response,
+            record_type=ds.RecordType.f64_matrix,
         )
+        .order_by(ds.Record.realization_index)
     ).all()
-    df_list = []
+
+    if accept not in BINARY_MIMETYPES + STREAMING_MIMETYPES:
+        accept = "text/csv"
+    dataframe = await run_in_worker(
+        _prepare_response_dataframe,
+        records,
+        accept,
+        max_points,
+        downsampling,
+        precision,
+        decimals,
+    )
+    return await _get_record_resonse(dataframe, accept)
+
+
+def _prepare_response_dataframe(
+    records: List[ds.Record],
+    accept: str,
+    max_points: Optional[int],
+    downsampling: Downsampling,
+    precision: Precision,
+    decimals: Optional[int],
+) -> pd.DataFrame:
+    # The matrices are already loaded, so this doesn't use the database
+    return _prepare_dataframe(
+        _get_response_dataframe(records),
+        accept,
+        max_points,
+        downsampling,
+        precision,
+        decimals,
+    )
+
+
+def _get_response_dataframe(records: List[ds.Record]) -> pd.DataFrame:
+    """
+    Assemble the realizations of a response into a single preallocated array.
+    Realizations that share the labels of the first one, which is the common
+    case, are copied in without any lookup.
+    """
+    rows: List[np.ndarray] = []
+    row_labels: List[List[Any]] = []
     for record in records:
-        data_df = pd.DataFrame(record.f64_matrix.content)
+        content = record.f64_matrix.to_numpy()
         labels = record.f64_matrix.labels
-        if labels is not None:
-            # if the realization is more than 1D array
-            # the next line will produce ValueError exception
-            data_df.index = [record.realization_index]
-            data_df.columns = labels[0]
-        df_list.append(data_df)
-
-    return Response(
-        content=pd.concat(df_list, axis=0).to_csv().encode(),
-        media_type="text/csv",
+        content = np.atleast_2d(content)
+        content = content.reshape(content.shape[0], -1)
+        if labels is not None and len(labels[0]) == content.shape[1]:
+            columns = list(labels[0])
+        else:
+            columns = list(range(content.shape[1]))
+        if content.shape[0] > 1:
+            # Flatten matrices with several rows into a single row
+            index = labels[1] if labels is not None else range(content.shape[0])
+            columns = [f"{row}:{column}" for row in index for column in columns]
+        rows.append(content.reshape(-1))
+        row_labels.append(columns)
+
+    # Union of the labels, in the order they first appear
+    positions: Dict[Any, int] = {}
+    for columns in row_labels:
+        for column in columns:
+            positions.setdefault(column, len(positions))
+
+    dtypes = {row.dtype for row in rows}
+    dtype = dtypes.pop() if len(dtypes) == 1 else np.dtype(np.float64)
+    shape = (len(rows), len(positions))
+    if all(len(columns) == len(positions) for columns in row_labels):
+        data = np.empty(shape, dtype=dtype)
+    else:
+        # Missing values are NaN
+        if dtype.kind != "f":
+            dtype = np.dtype(np.float64)
+        data = np.full(shape, np.nan, dtype=dtype)
+
+    first = row_labels[0] if row_labels else []
+    for i, (row, columns) in enumerate(zip(rows, row_labels)):
+        if columns == first and len(first) == len(positions):
+            data[i] = row
+        else:
+            data[i, [positions[column] for column in columns]] = row
+
+    return pd.DataFrame(
+        data,
+        index=pd.Index(
+            [record.realization_index for record in records], name="realization_index"
+        ),
+        columns=list(positions),
     )
@@ -1,6 +1,13 @@
-from typing import Mapping, Any
+from enum import Enum
+from typing import List, Mapping, Any
 from fastapi import APIRouter, Depends
+from fastapi.responses import Response
+from ert_storage import exceptions as exc
 from ert_storage.database import Session, get_db
+from ert_storage.loop_monitor import get_loop_monitor
+from ert_storage.profiling import get_profile, get_profiles, profiling_security
+from ert_storage.security import security
+from ert_storage.workers import get_worker_pool
 
 router = APIRouter(tags=["info"])
 
@@ -11,3 +18,84 @@ def info(
     db: Session = Depends(get_db),
 ) -> Mapping[str, Any]:
     return {"name": "Ert Storage Server"}
+
+
+@router.get(
+    "/server/workers",
+    response_model=Mapping[str, Any],
+    dependencies=[Depends(security)],
+)
+async def get_workers() -> Mapping[str, Any]:
+    """
+    Size and usage of the worker pool, and the number of tasks and the time
+    that they spent waiting and running, by function
+    """
+    return get_worker_pool().stats()
+
+
+@router.get(
+    "/server/loop",
+    response_model=Mapping[str, Any],
+    dependencies=[Depends(security)],
+)
+async def get_loop() -> Mapping[str, Any]:
+    """
+    Lag of the event loop, and the most recent times that it was blocked for
+    longer than the threshold, with the request and the stack of the handler
+    that blocked it
+    """
+    monitor = get_loop_monitor()
+    if monitor is None:
+        raise exc.NotFoundError("The event loop monitor is not running")
+    return monitor.stats()
+
+
+class ProfileFormat(str, Enum):
+    text = "text"
+    pstats = "pstats"
+    speedscope = "speedscope"
+
+
+@router.get(
+    "/server/profiles",
+    response_model=List[Mapping[str, Any]],
+    dependencies=[Depends(profiling_security)],
+)
+async def list_profiles() -> List[Mapping[str, Any]]:
+    """
+    The most recent profiles of requests, made with the `X-Ert-Profile` header
+    """
+    return [profile.summary() for profile in get_profiles()]
+
+
+@router.get(
+    "/server/profiles/{profile_id}",
+    dependencies=[Depends(profiling_security)],
+)
+async def get_profile_data(
+    profile_id: str, format: ProfileFormat = ProfileFormat.text
+) -> Response:
+    """
+    A profile as text, in the format of `pstats.Stats.dump_stats`, which
+    snakeviz and other tools read, or as a speedscope flame graph
+    """
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise exc.NotFoundError(f"Profile {profile_id} not found")
+    if format is ProfileFormat.pstats:
+        return Response(
+            profile.to_pstats(),
+            media_type="application/octet-stream",
+            headers={
+                "Content-Disposition": f'attachment; filename="{profile.id}.pstats"'
+            },
+        )
+    if format is ProfileFormat.speedscope:
+        return Response(
+            profile.to_speedscope(),
+            media_type="application/json",
+            headers={
+                "Content-Disposition": f'attachment; filename="{profile.id}.speedscope.json"'
+            },
+        )
+    return Response(profile.to_text(), media_type="text/plain")
@@ -27,3 +27,7 @@ class ExpectationError(ErtStorageError):
 
 class UnprocessableError(ErtStorageError):
     __status_code__ = status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+class PayloadTooLargeError(ErtStorageError):
+    __status_code__ = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
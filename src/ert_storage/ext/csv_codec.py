@@ -0,0 +1,137 @@
+"""
+This module implements reading and writing of dataframes as CSV with Arrow's
+multi-threaded CSV engine. Floats are parsed and written exactly, so that they
+survive a round trip. Files that Arrow can't make sense of, such as ones with
+non-numeric values or duplicate column names, are handled by pandas, as
+before, if they can be read again from the start.
+
+Uploads are parsed while they are received and can't be read again, so for
+them such files are an error. Values other than numbers, eg. `True`, were
+only accepted by the pandas fallback.
+"""
+import csv
+import io
+from typing import Any, BinaryIO, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+__all__ = ["read_csv", "to_csv"]
+
+
+def read_csv(source: BinaryIO) -> pd.DataFrame:
+    """
+    Read a CSV file whose first column is the index and whose other columns
+    are floats, like `pd.read_csv(..., index_col=0, float_precision="round_trip")`
+    followed by a cast to float64.
+
+    The file is parsed as it is read, so `source` may be a stream. Files that
+    Arrow can't parse are read with pandas, if `source` is seekable, and
+    otherwise raise ValueError.
+    """
+    start = source.tell() if source.seekable() else None
+    header = source.readline()
+    try:
+        names = next(csv.reader([header.decode().rstrip("\r\n")]))
+    except (StopIteration, UnicodeDecodeError, csv.Error) as parse_exc:
+        return _pandas_read_csv(source, start, parse_exc)
+    if not names:
+        return _pandas_read_csv(source, start, ValueError("No columns to parse"))
+    if len(set(names)) != len(names):
+        # pandas renames duplicate columns, eg. to `x` and `x.1`
+        return _pandas_read_csv(source, start, ValueError("Duplicate column names"))
+
+    column_types = {name: pa.float64() for name in names[1:]}
+    column_types[names[0]] = pa.string()
+    try:
+        table = pa_csv.open_csv(
+            source,
+            # Arrow's overhead is per block and column, so wide files are read
+            # in larger blocks
+            read_options=pa_csv.ReadOptions(
+                column_names=names, block_size=max(1 << 20, 64 * len(header))
+            ),
+            convert_options=pa_csv.ConvertOptions(column_types=column_types),
+        ).read_all()
+    except pa.ArrowInvalid as parse_exc:
+        # Eg. non-numeric values
+        return _pandas_read_csv(source, start, parse_exc)
+
+    if table.num_columns > 1:
+        values = np.column_stack([column.to_numpy() for column in table.columns[1:]])
+    else:
+        values = np.empty((table.num_rows, 0), dtype=np.float64)
+    index = pd.Index(_index_values(table.column(0)), name=names[0] or None)
+    return pd.DataFrame(values, index=index, columns=names[1:])
+
+
+def _index_values(column: pa.ChunkedArray) -> Any:
+    # Integer and float labels are converted like pandas does
+    for type_ in (pa.int64(), pa.float64()) if len(column) else ():
+        try:
+            return column.cast(type_).to_numpy()
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            pass
+    return column.to_numpy(zero_copy_only=False)
+
+
+def to_csv(dataframe: pd.DataFrame) -> bytes:
+    """
+    Write a dataframe, including its index, like `DataFrame.to_csv()`
+    """
+    if dataframe.columns.nlevels > 1 or dataframe.index.nlevels > 1:
+        return dataframe.to_csv().encode()
+    # Columns are contiguous in the transpose
+    columns = np.ascontiguousarray(dataframe.values.T)
+    names = [_name(dataframe.index.name)] + list(dataframe.columns.astype(str))
+    try:
+        arrays = [pa.array(_column(dataframe.index))] + [
+            pa.array(column, from_pandas=True) for column in columns
+        ]
+        table = pa.Table.from_arrays(arrays, names=names)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return dataframe.to_csv().encode()
+
+    # Arrow quotes every string, so the header is written as pandas does and
+    # values are only quoted when a label needs it
+    header = io.StringIO()
+    csv.writer(header, lineterminator="\n").writerow(names)
+    stream = pa.BufferOutputStream()
+    stream.write(header.getvalue().encode())
+    try:
+        pa_csv.write_csv(
+            table,
+            stream,
+            pa_csv.WriteOptions(include_header=False, quoting_style="none"),
+        )
+    except pa.ArrowInvalid:
+        stream = pa.BufferOutputStream()
+        stream.write(header.getvalue().encode())
+        pa_csv.write_csv(
+            table,
+            stream,
+            pa_csv.WriteOptions(include_header=False, quoting_style="needed"),
+        )
+    return stream.getvalue().to_pybytes()
+
+
+def _pandas_read_csv(
+    source: BinaryIO, start: Optional[int], error: Exception
+) -> pd.DataFrame:
+    if start is None:
+        raise ValueError(f"Unable to parse CSV: {error}") from error
+    source.seek(start)
+    return pd.read_csv(source, index_col=0, float_precision="round_trip")
+
+
+def _name(name: Any) -> str:
+    return "" if name is None else str(name)
+
+
+def _column(index: pd.Index) -> Any:
+    # Labels are written as pandas would write them, eg. dates without a time
+    if index.dtype.kind in "iuf":
+        return index.values
+    return index.astype(str).values
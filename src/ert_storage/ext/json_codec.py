@@ -0,0 +1,150 @@
+"""
+This module implements the JSON encoding and decoding of ERT Storage. If
+orjson is installed, it is used to serialize NumPy arrays directly, without
+first converting them to Python lists, and otherwise the standard library is
+used.
+
+ERT clients rely on NaN and infinities being written as the (non-standard)
+tokens `NaN` and `Infinity`, which orjson would write as `null`. Payloads that
+contain them are therefore always encoded with the standard library.
+"""
+import json
+import math
+from enum import Enum
+from typing import Any
+
+import numpy as np
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+__all__ = ["HAS_ORJSON", "JSONEncoder", "JSONResponse", "dumps", "loads", "loads_array"]
+
+
+HAS_ORJSON = orjson is not None
+
+
+class JSONEncoder(json.JSONEncoder):
+    """
+    Custom JSON encoder with support for Python 3.4 enums and NumPy
+    """
+
+    def default(self, obj: Any) -> Any:
+        if isinstance(obj, Enum):
+            return obj.name
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.generic):
+            return obj.item()
+        return super().default(obj)
+
+
+_encoder = JSONEncoder(
+    ensure_ascii=False,
+    allow_nan=True,
+    indent=None,
+    separators=(",", ":"),
+)
+
+
+def _orjson_default(obj: Any) -> Any:
+    # Arrays that orjson can't serialize natively, eg. non-contiguous ones
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError
+
+
+def _has_nonfinite(obj: Any) -> bool:
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.dtype.kind in "fc" and not np.isfinite(obj).all()
+    if isinstance(obj, np.floating):
+        return not np.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_has_nonfinite(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_nonfinite(value) for value in obj)
+    return False
+
+
+def _has_enum(obj: Any) -> bool:
+    # Enums other than eg. IntEnum, which orjson writes by value
+    if isinstance(obj, Enum):
+        return not isinstance(obj, (str, int, float))
+    if isinstance(obj, dict):
+        return _has_enum(list(obj.values()))
+    if isinstance(obj, (list, tuple)):
+        types = set(map(type, obj))
+        if any(issubclass(type_, Enum) for type_ in types):
+            return any(_has_enum(value) for value in obj)
+        if any(issubclass(type_, (dict, list, tuple)) for type_ in types):
+            return any(
+                _has_enum(value)
+                for value in obj
+                if isinstance(value, (dict, list, tuple))
+            )
+    return False
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize `obj`, which may contain NumPy arrays and scalars, to JSON
+    """
+    # orjson writes enums by value, and JSONEncoder by name
+    if HAS_ORJSON and not _has_enum(obj):
+        try:
+            content = orjson.dumps(
+                obj,
+                default=_orjson_default,
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+            )
+        except TypeError:
+            # Eg. integers that are too large for orjson
+            pass
+        else:
+            if b"null" not in content or not _has_nonfinite(obj):
+                return content
+    return _encoder.encode(obj).encode("utf-8")
+
+
+def loads(content: bytes) -> Any:
+    """
+    Deserialize JSON, accepting the `NaN` and `Infinity` tokens
+    """
+    if HAS_ORJSON:
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # orjson does not accept NaN and Infinity
+            pass
+    return json.loads(content)
+
+
+def loads_array(content: bytes, dtype: Any = np.float64) -> np.ndarray:
+    """
+    Deserialize a JSON array of numbers, nested to any depth, into an ndarray.
+    Raises ValueError if the content is not valid JSON or not an array.
+
+    The content is parsed into Python lists first. With orjson, this is still
+    several times faster than parsing the text with NumPy.
+    """
+    try:
+        return np.array(loads(content), dtype=dtype)
+    except TypeError as type_exc:
+        # Eg. a JSON object
+        raise ValueError(f"Not an array of numbers: {type_exc}") from type_exc
+
+
+class JSONResponse(Response):
+    """A replacement for Starlette's JSONResponse that permits NaNs."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,5 +1,5 @@
 from .ensemble import EnsembleIn, EnsembleOut
-from .record import RecordOut
+from .record import RecordOut, RecordQueryIn
 from .experiment import ExperimentIn, ExperimentOut
 from .observation import (
     ObservationIn,
@@ -1,5 +1,5 @@
 from uuid import UUID
-from typing import Any, Mapping, Optional
+from typing import Any, List, Mapping, Optional
 from pydantic import BaseModel, Field
 
 
@@ -15,3 +15,9 @@ class RecordOut(_Record):
 
     class Config:
         orm_mode = True
+
+
+class RecordQueryIn(BaseModel):
+    names: List[str]
+    realization_indices: Optional[List[int]] = None
+    labels: Optional[List[str]] = None
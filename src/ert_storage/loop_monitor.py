@@ -0,0 +1,227 @@
+"""
+Instrumentation of the event loop. A task measures how late the loop is to
+wake it up at a fixed interval, which is the time that any request would have
+had to wait, and a watchdog thread samples the stack of the loop's thread when
+it has not been woken up for longer than a threshold. The request whose task
+was running is recorded with the stack, so that endpoints that do blocking
+work in `async def` handlers can be found and moved off the loop.
+
+The interval is `ERT_STORAGE_LOOP_MONITOR_INTERVAL` seconds (default 0.25,
+and 0 disables the monitor) and the threshold is
+`ERT_STORAGE_BLOCKING_THRESHOLD` seconds (default 0.5).
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from fastapi.logger import logger
+
+
+ENV_INTERVAL = "ERT_STORAGE_LOOP_MONITOR_INTERVAL"
+ENV_THRESHOLD = "ERT_STORAGE_BLOCKING_THRESHOLD"
+
+# Number of blocking events that are kept for the diagnostics endpoint
+MAX_EVENTS = 50
+
+# Number of innermost frames of the sampled stack that are kept
+MAX_STACK_DEPTH = 30
+
+# Upper bounds of the buckets of the lag histogram, in seconds
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+Scope = Dict[str, Any]
+ASGIApp = Callable[[Scope, Any, Any], Awaitable[None]]
+
+
+def get_interval() -> float:
+    return float(os.getenv(ENV_INTERVAL, "0.25"))
+
+
+def get_threshold() -> float:
+    return float(os.getenv(ENV_THRESHOLD, "0.5"))
+
+
+class LoopMonitor:
+    def __init__(
+        self, loop: asyncio.AbstractEventLoop, interval: float, threshold: float
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self._loop = loop
+        self._thread_id = threading.get_ident()
+        self._requests: Dict["asyncio.Task[Any]", Scope] = {}
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=MAX_EVENTS)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._last_tick = time.monotonic()
+        self._stalled: Optional[Dict[str, Any]] = None
+
+        self.samples = 0
+        self.lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self.last_lag_seconds = 0.0
+        self.lag_buckets = [0] * len(LAG_BUCKETS)
+        self.blocking_count = 0
+
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._watchdog = threading.Thread(
+            target=self._watch, name="ert-storage-loop-watchdog", daemon=True
+        )
+
+    def start(self) -> None:
+        self._task = self._loop.create_task(self._tick())
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    def track(self, scope: Scope) -> Optional["asyncio.Task[Any]"]:
+        """
+        Record that the current task is handling the request of `scope`
+        """
+        task = asyncio.current_task()
+        if task is not None:
+            self._requests[task] = scope
+        return task
+
+    def untrack(self, task: Optional["asyncio.Task[Any]"]) -> None:
+        if task is not None:
+            self._requests.pop(task, None)
+
+    async def _tick(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._record_lag(max(0.0, now - expected), now)
+
+    def _record_lag(self, lag: float, now: float) -> None:
+        with self._lock:
+            self._last_tick = now
+            self.samples += 1
+            self.lag_seconds += lag
+            self.last_lag_seconds = lag
+            self.max_lag_seconds = max(self.max_lag_seconds, lag)
+            for i, bound in enumerate(LAG_BUCKETS):
+                if lag <= bound:
+                    self.lag_buckets[i] += 1
+                    break
+            event, self._stalled = self._stalled, None
+        if event is not None:
+            event["seconds"] = lag
+            logger.warning(
+                "Event loop was blocked for %.3fs by %s %s (%s):\n%s",
+                lag,
+                event["method"],
+                event["path"],
+                event["endpoint"],
+                "".join(event["stack"]),
+            )
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.threshold / 2):
+            with self._lock:
+                stalled = time.monotonic() - self._last_tick - self.interval
+                if stalled < self.threshold or self._stalled is not None:
+                    continue
+            # Sampled outside of the lock, since the loop may be waiting for it
+            event = self._sample(stalled)
+            with self._lock:
+                if self._last_tick + self.interval + self.threshold > time.monotonic():
+                    # The loop has recovered in the meantime
+                    continue
+                self._stalled = event
+                self.blocking_count += 1
+                self._events.append(event)
+
+    def _sample(self, stalled: float) -> Dict[str, Any]:
+        frame = sys._current_frames().get(self._thread_id)
+        stack = traceback.format_stack(frame)[-MAX_STACK_DEPTH:] if frame else []
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        scope = self._requests.get(task) if task is not None else None
+        endpoint = scope.get("endpoint") if scope is not None else None
+        return {
+            "time": time.time(),
+            "seconds": stalled,
+            "method": scope.get("method") if scope is not None else None,
+            "path": scope.get("path") if scope is not None else None,
+            "endpoint": getattr(endpoint, "__qualname__", None),
+            "stack": stack,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "interval": self.interval,
+                "threshold": self.threshold,
+                "samples": self.samples,
+                "lag_seconds": self.lag_seconds,
+                "max_lag_seconds": self.max_lag_seconds,
+                "last_lag_seconds": self.last_lag_seconds,
+                "lag_buckets": {
+                    str(bound): count
+                    for bound, count in zip(LAG_BUCKETS, self.lag_buckets)
+                },
+                "blocking_count": self.blocking_count,
+                "active_requests": len(self._requests),
+                "blocking_events": list(self._events),
+            }
+
+
+_monitor: Optional[LoopMonitor] = None
+
+
+def get_loop_monitor() -> Optional[LoopMonitor]:
+    return _monitor
+
+
+def start_loop_monitor() -> Optional[LoopMonitor]:
+    """
+    Start monitoring the running event loop, unless it is disabled
+    """
+    global _monitor
+    stop_loop_monitor()
+    interval = get_interval()
+    if interval <= 0:
+        return None
+    _monitor = LoopMonitor(asyncio.get_running_loop(), interval, get_threshold())
+    _monitor.start()
+    return _monitor
+
+
+def stop_loop_monitor() -> None:
+    global _monitor
+    if _monitor is not None:
+        _monitor.stop()
+        _monitor = None
+
+
+class LoopMonitorMiddleware:
+    """
+    ASGI middleware that lets the loop monitor know which request each task is
+    handling
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Any, send: Any) -> None:
+        monitor = _monitor
+        if monitor is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        task = monitor.track(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            monitor.untrack(task)
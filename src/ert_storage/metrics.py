@@ -0,0 +1,552 @@
+"""
+Metrics in the Prometheus text exposition format, which are served by
+`/metrics`. They are kept in memory by this process, so that they are cheap
+enough to be collected at all times and need no other service.
+
+Requests are counted and timed per route, where the route is the path template
+of the endpoint, eg. `/ensembles/{ensemble_id}/records/{name}`, so that the
+number of series doesn't grow with the number of ensembles and records.
+"""
+import abc
+import contextvars
+import functools
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from fastapi.logger import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+
+ENV_SLOW_QUERY_SECONDS = "ERT_STORAGE_SLOW_QUERY_SECONDS"
+ENV_SLOW_EXPLAIN = "ERT_STORAGE_SLOW_QUERY_EXPLAIN"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds of the buckets of the histograms, in seconds and bytes
+DURATION_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SIZE_BUCKETS = tuple(float(4**i) for i in range(3, 15))
+COUNT_BUCKETS = (0.0, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0, 1000.0)
+
+Labels = Tuple[str, ...]
+Scope = Dict[str, Any]
+ASGIApp = Callable[[Scope, Any, Any], Awaitable[None]]
+
+
+class _Metric(abc.ABC):
+    type_ = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Labels:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Labels, extra: str = "") -> str:
+        pairs = [
+            f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        ...
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.type_}",
+            *self.samples(),
+        ]
+
+
+class Counter(_Metric):
+    type_ = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{self._labels(key)} {value!r}" for key, value in values]
+
+
+class Histogram(_Metric):
+    type_ = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # Count per bucket, with the last one for values above all bounds,
+        # and the sum of the values
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            counts, total = self._values[key]
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def timer(self, **labels: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = [
+                (key, list(counts), total[0])
+                for key, (counts, total) in self._values.items()
+            ]
+        lines = []
+        for key, counts, total in values:
+            lines.extend(
+                _histogram_samples(
+                    self.name,
+                    functools.partial(self._labels, key),
+                    self.buckets,
+                    counts,
+                )
+            )
+            lines.append(f"{self.name}_sum{self._labels(key)} {total!r}")
+        return lines
+
+
+M = TypeVar("M", bound=_Metric)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric: "M") -> "M":
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[str]]) -> None:
+        """
+        Add a function that returns samples, with their HELP and TYPE lines, of
+        values that are read when the metrics are collected
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(
+    Counter(
+        "ert_storage_http_requests_total",
+        "Number of HTTP requests",
+        ["method", "route", "status"],
+    )
+)
+HTTP_DURATION = REGISTRY.register(
+    Histogram(
+        "ert_storage_http_request_duration_seconds",
+        "Time until the response of an HTTP request was sent",
+        ["method", "route"],
+    )
+)
+HTTP_REQUEST_SIZE = REGISTRY.register(
+    Histogram(
+        "ert_storage_http_request_size_bytes",
+        "Size of the bodies of HTTP requests",
+        ["method", "route"],
+        SIZE_BUCKETS,
+    )
+)
+HTTP_RESPONSE_SIZE = REGISTRY.register(
+    Histogram(
+        "ert_storage_http_response_size_bytes",
+        "Size of the bodies of HTTP responses",
+        ["method", "route"],
+        SIZE_BUCKETS,
+    )
+)
+SQL_QUERIES = REGISTRY.register(
+    Histogram(
+        "ert_storage_sql_queries_per_request",
+        "Number of SQL statements executed by an HTTP request",
+        ["method", "route"],
+        COUNT_BUCKETS,
+    )
+)
+SQL_REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "ert_storage_sql_request_duration_seconds",
+        "Time spent executing SQL statements by an HTTP request",
+        ["method", "route"],
+    )
+)
+SQL_DURATION = REGISTRY.register(
+    Histogram(
+        "ert_storage_sql_query_duration_seconds",
+        "Time spent executing an SQL statement",
+        ["operation"],
+    )
+)
+BLOB_DURATION = REGISTRY.register(
+    Histogram(
+        "ert_storage_blob_operation_duration_seconds",
+        "Time spent in operations of the blob storage backend",
+        ["backend", "operation"],
+    )
+)
+
+
+class RequestStats:
+    """
+    Statistics of the request that is being handled, which are shared by
+    the tasks and threads that handle it
+    """
+
+    def __init__(self) -> None:
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+
+
+_request_stats: "contextvars.ContextVar[Optional[RequestStats]]" = (
+    contextvars.ContextVar("request_stats", default=None)
+)
+
+
+def get_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Time the statements executed by `engine`, and collect the state of its
+    connection pool
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    REGISTRY.add_collector(lambda: _pool_samples(engine))
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    seconds = time.perf_counter() - conn.info["query_start"].pop()
+    operation = _operation(statement)
+    SQL_DURATION.observe(seconds, operation=operation)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_seconds += seconds
+
+    threshold = get_slow_query_seconds()
+    if threshold is not None and seconds >= threshold:
+        plan = None
+        if operation == "SELECT" and not executemany and os.getenv(ENV_SLOW_EXPLAIN):
+            plan = _explain(conn, statement, parameters)
+        logger.warning(
+            "Slow SQL statement (%.3fs): %s\nParameters: %s%s",
+            seconds,
+            statement,
+            _truncate(repr(parameters)),
+            f"\nPlan:\n{plan}" if plan else "",
+        )
+
+
+def get_slow_query_seconds() -> Optional[float]:
+    value = os.getenv(ENV_SLOW_QUERY_SECONDS)
+    return float(value) if value else None
+
+
+def _explain(conn: Any, statement: str, parameters: Any) -> Optional[str]:
+    """
+    The plan of a statement, from a separate cursor so that the results of
+    the statement are not lost
+    """
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return "\n".join(
+                " ".join(str(value) for value in row) for row in cursor.fetchall()
+            )
+        finally:
+            cursor.close()
+    except Exception as explain_exc:
+        return f"Unable to explain statement: {explain_exc}"
+
+
+def _truncate(text: str, length: int = 1000) -> str:
+    # Parameters may contain the data of large matrices
+    return text if len(text) <= length else text[:length] + "..."
+
+
+_OPERATION = re.compile(r"\s*(\w+)")
+
+
+def _operation(statement: str) -> str:
+    match = _OPERATION.match(statement)
+    return match.group(1).upper() if match else "OTHER"
+
+
+def _pool_samples(engine: Engine) -> List[str]:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        # Eg. the pools of SQLite, which keep a connection per thread
+        return []
+    lines = []
+    for name, help, value in (
+        ("size", "Number of connections that the pool keeps open", pool.size()),
+        ("checked_out", "Number of connections in use", pool.checkedout()),
+        ("overflow", "Number of connections above the pool size", pool.overflow()),
+        ("checked_in", "Number of idle connections in the pool", pool.checkedin()),
+    ):
+        lines.extend(
+            [
+                f"# HELP ert_storage_db_pool_{name} {help}",
+                f"# TYPE ert_storage_db_pool_{name} gauge",
+                f"ert_storage_db_pool_{name} {value}",
+            ]
+        )
+    return lines
+
+
+def _worker_samples() -> List[str]:
+    from ert_storage.workers import get_worker_pool
+
+    stats = get_worker_pool().stats()
+    lines = []
+    for name, help in (
+        ("workers", "Number of threads of the worker pool"),
+        ("running", "Number of tasks that are running in the worker pool"),
+        ("queued", "Number of tasks that are waiting for a worker"),
+    ):
+        lines.extend(
+            [
+                f"# HELP ert_storage_worker_pool_{name} {help}",
+                f"# TYPE ert_storage_worker_pool_{name} gauge",
+                f"ert_storage_worker_pool_{name} {stats[name]}",
+            ]
+        )
+    for name, help in (
+        ("count", "Number of tasks that were run in the worker pool"),
+        ("failures", "Number of tasks in the worker pool that raised"),
+        ("wait_seconds", "Time that tasks waited for a worker"),
+        ("run_seconds", "Time that tasks ran in the worker pool"),
+    ):
+        metric = f"ert_storage_worker_tasks_{name}_total"
+        lines.extend([f"# HELP {metric} {help}", f"# TYPE {metric} counter"])
+        for task, task_stats in stats["tasks"].items():
+            lines.append(f'{metric}{{task="{_escape(task)}"}} {task_stats[name]!r}')
+    return lines
+
+
+def _loop_samples() -> List[str]:
+    from ert_storage.loop_monitor import LAG_BUCKETS, get_loop_monitor
+
+    monitor = get_loop_monitor()
+    if monitor is None:
+        return []
+    stats = monitor.stats()
+    counts = list(stats["lag_buckets"].values())
+    counts.append(stats["samples"] - sum(counts))
+    name = "ert_storage_event_loop_lag_seconds"
+    return [
+        f"# HELP {name} Delay of the event loop in waking up a task",
+        f"# TYPE {name} histogram",
+        *_histogram_samples(name, _format_labels, LAG_BUCKETS, counts),
+        f"{name}_sum {stats['lag_seconds']!r}",
+        "# HELP ert_storage_event_loop_blocked_total Number of times that the "
+        "event loop was blocked for longer than the threshold",
+        "# TYPE ert_storage_event_loop_blocked_total counter",
+        f"ert_storage_event_loop_blocked_total {stats['blocking_count']}",
+    ]
+
+
+REGISTRY.add_collector(_worker_samples)
+REGISTRY.add_collector(_loop_samples)
+
+
+def _histogram_samples(
+    name: str,
+    format_labels: Callable[[str], str],
+    buckets: Sequence[float],
+    counts: List[int],
+) -> List[str]:
+    """
+    The bucket and count samples of a histogram, where `counts` are the
+    number of values in each bucket and above the last one
+    """
+    lines = []
+    cumulative = 0
+    for bound, count in zip(list(buckets) + [float("inf")], counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else repr(float(bound))
+        bucket_labels = format_labels(f'le="{le}"')
+        lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+    lines.append(f"{name}_count{format_labels('')} {cumulative}")
+    return lines
+
+
+def _format_labels(extra: str) -> str:
+    return "{" + extra + "}" if extra else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _server_timing(stats: RequestStats, start: float) -> str:
+    """
+    The Server-Timing header of a response, with the time spent in SQL
+    statements and in total until the response is started, in milliseconds
+    """
+    total = (time.perf_counter() - start) * 1000
+    sql = stats.sql_seconds * 1000
+    return (
+        f'db;dur={sql:.1f};desc="{stats.sql_count} queries", ' f"total;dur={total:.1f}"
+    )
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that counts and times requests, and measures the size of
+    their bodies. The number of SQL statements and the time spent executing
+    them are sent to the client in a Server-Timing header.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._routes: Dict[Any, str] = {}
+
+    async def __call__(self, scope: Scope, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        request_size = 0
+        response_size = 0
+        status_code = 500
+
+        async def receive_wrapper() -> Any:
+            nonlocal request_size
+            message = await receive()
+            if message["type"] == "http.request":
+                request_size += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Any) -> None:
+            nonlocal response_size, status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = dict(message)
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", _server_timing(stats, start).encode()),
+                ]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            labels = dict(method=scope["method"], route=self._route(scope))
+            HTTP_REQUESTS.inc(status=status_code, **labels)
+            HTTP_DURATION.observe(time.perf_counter() - start, **labels)
+            HTTP_REQUEST_SIZE.observe(request_size, **labels)
+            HTTP_RESPONSE_SIZE.observe(response_size, **labels)
+            SQL_QUERIES.observe(stats.sql_count, **labels)
+            SQL_REQUEST_DURATION.observe(stats.sql_seconds, **labels)
+
+    def _route(self, scope: Scope) -> str:
+        # The router adds the endpoint of the matching route to the scope
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if endpoint not in self._routes:
+            router = scope.get("router")
+            for route in getattr(router, "routes", ()):
+                if getattr(route, "endpoint", None) is endpoint:
+                    self._routes[endpoint] = route.path
+                    break
+            else:
+                self._routes[endpoint] = getattr(endpoint, "__name__", "unknown")
+        return self._routes[endpoint]
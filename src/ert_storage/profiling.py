@@ -0,0 +1,371 @@
+"""
+Profiling of individual requests on a running server. Profiling is enabled by
+setting `ERT_STORAGE_PROFILING_TOKEN`, and a request is profiled when it has
+the headers `X-Ert-Profile: 1` and `X-Ert-Profile-Token: <token>`. The value
+`memory` in `X-Ert-Profile`, eg. `X-Ert-Profile: 1,memory`, also traces the
+allocations made while the request is handled.
+
+Requests are profiled with cProfile, both on the event loop and in the worker
+pool. The event loop may run other requests at the same time, and these end
+up in the profile too. Endpoints that are not `async def` run in Starlette's
+thread pool and are not profiled.
+
+The id of the profile is returned in the `X-Ert-Profile-Id` header, and the
+profile is kept in memory for `/server/profiles/{id}`. If
+`ERT_STORAGE_PROFILE_DIR` is set, it is also written there as
+`<id>.pstats`.
+"""
+import contextvars
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from fastapi import Header, HTTPException, status
+from starlette.responses import JSONResponse
+
+
+ENV_TOKEN = "ERT_STORAGE_PROFILING_TOKEN"
+ENV_DIR = "ERT_STORAGE_PROFILE_DIR"
+
+PROFILE_HEADER = b"x-ert-profile"
+TOKEN_HEADER = b"x-ert-profile-token"
+ID_HEADER = b"x-ert-profile-id"
+
+# Number of profiles that are kept in memory
+MAX_PROFILES = 20
+
+# Number of lines in the allocation summary
+MAX_ALLOCATIONS = 25
+
+# Smallest stack in a speedscope profile, as a fraction of the total time
+MIN_SPEEDSCOPE_FRACTION = 0.001
+
+Scope = Dict[str, Any]
+ASGIApp = Callable[[Scope, Any, Any], Awaitable[None]]
+FunctionKey = Tuple[str, int, str]
+
+
+def get_profiling_token() -> Optional[str]:
+    return os.getenv(ENV_TOKEN) or None
+
+
+def is_valid_token(token: Optional[str]) -> bool:
+    real_token = get_profiling_token()
+    if real_token is None or token is None:
+        return False
+    return hmac.compare_digest(token.encode(), real_token.encode())
+
+
+async def profiling_security(
+    *, x_ert_profile_token: Optional[str] = Header(None)
+) -> None:
+    if get_profiling_token() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled"
+        )
+    if not is_valid_token(x_ert_profile_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profiling token"
+        )
+
+
+class Profile:
+    """
+    The profile of a request
+    """
+
+    def __init__(self, method: str, path: str, trace_memory: bool) -> None:
+        self.id = str(uuid4())
+        self.method = method
+        self.path = path
+        self.time = time.time()
+        self.seconds = 0.0
+        self.trace_memory = trace_memory
+        self.allocations: Optional[List[Dict[str, Any]]] = None
+        self.peak_memory: Optional[int] = None
+
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._stats: Optional[pstats.Stats] = None
+
+    def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Call `func(*args)` in another thread under a profiler of its own
+        """
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args)
+        finally:
+            with self._lock:
+                self._profiles.append(profiler)
+
+    def add(self, profiler: cProfile.Profile) -> None:
+        with self._lock:
+            self._profiles.append(profiler)
+
+    @property
+    def stats(self) -> pstats.Stats:
+        with self._lock:
+            if self._stats is None:
+                # pstats can't load profilers that have recorded nothing
+                profiles = [p for p in self._profiles if p.getstats()]  # type: ignore
+                self._stats = pstats.Stats(*profiles) if profiles else pstats.Stats()
+            return self._stats
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "time": self.time,
+            "seconds": self.seconds,
+            "peak_memory": self.peak_memory,
+        }
+
+    def to_text(self, limit: int = 50) -> str:
+        stream = io.StringIO()
+        stats = self.stats
+        stats.stream = stream  # type: ignore
+        stats.sort_stats("cumulative").print_stats(limit)
+        if self.allocations is not None:
+            stream.write("\n")
+            if self.peak_memory is not None:
+                stream.write(f"Peak traced memory: {self.peak_memory} bytes\n")
+            stream.write("Largest allocations (size, count, location):\n")
+            for allocation in self.allocations:
+                stream.write(
+                    f"{allocation['size']:>12} {allocation['count']:>8} "
+                    f"{allocation['location']}\n"
+                )
+        return stream.getvalue()
+
+    def to_pstats(self) -> bytes:
+        """
+        The profile in the format of `pstats.Stats.dump_stats`
+        """
+        import marshal
+
+        return marshal.dumps(self.stats.stats)  # type: ignore
+
+    def to_speedscope(self) -> bytes:
+        """
+        The profile as a speedscope flame graph. cProfile only records the
+        time of each function per caller, so stacks are reconstructed from the
+        call graph, as in flame graphs of cProfile output in general.
+        """
+        raw: Dict[FunctionKey, Any] = self.stats.stats  # type: ignore
+        frames: List[Dict[str, Any]] = []
+        frame_index: Dict[FunctionKey, int] = {}
+        samples: List[List[int]] = []
+        weights: List[float] = []
+
+        def index(function: FunctionKey) -> int:
+            if function not in frame_index:
+                filename, line, name = function
+                frame_index[function] = len(frames)
+                frames.append({"name": name, "file": filename, "line": line})
+            return frame_index[function]
+
+        callees: Dict[FunctionKey, List[FunctionKey]] = {}
+        for function, (_, _, _, _, callers) in raw.items():
+            for caller in callers:
+                callees.setdefault(caller, []).append(function)
+
+        roots = [
+            function
+            for function, (_, _, _, _, callers) in raw.items()
+            if not callers or all(caller not in raw for caller in callers)
+        ]
+        # Stacks that take less than this are merged into their caller, since
+        # the number of paths through the call graph can be very large
+        min_weight = sum(raw[root][3] for root in roots) * MIN_SPEEDSCOPE_FRACTION
+
+        def visit(
+            function: FunctionKey, stack: List[FunctionKey], total: float
+        ) -> None:
+            # Time of the callees, when called from this function, scaled to
+            # the time that is attributed to this function on this stack
+            _, _, _, cumulative, _ = raw[function]
+            scale = total / cumulative if cumulative > 0 else 0.0
+            stack = stack + [function]
+            children = 0.0
+            for callee in callees.get(function, []):
+                if callee in stack:
+                    continue
+                child = raw[callee][4][function][3] * scale
+                if child >= min_weight and child > 0:
+                    children += child
+                    visit(callee, stack, child)
+            if total - children > 0:
+                samples.append([index(f) for f in stack])
+                weights.append(total - children)
+
+        for root in roots:
+            visit(root, [], raw[root][3])
+
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": f"{self.method} {self.path}",
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+            "name": f"{self.method} {self.path}",
+            "exporter": "ert-storage",
+        }
+        return json.dumps(document).encode()
+
+
+_current_profile: "contextvars.ContextVar[Optional[Profile]]" = contextvars.ContextVar(
+    "current_profile", default=None
+)
+_profiles: "OrderedDict[str, Profile]" = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def get_profile(profile_id: str) -> Optional[Profile]:
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+
+def get_profiles() -> List[Profile]:
+    with _profiles_lock:
+        return list(_profiles.values())
+
+
+def run_profiled(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Call `func(*args)`, under a profiler if the request that it is called for
+    is being profiled
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return func(*args)
+    return profile.run(func, *args)
+
+
+def _store(profile: Profile) -> None:
+    with _profiles_lock:
+        _profiles[profile.id] = profile
+        while len(_profiles) > MAX_PROFILES:
+            _profiles.popitem(last=False)
+    directory = os.getenv(ENV_DIR)
+    if directory:
+        profile.stats.dump_stats(os.path.join(directory, f"{profile.id}.pstats"))
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles the requests that ask for it
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        # cProfile supports a single profiler per thread, so one request on
+        # the event loop is profiled at a time
+        self._busy = False
+
+    async def __call__(self, scope: Scope, receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or get_profiling_token() is None:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        options = headers.get(PROFILE_HEADER, b"").decode().lower().split(",")
+        if not {"1", "true", "cpu", "memory"} & {o.strip() for o in options}:
+            await self.app(scope, receive, send)
+            return
+
+        token = headers.get(TOKEN_HEADER)
+        if not is_valid_token(token.decode() if token is not None else None):
+            response = JSONResponse(
+                {"detail": "Invalid profiling token"},
+                status_code=status.HTTP_403_FORBIDDEN,
+            )
+            await response(scope, receive, send)
+            return
+        if self._busy:
+            response = JSONResponse(
+                {"detail": "Another request is being profiled"},
+                status_code=status.HTTP_409_CONFLICT,
+            )
+            await response(scope, receive, send)
+            return
+
+        self._busy = True
+        try:
+            await self._profile(scope, receive, send, "memory" in options)
+        finally:
+            self._busy = False
+
+    async def _profile(
+        self, scope: Scope, receive: Any, send: Any, trace_memory: bool
+    ) -> None:
+        profile = Profile(scope["method"], scope["path"], trace_memory)
+
+        async def send_wrapper(message: Any) -> None:
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (ID_HEADER, profile.id.encode()),
+                ]
+            await send(message)
+
+        started_tracing = False
+        has_peak = False
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            # Python 3.8 can't reset the peak, which is then only that of the
+            # request if tracing was started for it
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+                has_peak = True
+            else:
+                has_peak = started_tracing
+            before = tracemalloc.take_snapshot()
+
+        context_token = _current_profile.set(profile)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            profile.seconds = time.perf_counter() - start
+            _current_profile.reset(context_token)
+            profile.add(profiler)
+            if trace_memory:
+                if has_peak:
+                    _, profile.peak_memory = tracemalloc.get_traced_memory()
+                profile.allocations = [
+                    {
+                        "location": str(stat.traceback),
+                        "size": stat.size_diff,
+                        "count": stat.count_diff,
+                    }
+                    for stat in tracemalloc.take_snapshot().compare_to(
+                        before, "lineno"
+                    )[:MAX_ALLOCATIONS]
+                ]
+                if started_tracing:
+                    tracemalloc.stop()
+            _store(profile)
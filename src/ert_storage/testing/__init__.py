@@ -2,3 +2,4 @@
 Utilities for running ERT Storage integration tests in external software.
 """
 from ert_storage.testing.testclient import testclient_factory, ClientError
+from ert_storage.testing.query_budget import assert_query_budget, QueryBudgetExceeded
@@ -0,0 +1,365 @@
+"""
+Benchmarks of ERT Storage with a synthetic ERT workload: an experiment with
+one ensemble of parameters and responses, and observations of the responses.
+The benchmark uploads the ensemble, then reads it back the ways that ERT
+does, and records the latencies and throughput of each kind of request, and
+the peak memory of the whole run.
+
+Run it with
+
+    python -m ert_storage.testing.benchmark --output result.json
+
+and compare with an earlier result with `--baseline`. The database is the one
+of `ERT_STORAGE_DATABASE_URL`, as for the tests, so to benchmark PostgreSQL,
+point it to a database that has been set up with `ert-storage alembic upgrade
+head`. Everything is rolled back afterwards.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, conint
+
+if TYPE_CHECKING:
+    import requests
+    from ert_storage.testing.testclient import _TestClient
+
+
+# Formats that records are fetched in
+RECORD_FORMATS = (
+    "application/json",
+    "application/x-ndjson",
+    "application/x-numpy",
+    "text/csv",
+    "application/x-parquet",
+    "application/vnd.apache.arrow.stream",
+)
+
+# Formats that response dataframes are fetched in
+RESPONSE_FORMATS = ("text/csv", "application/x-parquet")
+
+PERCENTILES = (50, 95, 99)
+
+
+class Workload(BaseModel):
+    realizations: conint(ge=1) = 100  # type: ignore
+    parameters: conint(ge=1) = 10  # type: ignore
+    parameter_width: conint(ge=1) = 10  # type: ignore
+    responses: conint(ge=1) = 5  # type: ignore
+    response_width: conint(ge=1) = 1000  # type: ignore
+    observations: conint(ge=1) = 50  # type: ignore
+    repeat: conint(ge=1) = 5  # type: ignore
+    seed: int = 0
+
+
+class Timings:
+    """
+    Latencies and sizes of the requests of one benchmark
+    """
+
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.bytes = 0
+
+    def add(self, seconds: float, size: int) -> None:
+        self.latencies.append(seconds)
+        self.bytes += size
+
+    def to_dict(self) -> Dict[str, Any]:
+        latencies = np.array(self.latencies)
+        total = float(latencies.sum())
+        return {
+            "count": len(latencies),
+            "total_seconds": total,
+            "requests_per_second": len(latencies) / total if total > 0 else None,
+            "bytes_per_second": self.bytes / total if total > 0 else None,
+            **{
+                f"p{q}_seconds": float(np.percentile(latencies, q)) for q in PERCENTILES
+            },
+            "max_seconds": float(latencies.max()),
+        }
+
+
+def get_peak_rss() -> int:
+    """
+    The peak resident set size of this process, in bytes. It never decreases,
+    so it is only meaningful for the run as a whole.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Benchmark:
+    def __init__(self, client: "_TestClient", workload: Workload) -> None:
+        self.client = client
+        self.workload = workload
+        self.timings: Dict[str, Timings] = {}
+        self._random = np.random.default_rng(workload.seed)
+        self._experiment_id = ""
+        self._ensemble_id = ""
+
+    @property
+    def parameter_names(self) -> List[str]:
+        return [f"PARAM_{i}" for i in range(self.workload.parameters)]
+
+    @property
+    def response_names(self) -> List[str]:
+        return [f"RESPONSE_{i}" for i in range(self.workload.responses)]
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        self._create_ensemble()
+        self._upload_parameters("upload_parameters")
+        self._upload_responses("upload_responses")
+        self._upload_observations("upload_observations")
+        for _ in range(self.workload.repeat):
+            self._fetch_records("fetch_record")
+            self._fetch_response_dataframes("fetch_response_dataframe")
+            self._fetch_misfits("misfits")
+            self._fetch_listings("listings")
+        return {name: timings.to_dict() for name, timings in self.timings.items()}
+
+    def _request(
+        self, name: str, method: str, url: str, **kwargs: Any
+    ) -> "requests.Response":
+        start = time.perf_counter()
+        resp = getattr(self.client, method)(url, **kwargs)
+        seconds = time.perf_counter() - start
+        size = len(resp.content) + len(kwargs.get("data") or b"")
+        self.timings.setdefault(name, Timings()).add(seconds, size)
+        return resp
+
+    def _create_ensemble(self) -> None:
+        self._experiment_id = self.client.post(
+            "/experiments", json={"name": "benchmark", "priors": {}}
+        ).json()["id"]
+        self._ensemble_id = self.client.post(
+            f"/experiments/{self._experiment_id}/ensembles",
+            json={
+                "parameter_names": self.parameter_names,
+                "response_names": self.response_names,
+                "size": self.workload.realizations,
+                "active_realizations": list(range(self.workload.realizations)),
+            },
+        ).json()["id"]
+
+    def _upload_parameters(self, name: str) -> None:
+        shape = (self.workload.realizations, self.workload.parameter_width)
+        for parameter in self.parameter_names:
+            stream = io.BytesIO()
+            np.save(stream, self._random.standard_normal(shape))
+            self._request(
+                name,
+                "post",
+                f"/ensembles/{self._ensemble_id}/records/{parameter}/matrix",
+                data=stream.getvalue(),
+                headers={"content-type": "application/x-numpy"},
+            )
+
+    def _upload_responses(self, name: str) -> None:
+        columns = [str(i) for i in range(self.workload.response_width)]
+        for response in self.response_names:
+            for realization in range(self.workload.realizations):
+                dataframe = pd.DataFrame(
+                    [self._random.standard_normal(len(columns))],
+                    columns=columns,
+                    index=[str(realization)],
+                )
+                self._request(
+                    name,
+                    "post",
+                    f"/ensembles/{self._ensemble_id}/records/{response}/matrix",
+                    params={"realization_index": realization},
+                    data=dataframe.to_csv().encode(),
+                    headers={"content-type": "text/csv"},
+                )
+
+    def _upload_observations(self, name: str) -> None:
+        width = self.workload.response_width
+        count = min(self.workload.observations, width)
+        x_axis = [str(i) for i in np.linspace(0, width - 1, count).astype(int)]
+        for response in self.response_names:
+            observation_id = self._request(
+                name,
+                "post",
+                f"/experiments/{self._experiment_id}/observations",
+                json={
+                    "name": response,
+                    "x_axis": x_axis,
+                    "values": self._random.standard_normal(count).tolist(),
+                    "errors": self._random.uniform(0.1, 1.0, count).tolist(),
+                },
+            ).json()["id"]
+            for realization in range(self.workload.realizations):
+                self._request(
+                    name,
+                    "post",
+                    f"/ensembles/{self._ensemble_id}/records/{response}/observations",
+                    params={"realization_index": realization},
+                    json=[observation_id],
+                )
+
+    def _fetch_records(self, name: str) -> None:
+        for accept in RECORD_FORMATS:
+            for parameter in self.parameter_names:
+                self._request(
+                    f"{name}:{accept}",
+                    "get",
+                    f"/ensembles/{self._ensemble_id}/records/{parameter}",
+                    headers={"accept": accept},
+                )
+
+    def _fetch_response_dataframes(self, name: str) -> None:
+        for accept in RESPONSE_FORMATS:
+            for response in self.response_names:
+                self._request(
+                    f"{name}:{accept}",
+                    "get",
+                    f"/ensembles/{self._ensemble_id}/responses/{response}/data",
+                    headers={"accept": accept},
+                )
+
+    def _fetch_misfits(self, name: str) -> None:
+        for response in self.response_names:
+            self._request(
+                name,
+                "get",
+                "/compute/misfits",
+                params={"ensemble_id": self._ensemble_id, "response_name": response},
+            )
+
+    def _fetch_listings(self, name: str) -> None:
+        for url in (
+            "/experiments",
+            f"/experiments/{self._experiment_id}/ensembles",
+            f"/experiments/{self._experiment_id}/observations",
+            f"/ensembles/{self._ensemble_id}/records",
+            f"/ensembles/{self._ensemble_id}/parameters",
+            f"/ensembles/{self._ensemble_id}/responses",
+        ):
+            self._request(f"{name}:{url.split('/')[-1]}", "get", url)
+
+
+def run_benchmark(client: "_TestClient", workload: Workload) -> Dict[str, Any]:
+    """
+    Run the benchmark with `client`, and return its result file as a dict
+    """
+    from ert_storage.database import engine
+
+    benchmarks = Benchmark(client, workload).run()
+    return {
+        "time": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": engine.dialect.name,
+        "workload": workload.dict(),
+        "peak_rss_bytes": get_peak_rss(),
+        "benchmarks": benchmarks,
+    }
+
+
+def compare(
+    result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2
+) -> List[str]:
+    """
+    The benchmarks of `result` whose median latency is more than `tolerance`
+    worse than in `baseline`, and the peak memory of the run if it is worse
+    """
+    regressions = []
+    if result["workload"] != baseline["workload"]:
+        regressions.append("The workload differs from that of the baseline")
+    if result["database"] != baseline["database"]:
+        regressions.append("The database differs from that of the baseline")
+    for name, benchmark in result["benchmarks"].items():
+        if name in baseline["benchmarks"]:
+            regressions += _compare_value(
+                f"{name}: p50_seconds",
+                benchmark["p50_seconds"],
+                baseline["benchmarks"][name]["p50_seconds"],
+                tolerance,
+            )
+    regressions += _compare_value(
+        "peak_rss_bytes",
+        result["peak_rss_bytes"],
+        baseline["peak_rss_bytes"],
+        tolerance,
+    )
+    return regressions
+
+
+def _compare_value(name: str, new: float, old: float, tolerance: float) -> List[str]:
+    if old and new > old * (1 + tolerance):
+        return [f"{name} is {new:.4g}, was {old:.4g} (+{new / old - 1:.0%})"]
+    return []
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    lines = [
+        f"{'benchmark':<48} {'count':>6} {'req/s':>9} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'MB/s':>9}"
+    ]
+    for name, benchmark in result["benchmarks"].items():
+        lines.append(
+            f"{name:<48} {benchmark['count']:>6} "
+            f"{benchmark['requests_per_second'] or 0:>9.1f} "
+            f"{benchmark['p50_seconds'] * 1000:>9.2f} "
+            f"{benchmark['p95_seconds'] * 1000:>9.2f} "
+            f"{benchmark['p99_seconds'] * 1000:>9.2f} "
+            f"{(benchmark['bytes_per_second'] or 0) / 1e6:>9.2f}"
+        )
+    lines.append(f"Peak RSS: {result['peak_rss_bytes'] / 2**20:.1f} MiB")
+    return "\n".join(lines)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m ert_storage.testing.benchmark", description=__doc__
+    )
+    for name, field in Workload.__fields__.items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}", type=int, default=field.default
+        )
+    parser.add_argument("--output", help="File to write the result to, as JSON")
+    parser.add_argument("--baseline", help="Result to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Slowdown relative to the baseline that counts as a regression",
+    )
+    options = vars(parser.parse_args(args))
+    output, baseline, tolerance = (
+        options.pop("output"),
+        options.pop("baseline"),
+        options.pop("tolerance"),
+    )
+    workload = Workload(**options)
+
+    from ert_storage.testing import testclient_factory
+
+    os.environ["ERT_STORAGE_NO_TOKEN"] = "1"
+    with testclient_factory() as client:
+        result = run_benchmark(client, workload)
+
+    print(format_result(result))
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare(result, json.load(f), tolerance)
+        if regressions:
+            sys.exit("Regressions:\n" + "\n".join(regressions))
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Generator, List
+
+from sqlalchemy import event
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    """
+    The SQL statements that were executed while a query budget was active
+    """
+
+    def __init__(self) -> None:
+        self.statements: List[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _after_cursor_execute(
+        self, conn: Any, cursor: Any, statement: str, *args: Any
+    ) -> None:
+        with self._lock:
+            self.statements.append(statement)
+
+
+@contextmanager
+def assert_query_budget(max_queries: int) -> Generator[QueryCounter, None, None]:
+    """
+    Assert that at most `max_queries` SQL statements are executed within the
+    block, eg. by the requests that it makes with the test client. This
+    catches N+1 patterns, where the number of statements grows with the
+    number of records, by making the same requests on small and large
+    ensembles with the same budget.
+    """
+    from ert_storage.database import engine
+
+    counter = QueryCounter()
+    event.listen(engine, "after_cursor_execute", counter._after_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "after_cursor_execute", counter._after_cursor_execute)
+
+    if counter.count > max_queries:
+        statements = "\n\n".join(
+            f"{i}: {statement}" for i, statement in enumerate(counter.statements, 1)
+        )
+        raise QueryBudgetExceeded(
+            f"{counter.count} SQL statements were executed, but the budget is "
+            f"{max_queries}:\n\n{statements}"
+        )
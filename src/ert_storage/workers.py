@@ -0,0 +1,166 @@
+"""
+A pool of worker threads for CPU-heavy work, such as encoding and decoding
+matrices, assembling dataframes and computing misfits, so that it doesn't
+block the event loop, and with it every other request.
+
+Threads are used rather than processes, since NumPy, pandas and Arrow release
+the GIL for most of this work, and dataframes and database objects would
+otherwise have to be pickled. The number of threads is `ERT_STORAGE_WORKERS`,
+which defaults to the number of CPUs.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from ert_storage.profiling import run_profiled
+
+
+ENV_WORKERS = "ERT_STORAGE_WORKERS"
+
+T = TypeVar("T")
+
+
+def get_worker_count() -> int:
+    value = os.getenv(ENV_WORKERS)
+    if value:
+        return max(1, int(value))
+    return os.cpu_count() or 1
+
+
+class TaskStats:
+    """
+    Timings of the tasks of one function
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.failures = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.max_run_seconds = 0.0
+
+    def add(self, wait: float, run: float, failed: bool) -> None:
+        self.count += 1
+        self.failures += failed
+        self.wait_seconds += wait
+        self.run_seconds += run
+        self.max_run_seconds = max(self.max_run_seconds, run)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "wait_seconds": self.wait_seconds,
+            "run_seconds": self.run_seconds,
+            "max_run_seconds": self.max_run_seconds,
+        }
+
+
+class WorkerPool:
+    def __init__(self, max_workers: int) -> None:
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="ert-storage-worker"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._tasks: Dict[str, TaskStats] = {}
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Call `func(*args)` in a worker thread, with the context variables of
+        the caller
+        """
+        context = contextvars.copy_context()
+        with self._lock:
+            self._queued += 1
+        future = self._executor.submit(
+            self._call, context, time.perf_counter(), func, args
+        )
+        future.add_done_callback(self._cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _call(
+        self,
+        context: contextvars.Context,
+        submitted: float,
+        func: Callable[..., Any],
+        args: Any,
+    ) -> Any:
+        started = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        failed = True
+        try:
+            result = context.run(run_profiled, func, *args)
+            failed = False
+            return result
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._running -= 1
+                name = _task_name(func)
+                if name not in self._tasks:
+                    self._tasks[name] = TaskStats()
+                self._tasks[name].add(started - submitted, finished - started, failed)
+
+    def _cancelled(self, future: "Future[Any]") -> None:
+        # Tasks that are cancelled before they start are never called
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "running": self._running,
+                "queued": self._queued,
+                "tasks": {name: task.to_dict() for name, task in self._tasks.items()},
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> WorkerPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(get_worker_count())
+        return _pool
+
+
+def shutdown_worker_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+async def run_in_worker(func: Callable[..., T], *args: Any) -> T:
+    """
+    Call `func(*args)` in the worker pool, so that the event loop can serve
+    other requests in the meantime
+    """
+    return await get_worker_pool().run(func, *args)
+
+
+def _task_name(func: Callable[..., Any]) -> str:
+    while isinstance(func, functools.partial):
+        func = func.func
+    module = getattr(func, "__module__", None) or ""
+    name = getattr(func, "__qualname__", None) or type(func).__qualname__
+    return f"{module}.{name}" if module else name
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import status
+
+
+def test_correlations(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs", "mult"], ["FOPR"])
+    x = np.random.rand(20, 3)
+    mult = np.random.rand(20)
+    fopr = np.stack([3 * x[:, 1], -mult, np.random.rand(20)], axis=1)
+
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        data=pd.DataFrame(x, columns=["a", "b", "c"]).to_csv(),
+        headers={"content-type": "text/csv"},
+    )
+    for index in range(20):
+        client.post(
+            f"/ensembles/{ensemble_id}/records/mult/matrix",
+            json=[mult[index]],
+            params=dict(realization_index=index),
+        )
+        client.post(
+            f"/ensembles/{ensemble_id}/records/FOPR/matrix",
+            data=pd.DataFrame(
+                [fopr[index]], columns=["2020", "2021", "2022"], index=[index]
+            ).to_csv(),
+            headers={"content-type": "text/csv"},
+            params=dict(realization_index=index),
+        )
+
+    resp = client.get(
+        "/compute/correlations",
+        params=dict(ensemble_id=ensemble_id, top_k=2),
+    ).json()
+
+    assert set(resp) == {"FOPR:2020", "FOPR:2021", "FOPR:2022"}
+    assert len(resp["FOPR:2020"]) == 2
+    assert resp["FOPR:2020"][0]["parameter"] == "coeffs:b"
+    assert resp["FOPR:2020"][0]["correlation"] == pytest.approx(1.0)
+    assert resp["FOPR:2021"][0]["parameter"] == "mult"
+    assert resp["FOPR:2021"][0]["correlation"] == pytest.approx(-1.0)
+
+    resp = client.get(
+        "/compute/correlations",
+        params=dict(ensemble_id=ensemble_id, method="spearman", top_k=1),
+    ).json()
+    assert resp["FOPR:2020"][0]["correlation"] == pytest.approx(1.0)
+
+
+def test_correlations_invalid(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs"], ["FOPR"])
+    client.get(
+        "/compute/correlations",
+        params=dict(ensemble_id=ensemble_id, method="kendall"),
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+    client.get(
+        "/compute/correlations",
+        params=dict(ensemble_id=ensemble_id),
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
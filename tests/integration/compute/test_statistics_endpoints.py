@@ -0,0 +1,143 @@
+import io
+import numpy as np
+import pandas as pd
+from fastapi import status
+from numpy.testing import assert_array_almost_equal
+
+
+def test_statistics_of_response(client, simple_ensemble):
+    ensemble_id = simple_ensemble(responses=["FOPR"], size=5)
+    matrix = np.random.rand(5, 8)
+    columns = ["A", "B", "C", "D", "E", "F", "G", "H"]
+
+    for index, row in enumerate(matrix):
+        client.post(
+            f"/ensembles/{ensemble_id}/records/FOPR/matrix",
+            data=pd.DataFrame([row], columns=columns, index=[index]).to_csv(),
+            headers={"content-type": "text/csv"},
+            params=dict(realization_index=index),
+        )
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FOPR/statistics",
+        headers={"accept": "text/csv"},
+    )
+    stats = pd.read_csv(io.BytesIO(resp.content), index_col=0)
+    assert list(stats.columns) == columns
+    assert list(stats.index) == ["mean", "std", "min", "max", "p10", "p50", "p90"]
+    assert_array_almost_equal(stats.loc["mean"], matrix.mean(axis=0))
+    assert_array_almost_equal(stats.loc["std"], matrix.std(axis=0, ddof=1))
+    assert_array_almost_equal(stats.loc["p90"], np.quantile(matrix, 0.9, axis=0))
+
+
+def test_statistics_of_ensemble_wide_parameter(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs"])
+    matrix = np.random.rand(10, 3)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        json=matrix.tolist(),
+    )
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/coeffs/statistics",
+        params=dict(quantiles=[0.5]),
+    )
+    stats = np.array(resp.json())
+    assert stats.shape == (5, 3)
+    assert_array_almost_equal(stats[0], matrix.mean(axis=0))
+    assert_array_almost_equal(stats[2], matrix.min(axis=0))
+    assert_array_almost_equal(stats[4], np.median(matrix, axis=0))
+
+
+def test_statistics_errors(client, simple_ensemble):
+    ensemble_id = simple_ensemble()
+    client.get(
+        f"/ensembles/{ensemble_id}/records/missing/statistics",
+        check_status_code=status.HTTP_404_NOT_FOUND,
+    )
+
+    client.post(f"/ensembles/{ensemble_id}/records/foo/matrix", json=[[1, 2]])
+    client.get(
+        f"/ensembles/{ensemble_id}/records/foo/statistics",
+        params=dict(quantiles=[1.5]),
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+
+
+def test_running_statistics(client, simple_ensemble):
+    ensemble_id = simple_ensemble(responses=["FOPR"], size=10)
+    matrix = np.random.rand(10, 4)
+    matrix[3, 1] = np.nan
+    columns = ["A", "B", "C", "D"]
+
+    for index, row in enumerate(matrix):
+        client.post(
+            f"/ensembles/{ensemble_id}/records/FOPR/matrix",
+            data=pd.DataFrame([row], columns=columns, index=[index]).to_csv(),
+            headers={"content-type": "text/csv"},
+            params=dict(realization_index=index),
+        )
+
+        resp = client.get(
+            f"/ensembles/{ensemble_id}/records/FOPR/statistics",
+            params=dict(running=True),
+            headers={"accept": "text/csv"},
+        )
+        stats = pd.read_csv(io.BytesIO(resp.content), index_col=0)
+        assert list(stats.index) == ["mean", "std", "min", "max"]
+        assert list(stats.columns) == columns
+        assert_array_almost_equal(
+            stats.loc["mean"], np.nanmean(matrix[: index + 1], axis=0)
+        )
+        assert_array_almost_equal(
+            stats.loc["max"], np.nanmax(matrix[: index + 1], axis=0)
+        )
+    assert_array_almost_equal(stats.loc["std"], np.nanstd(matrix, axis=0, ddof=1))
+
+
+def test_running_statistics_of_differently_labeled_records(client, simple_ensemble):
+    ensemble_id = simple_ensemble(responses=["FOPR"])
+    for index, columns in enumerate([["A", "B"], ["A", "C"]]):
+        client.post(
+            f"/ensembles/{ensemble_id}/records/FOPR/matrix",
+            data=pd.DataFrame([[1.0, 2.0]], columns=columns, index=[index]).to_csv(),
+            headers={"content-type": "text/csv"},
+            params=dict(realization_index=index),
+        )
+
+    # Running statistics are invalidated, so fall back to reading the records
+    client.get(
+        f"/ensembles/{ensemble_id}/records/FOPR/statistics",
+        params=dict(running=True),
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+
+
+def test_running_statistics_of_records_without_statistics(client, simple_ensemble):
+    from ert_storage import database_schema as ds
+
+    ensemble_id = simple_ensemble(responses=["FOPR"], size=3)
+    matrix = np.random.rand(3, 2)
+
+    def post(index):
+        client.post(
+            f"/ensembles/{ensemble_id}/records/FOPR/matrix",
+            json=[matrix[index].tolist()],
+            params=dict(realization_index=index),
+        )
+
+    post(0)
+    post(1)
+    # Records that were uploaded before running statistics were introduced
+    db = client.session()
+    db.query(ds.RecordStatistics).delete()
+    db.commit()
+    post(2)
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FOPR/statistics",
+        params=dict(running=True),
+        headers={"accept": "text/csv"},
+    )
+    stats = pd.read_csv(io.BytesIO(resp.content), index_col=0)
+    assert_array_almost_equal(stats.loc["mean"], matrix.mean(axis=0))
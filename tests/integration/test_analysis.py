@@ -0,0 +1,284 @@
+import io
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from fastapi import status
+from numpy.testing import assert_array_equal
+
+
+def _create_smoother_ensemble(client, create_experiment, create_ensemble):
+    experiment_id = create_experiment("analysis")
+    ensemble_id = create_ensemble(experiment_id, ["coeffs", "mult"], ["FOPR", "WOPR"])
+    coeffs = np.random.rand(4, 3)
+    mult = np.random.rand(4)
+    fopr = np.random.rand(4, 5)
+
+    obs_id = client.post(
+        f"/experiments/{experiment_id}/observations",
+        json=dict(
+            name="FOPR_OBS",
+            values=[10.0, 30.0],
+            errors=[0.1, 0.3],
+            x_axis=["2001", "2003"],
+        ),
+    ).json()["id"]
+
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        json=coeffs.tolist(),
+    )
+    for index in range(4):
+        client.post(
+            f"/ensembles/{ensemble_id}/records/mult/matrix",
+            json=[mult[index]],
+            params=dict(realization_index=index),
+        )
+        # Realization 3 failed and has no responses
+        if index == 3:
+            continue
+        for name in ("FOPR", "WOPR"):
+            client.post(
+                f"/ensembles/{ensemble_id}/records/{name}/matrix",
+                data=pd.DataFrame(
+                    [fopr[index]],
+                    columns=["2000", "2001", "2002", "2003", "2004"],
+                    index=[index],
+                ).to_csv(),
+                headers={"content-type": "text/csv"},
+                params=dict(realization_index=index),
+            )
+        client.post(
+            f"/ensembles/{ensemble_id}/records/FOPR/observations",
+            json=[obs_id],
+            params=dict(realization_index=index),
+        )
+    return ensemble_id, coeffs, mult, fopr
+
+
+def test_analysis_input_npz(client, create_experiment, create_ensemble):
+    ensemble_id, coeffs, mult, fopr = _create_smoother_ensemble(
+        client, create_experiment, create_ensemble
+    )
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/analysis-input",
+        headers={"accept": "application/x-npz"},
+    )
+    bundle = np.load(io.BytesIO(resp.content))
+
+    assert_array_equal(bundle["realizations"], [0, 1, 2])
+    assert_array_equal(bundle["parameter_names"], ["coeffs", "mult"])
+    assert_array_equal(bundle["parameter_offsets"], [0, 3, 4])
+    assert_array_equal(bundle["X"][:3], coeffs[:3].T)
+    assert_array_equal(bundle["X"][3], mult[:3])
+    assert_array_equal(bundle["Y"], fopr[:3, [1, 3]].T)
+    assert_array_equal(bundle["d"], [10.0, 30.0])
+    assert_array_equal(bundle["std"], [0.1, 0.3])
+    assert_array_equal(bundle["observation_keys"], ["FOPR_OBS:2001", "FOPR_OBS:2003"])
+
+
+def test_analysis_input_formats(client, create_experiment, create_ensemble):
+    ensemble_id, coeffs, mult, fopr = _create_smoother_ensemble(
+        client, create_experiment, create_ensemble
+    )
+
+    bundle = client.get(f"/ensembles/{ensemble_id}/analysis-input").json()
+    assert_array_equal(bundle["Y"], fopr[:3, [1, 3]].T)
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/analysis-input",
+        headers={"accept": "application/vnd.apache.arrow.stream"},
+    )
+    table = pa.ipc.open_stream(io.BytesIO(resp.content)).read_all()
+    assert table.column_names == ["kind", "key", "value", "std", "0", "1", "2"]
+    assert table.column("kind").to_pylist() == ["parameter"] * 4 + ["observation"] * 2
+    assert_array_equal(table.column("1").to_numpy()[4:], fopr[1, [1, 3]])
+
+
+def test_analysis_input_dates(client, create_experiment, create_ensemble):
+    experiment_id = create_experiment("analysis")
+    ensemble_id = create_ensemble(experiment_id, [], ["FOPR"])
+    dates = pd.date_range("2000-01-01", periods=3, freq="YS")
+    fopr = np.random.rand(2, 3)
+
+    def post_observation(name, x_axis):
+        return client.post(
+            f"/experiments/{experiment_id}/observations",
+            json=dict(name=name, values=[1.0], errors=[0.1], x_axis=x_axis),
+        ).json()["id"]
+
+    obs_id = post_observation("FOPR_OBS", ["2001-01-01T00:00:00"])
+    for index in range(2):
+        client.post(
+            f"/ensembles/{ensemble_id}/records/FOPR/matrix",
+            data=pd.DataFrame([fopr[index]], columns=dates, index=[index]).to_csv(),
+            headers={"content-type": "text/csv"},
+            params=dict(realization_index=index),
+        )
+        client.post(
+            f"/ensembles/{ensemble_id}/records/FOPR/observations",
+            json=[obs_id],
+            params=dict(realization_index=index),
+        )
+
+    # The observation's dates match the response's labels as dates
+    bundle = client.get(f"/ensembles/{ensemble_id}/analysis-input").json()
+    assert_array_equal(bundle["Y"], fopr[:, [1]].T)
+
+    # Observations of labels that the response doesn't have can't be analysed
+    client.post(
+        f"/ensembles/{ensemble_id}/records/FOPR/observations",
+        json=[post_observation("LATE_OBS", ["2005-01-01"])],
+        params=dict(realization_index=0),
+    )
+    client.get(
+        f"/ensembles/{ensemble_id}/analysis-input",
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+
+
+def test_analysis_input_empty(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs"], ["FOPR"])
+    client.get(
+        f"/ensembles/{ensemble_id}/analysis-input",
+        check_status_code=status.HTTP_404_NOT_FOUND,
+    )
+
+
+def test_post_parameters_npz(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs", "mult"])
+    X = np.random.rand(4, 5)
+
+    stream = io.BytesIO()
+    np.savez(
+        stream,
+        X=X,
+        parameter_names=np.array(["coeffs", "mult"]),
+        parameter_offsets=np.array([0, 3, 4]),
+        parameter_keys=np.array(["coeffs:a", "coeffs:b", "coeffs:c", "mult"]),
+    )
+    ids = client.post(
+        f"/ensembles/{ensemble_id}/parameters",
+        data=stream.getvalue(),
+        headers={"content-type": "application/x-npz"},
+    ).json()
+    assert set(ids) == {"coeffs", "mult"}
+
+    resp = client.get(f"/ensembles/{ensemble_id}/records/coeffs")
+    assert_array_equal(resp.json(), X[:3].T)
+    resp = client.get(f"/ensembles/{ensemble_id}/records/mult")
+    assert_array_equal(np.array(resp.json()).flatten(), X[3])
+    resp = client.get(f"/ensembles/{ensemble_id}/parameters")
+    assert resp.json() == [
+        {"name": "coeffs", "labels": ["a", "b", "c"]},
+        {"name": "mult", "labels": []},
+    ]
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/coeffs",
+        params=dict(realization_index=2),
+    )
+    assert_array_equal(resp.json(), X[:3, 2])
+
+    # Parameters can only be written once
+    client.post(
+        f"/ensembles/{ensemble_id}/parameters",
+        data=stream.getvalue(),
+        headers={"content-type": "application/x-npz"},
+        check_status_code=status.HTTP_409_CONFLICT,
+    )
+
+
+def test_post_parameters_unsized_ensemble(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs", "mult"], responses=["resp"])
+    X = [[1.0, 2.0]]
+
+    # Realizations beyond those of the ensemble aren't allocated rows for
+    for realizations in ([0, 10**9], [0, 2]):
+        client.post(
+            f"/ensembles/{ensemble_id}/parameters",
+            json=dict(
+                X=X,
+                parameter_names=["coeffs"],
+                parameter_offsets=[0, 1],
+                realizations=realizations,
+            ),
+            check_status_code=status.HTTP_417_EXPECTATION_FAILED,
+        )
+
+    # Other records tell how many realizations the ensemble has
+    client.post(
+        f"/ensembles/{ensemble_id}/records/resp/matrix",
+        params=dict(realization_index=2),
+        json=[1.0],
+    )
+    client.post(
+        f"/ensembles/{ensemble_id}/parameters",
+        json=dict(
+            X=X,
+            parameter_names=["coeffs"],
+            parameter_offsets=[0, 1],
+            realizations=[0, 2],
+        ),
+    )
+    resp = client.get(f"/ensembles/{ensemble_id}/records/coeffs")
+    assert_array_equal(resp.json(), [[1.0], [np.nan], [2.0]])
+
+
+def test_post_parameters_json(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs"], size=4, active_realizations=[0, 2, 3])
+    X = [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]
+
+    client.post(
+        f"/ensembles/{ensemble_id}/parameters",
+        json=dict(
+            X=X,
+            parameter_names=["coeffs"],
+            parameter_offsets=[0, 2],
+            realizations=[0, 2, 3],
+        ),
+    )
+    resp = client.get(f"/ensembles/{ensemble_id}/records/coeffs")
+    assert_array_equal(
+        resp.json(), [[1.0, 4.0], [np.nan, np.nan], [2.0, 5.0], [3.0, 6.0]]
+    )
+
+    client.post(
+        f"/ensembles/{ensemble_id}/parameters",
+        json=dict(X=X, parameter_names=["coeffs"], parameter_offsets=[0, 1]),
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+    client.post(
+        f"/ensembles/{ensemble_id}/parameters",
+        json=dict(X=X, parameter_names=["other"], parameter_offsets=[0, 2]),
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+    client.post(
+        f"/ensembles/{ensemble_id}/parameters",
+        json=dict(
+            X=X,
+            parameter_names=["coeffs"],
+            parameter_offsets=[0, 2],
+            realizations=[0, 1, 2],
+        ),
+        check_status_code=status.HTTP_417_EXPECTATION_FAILED,
+    )
+    for realizations in ([-1, 0, 2], [0, 2, 2]):
+        client.post(
+            f"/ensembles/{ensemble_id}/parameters",
+            json=dict(
+                X=X,
+                parameter_names=["coeffs"],
+                parameter_offsets=[0, 2],
+                realizations=realizations,
+            ),
+            check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    client.post(
+        f"/ensembles/{ensemble_id}/parameters",
+        json=dict(
+            X=X,
+            parameter_names=["coeffs", "coeffs"],
+            parameter_offsets=[0, 1, 2],
+        ),
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
@@ -0,0 +1,53 @@
+import copy
+
+from ert_storage.testing.benchmark import (
+    RECORD_FORMATS,
+    Workload,
+    compare,
+    run_benchmark,
+)
+
+
+def test_benchmark(client):
+    workload = Workload(
+        realizations=3,
+        parameters=2,
+        parameter_width=4,
+        responses=2,
+        response_width=10,
+        observations=3,
+        repeat=2,
+    )
+    result = run_benchmark(client, workload)
+    assert result["database"] == "sqlite"
+    assert result["workload"] == workload.dict()
+
+    benchmarks = result["benchmarks"]
+    assert benchmarks["upload_parameters"]["count"] == 2
+    assert benchmarks["upload_responses"]["count"] == 6
+    # One observation per response, which is linked to every realization
+    assert benchmarks["upload_observations"]["count"] == 2 + 6
+    for accept in RECORD_FORMATS:
+        assert benchmarks[f"fetch_record:{accept}"]["count"] == 4
+    assert benchmarks["misfits"]["count"] == 4
+    for benchmark in benchmarks.values():
+        assert (
+            0
+            < benchmark["p50_seconds"]
+            <= benchmark["p95_seconds"]
+            <= benchmark["p99_seconds"]
+            <= benchmark["max_seconds"]
+        )
+    assert result["peak_rss_bytes"] > 0
+
+    assert compare(result, result) == []
+    slower = copy.deepcopy(result)
+    slower["benchmarks"]["misfits"]["p50_seconds"] *= 2
+    (regression,) = compare(slower, result)
+    assert regression.startswith("misfits: p50_seconds")
+
+    # Memory is compared for the run as a whole
+    larger = copy.deepcopy(result)
+    larger["peak_rss_bytes"] *= 2
+    (regression,) = compare(larger, result)
+    assert regression.startswith("peak_rss_bytes")
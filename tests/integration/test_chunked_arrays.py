@@ -0,0 +1,109 @@
+import io
+
+import numpy as np
+import pytest
+from fastapi import status
+from numpy.lib.format import write_array
+from numpy.testing import assert_array_equal
+
+
+def _npy(array):
+    stream = io.BytesIO()
+    write_array(stream, array)
+    return stream.getvalue()
+
+
+def test_hyperslab_of_realizations(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["PORO"], [], size=3)
+    fields = np.random.rand(3, 10, 8, 5)
+    for real, field in enumerate(fields):
+        client.post(
+            f"/ensembles/{ensemble_id}/records/PORO/array",
+            data=_npy(field),
+            headers={"content-type": "application/x-numpy"},
+            params=dict(realization_index=real, chunks="4,4,2"),
+        )
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/PORO/array",
+        params=dict(realizations="0,2", slices="3:9,5,:"),
+    ).json()
+    assert resp["realizations"] == [0, 2]
+    assert_array_equal(resp["data"], fields[[0, 2], 3:9, 5:6, :])
+
+    # A well column
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/PORO/array",
+        params=dict(slices="7,2"),
+        headers={"accept": "application/x-numpy"},
+    )
+    assert_array_equal(np.load(io.BytesIO(resp.content)), fields[:, 7:8, 2:3, :])
+
+
+def test_ensemble_wide_array(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["PERMX"], [], size=4)
+    fields = np.random.rand(4, 6, 7)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/PERMX/array",
+        json=fields.tolist(),
+        headers={"content-type": "application/json"},
+        params=dict(chunks="3,4,4"),
+    )
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/PERMX/array",
+        params=dict(realizations="1-2", slices=":3,4:"),
+        headers={"accept": "application/x-npz"},
+    )
+    npz = np.load(io.BytesIO(resp.content))
+    assert_array_equal(npz["realizations"], [1, 2])
+    assert_array_equal(npz["data"], fields[1:3, :3, 4:])
+
+
+def test_default_chunks(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["PORO"], [], size=1)
+    field = np.random.rand(100, 60, 30)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/PORO/array",
+        data=_npy(field),
+        headers={"content-type": "application/x-numpy"},
+        params=dict(realization_index=0),
+    )
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/PORO/array",
+        params=dict(slices="99,:,29"),
+    ).json()
+    assert_array_equal(resp["data"], field[np.newaxis, 99:, :, 29:])
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        dict(slices="10:20"),
+        dict(slices="0,0,0"),
+        dict(slices="a"),
+        dict(realizations="x"),
+        dict(realizations="3-1"),
+        dict(realizations="0-999999999"),
+    ],
+)
+def test_invalid_selection(client, simple_ensemble, params):
+    ensemble_id = simple_ensemble(["PORO"], [], size=1)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/PORO/array",
+        data=_npy(np.zeros((10, 10))),
+        headers={"content-type": "application/x-numpy"},
+        params=dict(realization_index=0),
+    )
+    client.get(
+        f"/ensembles/{ensemble_id}/records/PORO/array",
+        params=params,
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+
+
+def test_array_not_found(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["PORO"], [], size=1)
+    client.get(
+        f"/ensembles/{ensemble_id}/records/PORO/array",
+        check_status_code=status.HTTP_404_NOT_FOUND,
+    )
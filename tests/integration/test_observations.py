@@ -1,5 +1,5 @@
 from uuid import uuid4
-from ert_storage.testing import ClientError
+from ert_storage.testing import ClientError, assert_query_budget
 import pytest
 
 OBSERVATIONS = {
@@ -147,3 +147,29 @@ def test_records_without_observations(client, create_experiment, create_ensemble
 
     ensemble_records = client.get(f"/ensembles/{ensemble_id}/records").json()
     assert ensemble_records[record_name]["has_observations"] is False
+
+
+@pytest.mark.parametrize("count", [1, 3])
+def test_observations_query_budget(client, create_experiment, create_ensemble, count):
+    experiment_id = create_experiment("test_ensembles")
+    ensemble_id = create_ensemble(experiment_id=experiment_id)
+    for index, (name, values) in enumerate(list(RECORDS.items())[:count]):
+        record = client.post(
+            f"/ensembles/{ensemble_id}/records/{name}/matrix", json=values
+        ).json()
+        obs = OBSERVATIONS[f"OBS{index + 1}"]
+        client.post(
+            f"/experiments/{experiment_id}/observations",
+            json=dict(name=f"OBS{index + 1}", records=[record["id"]], **obs),
+        )
+
+    # The number of statements doesn't depend on the number of observations
+    with assert_query_budget(4):
+        observations = client.get(f"/experiments/{experiment_id}/observations").json()
+    assert len(observations) == count
+    assert all(len(obs["records"]) == 1 for obs in observations)
+    with assert_query_budget(5):
+        client.get(f"/ensembles/{ensemble_id}/observations")
+    with assert_query_budget(3):
+        records = client.get(f"/ensembles/{ensemble_id}/records").json()
+    assert all(record["has_observations"] for record in records.values())
@@ -5,10 +5,13 @@ import random
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 import pytest
 from fastapi import status
 from numpy.testing import assert_array_equal
 
+from ert_storage.testing import QueryBudgetExceeded, assert_query_budget
+
 NUM_REALIZATIONS = 5
 PARAMETERS = [
     [1.1, 2.1, 3.1],
@@ -95,6 +98,43 @@ def test_parameters(client, simple_ensemble):
         assert resp.json() == PARAMETERS[realization_index]
 
 
+@pytest.mark.parametrize("count", [2, 8])
+def test_query_budget(client, simple_ensemble, count):
+    names = [f"param{i}" for i in range(count)]
+    ensemble_id = simple_ensemble(names, ["resp"], size=count)
+    for name in names:
+        client.post(
+            f"/ensembles/{ensemble_id}/records/{name}/matrix",
+            data=pd.DataFrame(np.random.rand(count, 2), columns=["a", "b"]).to_csv(),
+            headers={"content-type": "text/csv"},
+        )
+    for index in range(count):
+        client.post(
+            f"/ensembles/{ensemble_id}/records/resp/matrix",
+            params=dict(realization_index=index),
+            json=[1.0, 2.0],
+        )
+
+    # The number of statements doesn't depend on the number of records
+    with assert_query_budget(3):
+        resp = client.get(f"/ensembles/{ensemble_id}/parameters")
+    assert resp.json() == [{"name": name, "labels": ["a", "b"]} for name in names]
+    with assert_query_budget(2):
+        assert len(client.get(f"/ensembles/{ensemble_id}/records").json()) == count + 1
+    with assert_query_budget(2):
+        assert list(client.get(f"/ensembles/{ensemble_id}/responses").json()) == [
+            "resp"
+        ]
+
+
+def test_query_budget_exceeded(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs"], size=1)
+    with pytest.raises(QueryBudgetExceeded, match="budget is 0"):
+        with assert_query_budget(0) as counter:
+            client.get(f"/ensembles/{ensemble_id}/parameters")
+    assert counter.count > 0
+
+
 def test_ensemble_wide_parameters(client, simple_ensemble):
     ensemble_id = simple_ensemble(["coeffs"])
     client.post(
@@ -554,6 +594,12 @@ def test_fetch_matrix_ensemble_record_by_realization(client, simple_ensemble):
     real_4 = resp.json()
     assert real_4 == [5.0, 5.0]
 
+    client.get(
+        url=f"/ensembles/{ensemble_id}/records/polynomial_output",
+        params={"realization_index": 5},
+        check_status_code=status.HTTP_404_NOT_FOUND,
+    )
+
 
 @pytest.mark.parametrize(
     "mimetype",
@@ -770,3 +816,599 @@ def test_get_ens_wide_record_label(
         f"/ensembles/{ensemble_id}/records/ens_wide/labels",
     )
     assert resp.json() == []
+
+
+@pytest.mark.parametrize(
+    "mimetype",
+    [
+        "application/json",
+        "application/x-numpy",
+        "text/csv",
+        "application/x-parquet",
+        "application/vnd.apache.arrow.stream",
+    ],
+)
+def test_post_matrices(client, simple_ensemble, mimetype):
+    ensemble_id = simple_ensemble(responses=["FOPR"], size=6)
+    matrix = np.random.rand(6, 4)
+    labels = ["2000", "2001", "2002", "2003"]
+    df = pd.DataFrame(matrix, columns=labels)
+
+    params = {}
+    if mimetype == "application/json":
+        data = json.dumps(matrix.tolist())
+        params = dict(realization_index=list(range(6)))
+    elif mimetype == "application/x-numpy":
+        from numpy.lib.format import write_array
+
+        stream = io.BytesIO()
+        write_array(stream, matrix)
+        data = stream.getvalue()
+    elif mimetype == "text/csv":
+        data = df.to_csv()
+    elif mimetype == "application/x-parquet":
+        stream = io.BytesIO()
+        df.to_parquet(stream)
+        data = stream.getvalue()
+    else:
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df.rename_axis("realization_index").reset_index())
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        data = sink.getvalue().to_pybytes()
+
+    ids = client.post(
+        f"/ensembles/{ensemble_id}/records/FOPR/matrices",
+        data=data,
+        headers={"content-type": mimetype},
+        params=params,
+    ).json()
+    assert len(ids["FOPR"]) == 6
+
+    for index in range(6):
+        resp = client.get(
+            f"/ensembles/{ensemble_id}/records/FOPR",
+            params=dict(realization_index=index),
+        )
+        assert_array_equal(np.array(resp.json()).flatten(), matrix[index])
+
+    resp = client.get(f"/records/{ids['FOPR'][2]}/data")
+    assert_array_equal(np.array(resp.json()).flatten(), matrix[2])
+
+    if mimetype not in ("application/json", "application/x-numpy"):
+        resp = client.get(
+            f"/ensembles/{ensemble_id}/records/FOPR/labels",
+        )
+        assert resp.json() == labels
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FOPR/statistics",
+        params=dict(running=True),
+    )
+    assert np.array(resp.json())[0] == pytest.approx(matrix.mean(axis=0))
+
+
+def test_post_matrices_validation(client, simple_ensemble):
+    ensemble_id = simple_ensemble(size=4, active_realizations=[0, 1, 3])
+
+    client.post(
+        f"/ensembles/{ensemble_id}/records/foo/matrices",
+        json=[[1.0], [2.0], [3.0]],
+        params=dict(realization_index=[0, 1, 2]),
+        check_status_code=status.HTTP_417_EXPECTATION_FAILED,
+    )
+    client.post(
+        f"/ensembles/{ensemble_id}/records/foo/matrices",
+        json=[[1.0], [2.0]],
+        params=dict(realization_index=[0, 1, 3]),
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+    client.post(
+        f"/ensembles/{ensemble_id}/records/foo/matrix",
+        json=[1.0],
+        params=dict(realization_index=1),
+    )
+    client.post(
+        f"/ensembles/{ensemble_id}/records/foo/matrices",
+        json=[[1.0], [2.0]],
+        params=dict(realization_index=[0, 1]),
+        check_status_code=status.HTTP_409_CONFLICT,
+    )
+    client.post(
+        f"/ensembles/{ensemble_id}/records/foo/matrices",
+        json=[[1.0], [2.0]],
+        params=dict(realization_index=[0, 3]),
+    )
+
+
+def test_post_matrices_of_many_records(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs"], ["FOPR"])
+    coeffs = np.random.rand(3, 2)
+    fopr = np.random.rand(3, 1, 5)
+
+    stream = io.BytesIO()
+    np.savez(stream, coeffs=coeffs, FOPR=fopr)
+    ids = client.post(
+        f"/ensembles/{ensemble_id}/records/matrices",
+        data=stream.getvalue(),
+        headers={"content-type": "application/x-npz"},
+        params=dict(realization_index=[2, 4, 6]),
+    ).json()
+    assert set(ids) == {"coeffs", "FOPR"}
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FOPR",
+        params=dict(realization_index=4),
+    )
+    assert_array_equal(resp.json(), fopr[1, 0])
+    resp = client.get(f"/ensembles/{ensemble_id}/records/coeffs")
+    assert_array_equal(resp.json(), coeffs)
+    resp = client.get(f"/ensembles/{ensemble_id}/responses")
+    assert set(resp.json()) == {"FOPR"}
+
+
+@pytest.mark.parametrize(
+    "mimetype",
+    ["application/json", "application/x-npz", "application/vnd.apache.arrow.stream"],
+)
+def test_query_records(client, simple_ensemble, mimetype):
+    ensemble_id = simple_ensemble(["coeffs"], ["FOPR"], size=4)
+    coeffs = np.random.rand(4, 2)
+    fopr = np.random.rand(4, 3)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        json=coeffs.tolist(),
+    )
+    for real in range(4):
+        client.post(
+            f"/ensembles/{ensemble_id}/records/FOPR/matrix",
+            data=pd.DataFrame(fopr[[real]], columns=["a", "b", "c"]).to_csv(),
+            headers={"content-type": "text/csv"},
+            params=dict(realization_index=real),
+        )
+
+    resp = client.post(
+        f"/ensembles/{ensemble_id}/records/query",
+        json=dict(
+            names=["coeffs", "FOPR"], realization_indices=[1, 3], labels=["a", "c"]
+        ),
+        headers={"accept": mimetype},
+    )
+    if mimetype == "application/json":
+        data = resp.json()
+        assert data["FOPR"]["realizations"] == [1, 3]
+        assert data["FOPR"]["labels"] == ["a", "c"]
+        assert_array_equal(data["FOPR"]["data"], fopr[[1, 3]][:, [0, 2]])
+        assert data["coeffs"]["realizations"] == [1, 3]
+        assert data["coeffs"]["data"] == [[], []]
+    elif mimetype == "application/x-npz":
+        npz = np.load(io.BytesIO(resp.content))
+        assert_array_equal(npz["FOPR"], fopr[[1, 3]][:, [0, 2]])
+        assert_array_equal(npz["FOPR.realizations"], [1, 3])
+        assert_array_equal(npz["FOPR.labels"], ["a", "c"])
+        assert npz["coeffs"].shape == (2, 0)
+    else:
+        df = pa.ipc.open_stream(resp.content).read_pandas()
+        assert list(df.columns) == ["name", "realization_index", "label", "value"]
+        assert len(df) == 4
+        fopr_df = df[df["name"] == "FOPR"]
+        assert_array_equal(fopr_df["realization_index"], [1, 1, 3, 3])
+        assert_array_equal(fopr_df["label"], ["a", "c", "a", "c"])
+        assert_array_equal(fopr_df["value"], fopr[[1, 3]][:, [0, 2]].reshape(-1))
+
+
+def test_query_records_without_filters(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs"], [], size=3)
+    coeffs = np.random.rand(3, 2)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        json=coeffs.tolist(),
+    )
+    data = client.post(
+        f"/ensembles/{ensemble_id}/records/query", json=dict(names=["coeffs"])
+    ).json()
+    assert data["coeffs"]["realizations"] == [0, 1, 2]
+    assert data["coeffs"]["labels"] == [0, 1]
+    assert_array_equal(data["coeffs"]["data"], coeffs)
+
+    client.post(
+        f"/ensembles/{ensemble_id}/records/query",
+        json=dict(names=["coeffs", "missing"]),
+        check_status_code=status.HTTP_404_NOT_FOUND,
+    )
+
+
+def test_get_record_selection(client, simple_ensemble):
+    ensemble_id = simple_ensemble([], ["FOPR"], size=5)
+    dates = [f"2010-{month:02}-01" for month in range(1, 13)]
+    fopr = np.random.rand(5, len(dates))
+    for real in range(5):
+        client.post(
+            f"/ensembles/{ensemble_id}/records/FOPR/matrix",
+            data=pd.DataFrame(fopr[[real]], columns=dates).to_csv(),
+            headers={"content-type": "text/csv"},
+            params=dict(realization_index=real),
+        )
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FOPR",
+        params=dict(
+            realizations="0,3-4", label_start="2010-03-01", label_end="2010-05-15"
+        ),
+        headers={"accept": "text/csv"},
+    )
+    df = pd.read_csv(io.StringIO(resp.text), index_col=0)
+    assert list(df.index) == [0, 3, 4]
+    assert list(df.columns) == dates[2:5]
+    assert np.allclose(df.values, fopr[[0, 3, 4]][:, 2:5])
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FOPR",
+        params=dict(labels=[dates[0], dates[-1]]),
+    )
+    assert np.allclose(resp.json(), fopr[:, [0, -1]])
+
+    client.get(
+        f"/ensembles/{ensemble_id}/records/FOPR",
+        params=dict(realizations="0,a"),
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+    for realizations in ("3-1", "0-999999999", "0-60000,70000-130000"):
+        client.get(
+            f"/ensembles/{ensemble_id}/records/FOPR",
+            params=dict(realizations=realizations),
+            check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    client.get(
+        f"/ensembles/{ensemble_id}/records/FOPR",
+        params=dict(realizations="1", label="2010-01-01"),
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+
+
+def test_get_ensemble_wide_record_selection(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs"], [], size=4)
+    coeffs = np.random.rand(4, 6)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        json=coeffs.tolist(),
+    )
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/coeffs",
+        params=dict(realizations="1-2", label_start="1", label_end="3"),
+    )
+    assert_array_equal(resp.json(), coeffs[1:3, 1:4])
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/coeffs",
+        params=dict(realizations="0,3", labels=["1", "4"]),
+    )
+    assert_array_equal(resp.json(), coeffs[[0, 3]][:, [1, 4]])
+
+
+def test_append_timesteps(client, simple_ensemble):
+    ensemble_id = simple_ensemble([], ["FOPR"], size=2)
+    dates = [f"2010-{month:02}-01" for month in range(1, 13)]
+    fopr = np.random.rand(2, len(dates))
+    for start, stop in [(0, 4), (4, 5), (5, 12)]:
+        for real in range(2):
+            client.post(
+                f"/ensembles/{ensemble_id}/records/FOPR/append",
+                data=pd.DataFrame(
+                    fopr[[real], start:stop], columns=dates[start:stop]
+                ).to_csv(),
+                headers={"content-type": "text/csv"},
+                params=dict(realization_index=real),
+            )
+
+            # The running statistics are extended with the new columns, also
+            # while the realizations have different numbers of them
+            resp = client.get(
+                f"/ensembles/{ensemble_id}/records/FOPR/statistics",
+                params=dict(running=True),
+                headers={"accept": "text/csv"},
+            )
+            stats = pd.read_csv(io.StringIO(resp.text), index_col=0)
+            assert list(stats.columns) == dates[:stop]
+            if real == 0:
+                mean = np.concatenate(
+                    [fopr[:, :start].mean(axis=0), fopr[0, start:stop]]
+                )
+            else:
+                mean = fopr[:, :stop].mean(axis=0)
+            assert np.allclose(stats.loc["mean"], mean)
+
+        # Everything appended so far is readable
+        resp = client.get(
+            f"/ensembles/{ensemble_id}/records/FOPR",
+            headers={"accept": "text/csv"},
+        )
+        df = pd.read_csv(io.StringIO(resp.text), index_col=0)
+        assert list(df.columns) == dates[:stop]
+        assert np.allclose(df.values, fopr[:, :stop])
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FOPR",
+        params=dict(realizations="1", label_start="2010-06-01"),
+    )
+    assert np.allclose(resp.json(), fopr[1, 5:])
+
+    # Appending existing timesteps is a conflict
+    client.post(
+        f"/ensembles/{ensemble_id}/records/FOPR/append",
+        data=pd.DataFrame(fopr[[0], :1], columns=dates[:1]).to_csv(),
+        headers={"content-type": "text/csv"},
+        params=dict(realization_index=0),
+        check_status_code=status.HTTP_409_CONFLICT,
+    )
+
+
+def test_append_unlabeled(client, simple_ensemble):
+    ensemble_id = simple_ensemble([], ["FOPR"], size=1)
+    for values in [[1.0, 2.0], [3.0], [4.0, 5.0]]:
+        client.post(
+            f"/ensembles/{ensemble_id}/records/FOPR/append",
+            json=values,
+            params=dict(realization_index=0),
+        )
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FOPR",
+        params=dict(realization_index=0),
+    )
+    assert resp.json() == [1.0, 2.0, 3.0, 4.0, 5.0]
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FOPR/statistics",
+        params=dict(running=True),
+    )
+    # The rows are mean, std, min and max
+    assert resp.json()[3] == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+    client.post(
+        f"/ensembles/{ensemble_id}/records/FOPR/append",
+        json=[[1.0], [2.0]],
+        params=dict(realization_index=0),
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+
+
+@pytest.mark.parametrize(
+    "dtype,stored",
+    [
+        (np.uint8, np.int32),
+        (np.uint32, np.int64),
+        (np.uint64, np.float64),
+    ],
+)
+def test_matrix_unsigned_dtypes(client, simple_ensemble, dtype, stored):
+    ensemble_id = simple_ensemble(["FACIES"], [], size=2)
+    info = np.iinfo(dtype)
+    matrix = np.array([[0, 1, info.max // 2 + 1], [2, 3, info.max]], dtype=dtype)
+    stream = io.BytesIO()
+    np.save(stream, matrix)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/FACIES/matrix",
+        data=stream.getvalue(),
+        headers={"content-type": "application/x-numpy"},
+    )
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FACIES",
+        headers={"accept": "application/x-numpy"},
+    )
+    data = np.load(io.BytesIO(resp.content))
+    assert data.dtype == stored
+    assert_array_equal(data, matrix.astype(stored))
+    assert (data >= 0).all()
+
+
+@pytest.mark.parametrize(
+    "dtype", [np.float32, np.int32, np.int64, np.bool_, np.float64]
+)
+def test_matrix_dtypes(client, simple_ensemble, dtype):
+    ensemble_id = simple_ensemble(["FACIES"], [], size=3)
+    matrix = (np.random.rand(3, 5) * 10).astype(dtype)
+    stream = io.BytesIO()
+    np.save(stream, matrix)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/FACIES/matrix",
+        data=stream.getvalue(),
+        headers={"content-type": "application/x-numpy"},
+    )
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FACIES",
+        headers={"accept": "application/x-numpy"},
+    )
+    data = np.load(io.BytesIO(resp.content))
+    assert data.dtype == matrix.dtype
+    assert_array_equal(data, matrix)
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FACIES",
+        params=dict(realization_index=1),
+        headers={"accept": "application/x-numpy"},
+    )
+    assert_array_equal(np.load(io.BytesIO(resp.content)), matrix[[1]])
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FACIES",
+        headers={"accept": "application/x-parquet"},
+    )
+    df = pd.read_parquet(io.BytesIO(resp.content))
+    assert list(df.dtypes) == [matrix.dtype] * 5
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FACIES/statistics",
+        params=dict(quantiles=[]),
+    )
+    assert np.allclose(resp.json()[0], matrix.mean(axis=0))
+
+
+@pytest.mark.parametrize(
+    "mimetype", ["application/x-parquet", "application/vnd.apache.arrow.stream"]
+)
+def test_matrix_dtypes_dataframe(client, simple_ensemble, mimetype):
+    ensemble_id = simple_ensemble([], ["ACTNUM"], size=2)
+    mask = pd.DataFrame([[True, False, True]], columns=["a", "b", "c"])
+    if mimetype == "application/x-parquet":
+        body = mask.to_parquet()
+    else:
+        table = pa.Table.from_pandas(mask)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        body = sink.getvalue().to_pybytes()
+    client.post(
+        f"/ensembles/{ensemble_id}/records/ACTNUM/matrix",
+        data=body,
+        headers={"content-type": mimetype},
+        params=dict(realization_index=1),
+    )
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/ACTNUM",
+        headers={"accept": "application/vnd.apache.arrow.stream"},
+    )
+    df = pa.ipc.open_stream(resp.content).read_pandas()
+    assert list(df.columns) == ["a", "b", "c"]
+    assert list(df.dtypes) == [np.bool_] * 3
+    assert df.values.tolist() == [[True, False, True]]
+
+
+@pytest.mark.parametrize(
+    "params,encode",
+    [
+        (dict(precision="f32"), lambda x: x.astype(np.float32)),
+        (dict(decimals=2), lambda x: np.round(x, 2)),
+        (
+            dict(precision="f32", decimals=3),
+            lambda x: np.round(x, 3).astype(np.float32),
+        ),
+    ],
+)
+def test_reduced_precision(client, simple_ensemble, params, encode):
+    ensemble_id = simple_ensemble(["coeffs"], [], size=3)
+    coeffs = np.random.rand(3, 4)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        json=coeffs.tolist(),
+    )
+    expected = encode(coeffs)
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/coeffs",
+        params=params,
+        headers={"accept": "application/x-numpy"},
+    )
+    data = np.load(io.BytesIO(resp.content))
+    assert data.dtype == expected.dtype
+    assert_array_equal(data, expected)
+
+    resp = client.get(f"/ensembles/{ensemble_id}/records/coeffs", params=params)
+    assert_array_equal(np.array(resp.json(), dtype=expected.dtype), expected)
+    assert len(resp.content) < len(json.dumps(coeffs.tolist()))
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/coeffs",
+        params=params,
+        headers={"accept": "text/csv"},
+    )
+    df = pd.read_csv(io.StringIO(resp.text), index_col=0)
+    assert_array_equal(df.values.astype(expected.dtype), expected)
+
+    # The stored data is unchanged
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/coeffs",
+        headers={"accept": "application/x-numpy"},
+    )
+    assert_array_equal(np.load(io.BytesIO(resp.content)), coeffs)
+
+
+def test_reduced_precision_validation(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs"], [], size=1)
+    client.post(f"/ensembles/{ensemble_id}/records/coeffs/matrix", json=[[1.0]])
+    for params in [dict(precision="f16"), dict(decimals=-1)]:
+        client.get(
+            f"/ensembles/{ensemble_id}/records/coeffs",
+            params=params,
+            check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+
+
+@pytest.mark.parametrize("downsampling", ["lttb", "minmax"])
+def test_downsampled_record(client, simple_ensemble, downsampling):
+    ensemble_id = simple_ensemble([], ["FOPR"], size=3)
+    dates = pd.date_range("2000-01-01", periods=1000).strftime("%Y-%m-%d")
+    fopr = np.random.rand(3, len(dates))
+    fopr[2, 321] = 10.0
+    for real in range(3):
+        client.post(
+            f"/ensembles/{ensemble_id}/records/FOPR/matrix",
+            data=pd.DataFrame(fopr[[real]], columns=dates).to_csv(),
+            headers={"content-type": "text/csv"},
+            params=dict(realization_index=real),
+        )
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FOPR",
+        params=dict(max_points=100, downsampling=downsampling),
+        headers={"accept": "text/csv"},
+    )
+    df = pd.read_csv(io.StringIO(resp.text), index_col=0)
+    assert df.shape[0] == 3 and df.shape[1] <= 100
+    assert df.columns[0] == dates[0] and df.columns[-1] == dates[-1]
+    assert dates[321] in df.columns
+    assert np.allclose(df.values, fopr[:, dates.get_indexer(df.columns)])
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FOPR",
+        params=dict(max_points=5000),
+        headers={"accept": "text/csv"},
+    )
+    assert pd.read_csv(io.StringIO(resp.text), index_col=0).shape == fopr.shape
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/FOPR",
+        params=dict(max_points=3, downsampling=downsampling),
+        headers={"accept": "text/csv"},
+    )
+    df = pd.read_csv(io.StringIO(resp.text), index_col=0)
+    assert list(df.columns) == [dates[0], dates[321], dates[-1]]
+
+
+def test_streamed_json(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs"], [], size=1000)
+    coeffs = np.random.rand(1000, 20)
+    coeffs[3, 4] = np.nan
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        json=coeffs.tolist(),
+    )
+
+    resp = client.get(f"/ensembles/{ensemble_id}/records/coeffs")
+    assert "content-length" not in resp.headers
+    assert_array_equal(json.loads(resp.content), coeffs)
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/coeffs",
+        params=dict(realizations="1,3,998-999"),
+        headers={"accept": "application/x-ndjson"},
+    )
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [line["realization_index"] for line in lines] == [1, 3, 998, 999]
+    assert_array_equal([line["data"] for line in lines], coeffs[[1, 3, 998, 999]])
+
+
+@pytest.mark.parametrize(
+    "content", [b"[1, 2, 3-4]", b"[1.5.7]", b"[tiny]", b'{"a": 1}']
+)
+def test_malformed_json_matrix(client, simple_ensemble, content):
+    ensemble_id = simple_ensemble(["coeffs"], [], size=1)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        content=content,
+        params=dict(realization_index=0),
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
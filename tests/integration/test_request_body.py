@@ -0,0 +1,217 @@
+import asyncio
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from numpy.lib.format import write_array, write_array_header_1_0
+
+from fastapi import status
+
+from ert_storage import exceptions as exc
+from ert_storage.ext.csv_codec import read_csv
+
+
+@pytest.fixture
+def body(client):
+    # The endpoints can only be imported once the database is configured
+    from ert_storage.endpoints import _request_body
+
+    return _request_body
+
+
+class FakeRequest:
+    """The parts of a Starlette request that are used to read its body"""
+
+    def __init__(self, content, chunk_size=7, content_length=True):
+        self.headers = {"content-length": str(len(content))} if content_length else {}
+        self._chunks = [
+            content[i : i + chunk_size] for i in range(0, len(content), chunk_size)
+        ]
+
+    async def stream(self):
+        for chunk in self._chunks:
+            yield chunk
+        yield b""
+
+
+def _npy(array, version=None):
+    stream = io.BytesIO()
+    write_array(stream, array, version=version)
+    return stream.getvalue()
+
+
+def _npy_header(shape):
+    stream = io.BytesIO()
+    write_array_header_1_0(
+        stream, {"descr": "<f8", "fortran_order": False, "shape": shape}
+    )
+    return stream.getvalue()
+
+
+@pytest.mark.parametrize("version", [(1, 0), (2, 0)])
+@pytest.mark.parametrize(
+    "array",
+    [
+        np.random.rand(5, 3),
+        np.asfortranarray(np.random.rand(4, 6)),
+        np.arange(10, dtype=">i4"),
+        np.array([True, False]),
+        np.float32(1.5),
+    ],
+)
+def test_read_numpy(body, version, array):
+    result = asyncio.run(body.read_numpy(FakeRequest(_npy(array, version))))
+    assert result.dtype == array.dtype
+    assert result.shape == array.shape
+    assert np.array_equal(result, array)
+
+
+@pytest.mark.parametrize("length", [0, 5, 20, -1])
+def test_read_numpy_short(body, length):
+    content = _npy(np.random.rand(4, 4))
+    with pytest.raises(ValueError):
+        asyncio.run(body.read_numpy(FakeRequest(content[:length])))
+
+
+@pytest.mark.parametrize("content_length", [True, False])
+def test_read_numpy_forged_shape(body, content_length):
+    # A header that promises more data than the body has is rejected before
+    # the array is allocated
+    content = _npy_header((10**15,)) + bytes(32)
+    with pytest.raises(ValueError):
+        asyncio.run(
+            body.read_numpy(FakeRequest(content, content_length=content_length))
+        )
+
+
+def test_read_numpy_forged_shape_request(client, simple_ensemble, monkeypatch):
+    ensemble_id = simple_ensemble(["coeffs"], [], size=2)
+    content = _npy_header((2, 10**10)) + bytes(32)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        data=content,
+        headers={"content-type": "application/x-numpy"},
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+    monkeypatch.setenv("ERT_STORAGE_MAX_BODY_SIZE", "1000")
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        data=content,
+        headers={"content-type": "application/x-numpy"},
+        check_status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    )
+
+
+def test_parse_body_csv(body):
+    df = pd.DataFrame(np.random.rand(200, 30))
+    request = FakeRequest(df.to_csv().encode(), chunk_size=101)
+    result = asyncio.run(body.parse_body(request, read_csv))
+    assert list(result.index) == list(df.index)
+    assert np.array_equal(result.values, df.values)
+
+    # Bodies can't be read again, so CSV that Arrow can't parse is an error
+    request = FakeRequest(b",a\n0,x\n")
+    with pytest.raises(ValueError):
+        asyncio.run(body.parse_body(request, read_csv))
+
+
+def test_parse_body_arrow(body):
+    table = pa.table({"a": np.random.rand(10000), "b": np.arange(10000)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=100)
+    request = FakeRequest(sink.getvalue().to_pybytes(), chunk_size=64)
+
+    result = asyncio.run(
+        body.parse_body(request, lambda source: pa.ipc.open_stream(source).read_all())
+    )
+    assert result.equals(table)
+
+
+def test_reader_after_eof(body):
+    async def read_twice():
+        return await body.parse_body(
+            FakeRequest(b"abc"), lambda source: (source.read(), source.read())
+        )
+
+    assert asyncio.run(read_twice()) == (b"abc", b"")
+
+
+@pytest.mark.parametrize("content_length", [True, False])
+def test_max_body_size(body, monkeypatch, content_length):
+    monkeypatch.setenv(body.ENV_MAX_BODY_SIZE, "200")
+    asyncio.run(body.read_body(FakeRequest(b"x" * 200, content_length=content_length)))
+
+    content = _npy(np.zeros(20))
+    assert len(content) > 200
+    for read in (body.read_body, body.read_numpy):
+        with pytest.raises(exc.PayloadTooLargeError):
+            asyncio.run(read(FakeRequest(content, content_length=content_length)))
+    with pytest.raises(exc.PayloadTooLargeError):
+        asyncio.run(
+            body.parse_body(
+                FakeRequest(content, content_length=content_length),
+                lambda source: source.read(),
+            )
+        )
+
+
+def test_max_body_size_request(client, simple_ensemble, monkeypatch):
+    ensemble_id = simple_ensemble(["coeffs"], [], size=2)
+    monkeypatch.setenv("ERT_STORAGE_MAX_BODY_SIZE", "1000")
+    for content_type, content in [
+        ("application/x-numpy", _npy(np.random.rand(2, 100))),
+        ("text/csv", pd.DataFrame(np.random.rand(2, 100)).to_csv()),
+        ("application/json", str(np.random.rand(2, 100).tolist())),
+    ]:
+        client.post(
+            f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+            data=content,
+            headers={"content-type": content_type},
+            check_status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        data=_npy(np.random.rand(2, 10)),
+        headers={"content-type": "application/x-numpy"},
+    )
+
+
+def test_empty_csv_request(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs"], [], size=2)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        data=b"",
+        headers={"content-type": "text/csv"},
+        check_status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+
+
+def test_parse_body_does_not_hold_up_workers(body, monkeypatch):
+    from ert_storage.workers import run_in_worker, shutdown_worker_pool
+
+    class SlowRequest(FakeRequest):
+        async def stream(self):
+            async for chunk in super().stream():
+                await asyncio.sleep(0.01)
+                yield chunk
+
+    async def run():
+        content = pd.DataFrame(np.random.rand(10, 3)).to_csv().encode()
+        upload = asyncio.ensure_future(
+            body.parse_body(SlowRequest(content, chunk_size=5), read_csv)
+        )
+        await asyncio.sleep(0.05)
+        # The only worker is free while the upload is being received
+        assert await run_in_worker(sum, [1, 2]) == 3
+        assert not upload.done()
+        return await upload
+
+    monkeypatch.setenv("ERT_STORAGE_WORKERS", "1")
+    shutdown_worker_pool()
+    try:
+        assert asyncio.run(run()).shape == (10, 3)
+    finally:
+        shutdown_worker_pool()
@@ -1,8 +1,11 @@
 import io
+import json
 from fastapi import params, responses
 import numpy as np
 from numpy.testing import assert_array_equal
 import pandas as pd
+import pyarrow as pa
+import pytest
 
 
 def test_get_response_data(client, create_experiment, create_ensemble):
@@ -75,3 +78,96 @@ def test_get_response_data_with_nan(client, create_experiment, create_ensemble):
     )
     assert response_df.shape == (5, 10)
     assert response_df.isnull().values.any() == True
+
+
+def _post_responses(client, ensemble_id, name, matrices, columns):
+    for id_real, matrix in enumerate(matrices):
+        client.post(
+            f"/ensembles/{ensemble_id}/records/{name}/matrix",
+            data=pd.DataFrame([matrix], columns=columns).to_csv().encode(),
+            headers={"content-type": "text/csv"},
+            params={"realization_index": id_real},
+        )
+
+
+@pytest.mark.parametrize(
+    "mimetype",
+    [
+        "text/csv",
+        "application/x-parquet",
+        "application/vnd.apache.arrow.stream",
+        "application/x-numpy",
+    ],
+)
+def test_get_response_data_formats(
+    client, create_experiment, create_ensemble, mimetype
+):
+    experiment_id = create_experiment("test_ensembles")
+    ensemble_id = create_ensemble(experiment_id=experiment_id, responses=["FOPR"])
+    matrices = np.random.rand(4, 6)
+    columns = ["A", "B", "C", "D", "E", "F"]
+    _post_responses(client, ensemble_id, "FOPR", matrices, columns)
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/responses/FOPR/data",
+        headers={"accept": mimetype},
+    )
+    stream = io.BytesIO(resp.content)
+    if mimetype == "application/x-numpy":
+        assert_array_equal(np.load(stream), matrices)
+        return
+    if mimetype == "text/csv":
+        df = pd.read_csv(stream, index_col=0, float_precision="round_trip")
+    elif mimetype == "application/x-parquet":
+        df = pd.read_parquet(stream)
+    else:
+        df = pa.ipc.open_stream(resp.content).read_pandas()
+    assert df.index.name == "realization_index"
+    assert list(df.index) == [0, 1, 2, 3]
+    assert list(df.columns) == columns
+    assert_array_equal(df.values, matrices)
+
+
+def test_get_response_data_2d(client, create_experiment, create_ensemble):
+    experiment_id = create_experiment("test_ensembles")
+    ensemble_id = create_ensemble(experiment_id=experiment_id, responses=["WOPR"])
+    matrices = np.random.rand(3, 2, 4)
+    for id_real, matrix in enumerate(matrices):
+        client.post(
+            f"/ensembles/{ensemble_id}/records/WOPR/matrix",
+            json=matrix.tolist(),
+            params={"realization_index": id_real},
+        )
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/responses/WOPR/data",
+        headers={"accept": "application/x-parquet"},
+    )
+    df = pd.read_parquet(io.BytesIO(resp.content))
+    assert df.shape == (3, 8)
+    assert list(df.columns[:5]) == ["0:0", "0:1", "0:2", "0:3", "1:0"]
+    assert_array_equal(df.values, matrices.reshape(3, -1))
+
+
+def test_get_response_data_ndjson(client, simple_ensemble):
+    ensemble_id = simple_ensemble([], ["FOPR"], size=3)
+    matrices = np.random.rand(3, 4)
+    for real, matrix in enumerate(matrices):
+        client.post(
+            f"/ensembles/{ensemble_id}/records/FOPR/matrix",
+            json=matrix.tolist(),
+            params={"realization_index": real},
+        )
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/responses/FOPR/data",
+        headers={"accept": "application/json"},
+    )
+    assert_array_equal(resp.json(), matrices)
+
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/responses/FOPR/data",
+        headers={"accept": "application/x-ndjson"},
+    )
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [line["realization_index"] for line in lines] == [0, 1, 2]
+    assert_array_equal([line["data"] for line in lines], matrices)
@@ -0,0 +1,145 @@
+import io
+import logging
+import marshal
+
+import numpy as np
+
+
+def test_workers(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs"], [], size=2)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        json=np.random.rand(2, 4).tolist(),
+    )
+    resp = client.get(
+        f"/ensembles/{ensemble_id}/records/coeffs",
+        headers={"accept": "application/x-numpy"},
+    )
+    assert np.load(io.BytesIO(resp.content)).shape == (2, 4)
+
+    stats = client.get("/server/workers").json()
+    assert stats["workers"] >= 1
+    assert stats["running"] == 0
+    tasks = stats["tasks"]
+    assert tasks["ert_storage.ext.json_codec.loads_array"]["count"] >= 1
+    assert tasks["ert_storage.endpoints.records._encode_dataframe"]["count"] >= 1
+
+
+def test_loop_monitor_not_running(client):
+    # The test client doesn't run the startup events
+    client.get("/server/loop", check_status_code=404)
+
+
+def _samples(text):
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_metrics(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs"], [], size=2)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        json=[[1.0, 2.0], [3.0, 4.0]],
+    )
+    client.get(f"/ensembles/{ensemble_id}/records/coeffs")
+    client.get(f"/ensembles/{ensemble_id}/records/missing", check_status_code=404)
+
+    resp = client.get("/metrics")
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = _samples(resp.text)
+
+    route = 'method="GET",route="/ensembles/{ensemble_id}/records/{name}"'
+    assert samples[f'ert_storage_http_requests_total{{{route},status="200"}}'] >= 1
+    assert samples[f'ert_storage_http_requests_total{{{route},status="404"}}'] >= 1
+    assert samples[f"ert_storage_http_request_duration_seconds_count{{{route}}}"] >= 2
+    assert samples[f"ert_storage_http_response_size_bytes_sum{{{route}}}"] > 0
+
+    post = 'method="POST",route="/ensembles/{ensemble_id}/records/{name}/matrix"'
+    assert samples[f"ert_storage_http_request_size_bytes_sum{{{post}}}"] >= 20
+    # Every request to a record reads it from the database
+    assert samples[f"ert_storage_sql_queries_per_request_sum{{{route}}}"] >= 2
+    assert (
+        samples[f'ert_storage_sql_query_duration_seconds_count{{operation="SELECT"}}']
+        > 0
+    )
+    assert samples["ert_storage_worker_pool_workers"] >= 1
+
+
+def test_server_timing(client, simple_ensemble):
+    ensemble_id = simple_ensemble(["coeffs"], [], size=2)
+    resp = client.get(f"/ensembles/{ensemble_id}/parameters")
+    db, total = resp.headers["server-timing"].split(", ")
+    assert db.startswith("db;dur=") and db.endswith(' queries"')
+    assert int(db.split('desc="')[1].split()[0]) > 0
+    assert total.startswith("total;dur=")
+
+
+def test_slow_query_log(client, simple_ensemble, monkeypatch, caplog):
+    ensemble_id = simple_ensemble(["coeffs"], [], size=2)
+    monkeypatch.setenv("ERT_STORAGE_SLOW_QUERY_SECONDS", "0")
+    monkeypatch.setenv("ERT_STORAGE_SLOW_QUERY_EXPLAIN", "1")
+    with caplog.at_level(logging.WARNING, logger="fastapi"):
+        client.get(f"/ensembles/{ensemble_id}/parameters")
+    messages = [r.getMessage() for r in caplog.records]
+    assert any(
+        m.startswith("Slow SQL statement") and "FROM ensemble" in m and "Plan:" in m
+        for m in messages
+    )
+
+    caplog.clear()
+    monkeypatch.delenv("ERT_STORAGE_SLOW_QUERY_SECONDS")
+    with caplog.at_level(logging.WARNING, logger="fastapi"):
+        client.get(f"/ensembles/{ensemble_id}/parameters")
+    assert not caplog.records
+
+
+def test_profiling(client, simple_ensemble, monkeypatch):
+    ensemble_id = simple_ensemble(["coeffs"], [], size=2)
+    client.post(
+        f"/ensembles/{ensemble_id}/records/coeffs/matrix",
+        json=[[1.0, 2.0], [3.0, 4.0]],
+    )
+    url = f"/ensembles/{ensemble_id}/records/coeffs"
+    headers = {"x-ert-profile": "1,memory", "x-ert-profile-token": "secret"}
+
+    # Profiling is disabled unless a token is configured
+    resp = client.get(url, headers=headers)
+    assert "x-ert-profile-id" not in resp.headers
+    client.get("/server/profiles", check_status_code=404)
+
+    monkeypatch.setenv("ERT_STORAGE_PROFILING_TOKEN", "secret")
+    assert "x-ert-profile-id" not in client.get(url).headers
+    client.get(
+        url, headers={**headers, "x-ert-profile-token": "wrong"}, check_status_code=403
+    )
+    client.get("/server/profiles", check_status_code=403)
+
+    resp = client.get(url, headers={**headers, "accept": "application/x-numpy"})
+    assert np.load(io.BytesIO(resp.content)).shape == (2, 2)
+    profile_id = resp.headers["x-ert-profile-id"]
+
+    token = {"x-ert-profile-token": "secret"}
+    profiles = client.get("/server/profiles", headers=token).json()
+    assert profile_id in [p["id"] for p in profiles]
+
+    text = client.get(f"/server/profiles/{profile_id}", headers=token).text
+    assert "function calls" in text
+    assert "Largest allocations" in text
+
+    resp = client.get(f"/server/profiles/{profile_id}?format=pstats", headers=token)
+    stats = marshal.loads(resp.content)
+    # The encoding runs in the worker pool, which is profiled too
+    assert any(name == "_encode_dataframe" for _, _, name in stats)
+
+    resp = client.get(f"/server/profiles/{profile_id}?format=speedscope", headers=token)
+    speedscope = resp.json()
+    profile = speedscope["profiles"][0]
+    assert len(profile["samples"]) == len(profile["weights"]) > 0
+    frames = speedscope["shared"]["frames"]
+    assert all(0 <= i < len(frames) for sample in profile["samples"] for i in sample)
+
+    client.get("/server/profiles/missing", headers=token, check_status_code=404)
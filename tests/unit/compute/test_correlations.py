@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.testing import assert_array_almost_equal, assert_array_equal
+from ert_storage.compute import calculate_top_correlations
+
+
+@pytest.mark.parametrize("method", ["pearson", "spearman"])
+def test_top_correlations(method):
+    parameters = np.random.rand(30, 6)
+    responses = np.random.rand(30, 9)
+    expected = (
+        pd.concat([pd.DataFrame(parameters), pd.DataFrame(responses)], axis=1)
+        .corr(method=method)
+        .values[:6, 6:]
+    )
+
+    indices, values = calculate_top_correlations(
+        parameters, responses, top_k=3, method=method, chunk_size=4
+    )
+    assert indices.shape == (9, 3)
+    for response in range(9):
+        # Rank correlations can tie, so compare the strengths rather than the
+        # order of the parameters
+        strongest = -np.sort(-np.abs(expected[:, response]))[:3]
+        assert_array_almost_equal(np.abs(values[response]), strongest)
+        assert_array_almost_equal(
+            values[response], expected[indices[response], response]
+        )
+
+
+def test_top_correlations_sign_and_constant_columns():
+    x = np.arange(10, dtype=np.float64)
+    parameters = np.stack([x, -x, np.ones(10)], axis=1)
+    responses = np.stack([2 * x + 1], axis=1)
+
+    indices, values = calculate_top_correlations(parameters, responses, top_k=5)
+    assert indices.shape == (1, 3)
+    assert_array_almost_equal(sorted(values[0, :2]), [-1.0, 1.0])
+    assert indices[0, 2] == 2
+    assert np.isnan(values[0, 2])
+
+
+def test_top_correlations_spearman_tied_values():
+    # Integer-valued samples have tied ranks, which are averaged like pandas
+    rng = np.random.default_rng(28)
+    parameters = rng.integers(0, 4, size=(40, 5)).astype(np.float64)
+    responses = parameters[:, [2]] * 3 + rng.integers(0, 2, size=(40, 1))
+    expected = (
+        pd.concat([pd.DataFrame(parameters), pd.DataFrame(responses)], axis=1)
+        .corr(method="spearman")
+        .values[:5, 5]
+    )
+
+    indices, values = calculate_top_correlations(
+        parameters, responses, top_k=5, method="spearman"
+    )
+    assert indices[0, 0] == 2
+    assert_array_almost_equal(values[0], expected[indices[0]])
+    assert_array_almost_equal(np.abs(values[0]), -np.sort(-np.abs(expected)))
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+from ert_storage.compute import downsample
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_downsample_keeps_extremes(method):
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 50)[np.newaxis, :] * np.array([[1.0], [2.0], [3.0]])
+    y[1, 500] = 100.0
+
+    selected = downsample(x, y, 50, method=method)
+    assert len(selected) <= 50
+    assert selected[0] == 0 and selected[-1] == 999
+    assert np.all(np.diff(selected) > 0)
+    assert 500 in selected
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+@pytest.mark.parametrize("max_points", [3, 4])
+def test_downsample_fewest_points(method, max_points):
+    x = np.arange(100, dtype=np.float64)
+    y = np.random.rand(2, 100)
+    y[1, 40] = -10.0
+    selected = downsample(x, y, max_points, method=method)
+    assert len(selected) <= max_points
+    assert selected[0] == 0 and selected[-1] == 99
+    assert 40 in selected
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_downsample_short_series(method):
+    x = np.arange(10)
+    y = np.random.rand(2, 10)
+    assert_array_equal(downsample(x, y, 10, method=method), np.arange(10))
+
+
+def test_downsample_lttb_matches_single_series():
+    # A straight line with a single peak: LTTB keeps the end points and peak
+    x = np.arange(9, dtype=np.float64)
+    y = np.zeros((1, 9))
+    y[0, 4] = 1.0
+    assert_array_equal(downsample(x, y, 3), [0, 4, 8])
+
+
+def test_downsample_with_nan():
+    x = np.arange(100)
+    y = np.random.rand(2, 100)
+    y[0, :50] = np.nan
+    y[:, 60:70] = np.nan
+    selected = downsample(x, y, 20)
+    assert len(selected) <= 20
+    assert selected[0] == 0 and selected[-1] == 99
+
+    # Points after the gap are chosen by their values, not the first of each
+    # bucket
+    y = np.zeros((1, 100))
+    y[0, 10:20] = np.nan
+    y[0, 50] = 1.0
+    assert 50 in downsample(x, y, 20)
+
+
+def test_downsample_invalid():
+    with pytest.raises(ValueError):
+        downsample(np.arange(10), np.zeros((1, 10)), 2)
+    with pytest.raises(ValueError):
+        downsample(np.arange(10), np.zeros((1, 10)), 5, method="average")
+    with pytest.raises(ValueError):
+        downsample(np.arange(9), np.zeros((1, 10)), 5)
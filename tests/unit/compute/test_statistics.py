@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_array_almost_equal, assert_array_equal
+from ert_storage.compute import RunningStatistics, calculate_statistics
+
+
+def test_running_statistics_matches_numpy():
+    matrix = np.random.rand(25, 6)
+
+    running = RunningStatistics(6)
+    for chunk in np.array_split(matrix, 4):
+        running.update(chunk)
+
+    assert_array_equal(running.count, [25] * 6)
+    assert_array_almost_equal(running.mean, matrix.mean(axis=0))
+    assert_array_almost_equal(running.std(), matrix.std(axis=0, ddof=1))
+    assert_array_equal(running.min, matrix.min(axis=0))
+    assert_array_equal(running.max, matrix.max(axis=0))
+
+
+def test_running_statistics_ignores_nan():
+    matrix = np.random.rand(10, 3)
+    matrix[::2, 0] = np.nan
+    matrix[:, 2] = np.nan
+
+    running = RunningStatistics(3)
+    running.update(matrix[:3])
+    running.update(matrix[3:])
+
+    assert_array_equal(running.count, [5, 10, 0])
+    assert_array_almost_equal(running.mean[:2], np.nanmean(matrix[:, :2], axis=0))
+    assert_array_almost_equal(
+        running.std()[:2], np.nanstd(matrix[:, :2], axis=0, ddof=1)
+    )
+    assert np.isnan(running.std()[2])
+    assert np.isnan(running.min[2])
+    assert np.isnan(running.max[2])
+
+
+def test_running_statistics_wrong_shape():
+    running = RunningStatistics(3)
+    with pytest.raises(ValueError):
+        running.update(np.zeros((2, 4)))
+
+
+def test_calculate_statistics_quantiles():
+    matrix = np.random.rand(50, 4)
+    df = calculate_statistics(
+        np.array_split(matrix, 7), quantiles=[0.1, 0.5, 0.9], columns=list("ABCD")
+    )
+
+    assert list(df.index) == ["mean", "std", "min", "max", "p10", "p50", "p90"]
+    assert list(df.columns) == list("ABCD")
+    assert_array_almost_equal(df.loc["mean"], matrix.mean(axis=0))
+    assert_array_almost_equal(
+        df.loc[["p10", "p50", "p90"]], np.quantile(matrix, [0.1, 0.5, 0.9], axis=0)
+    )
+
+
+def test_calculate_statistics_no_data():
+    with pytest.raises(ValueError):
+        calculate_statistics([])
@@ -0,0 +1,83 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ert_storage.ext.csv_codec import read_csv, to_csv
+
+
+def _pandas_read_csv(content):
+    return pd.read_csv(io.BytesIO(content), index_col=0, float_precision="round_trip")
+
+
+@pytest.mark.parametrize(
+    "dataframe",
+    [
+        pd.DataFrame(np.random.rand(4, 3), columns=["a", "b", "c"]),
+        pd.DataFrame(
+            [[1 / 3, np.nan], [1e-300, -2.5e10]],
+            index=pd.Index(["real_0", "real,1"], name="realization"),
+            columns=pd.to_datetime(["2010-01-01", "2011-01-01"]),
+        ),
+        pd.DataFrame(np.arange(6).reshape(2, 3), index=[3, 5]),
+        pd.DataFrame(np.zeros((0, 2)), columns=["a", "b"]),
+    ],
+)
+def test_round_trip(dataframe):
+    content = to_csv(dataframe)
+    expected = _pandas_read_csv(dataframe.to_csv().encode())
+    for df in (read_csv(io.BytesIO(content)), _pandas_read_csv(content)):
+        assert list(df.columns) == list(expected.columns)
+        assert list(df.index) == list(expected.index)
+        assert df.index.name == expected.index.name
+        assert np.array_equal(
+            df.values.astype(np.float64), dataframe.values, equal_nan=True
+        )
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b",2010-01-01,2011-01-01\n2010-01-01,1.5,2\n2011-01-01,3,\n",
+        b",a,b\n0,,1\n1,,2\n",
+        b"a\n",
+        b'"",0,"a,b"\r\n1.5,1e-300,-0.1\r\n',
+        b",x,x,y\n0,1,2,3\n",
+    ],
+)
+def test_read_like_pandas(content):
+    df = read_csv(io.BytesIO(content))
+    expected = _pandas_read_csv(content)
+    assert list(df.columns) == list(expected.columns)
+    assert list(df.index) == list(expected.index)
+    assert df.index.dtype == expected.index.dtype
+    assert df.astype(np.float64).equals(expected.astype(np.float64))
+
+
+def test_read_non_numeric():
+    content = b",a,b\nx,text,1\n"
+    assert read_csv(io.BytesIO(content)).equals(_pandas_read_csv(content))
+
+
+def test_read_stream():
+    content = b",a,b\n0,1.5,\n1,-2,1e-300\n"
+    stream = io.BufferedReader(io.BytesIO(content))
+    stream.seekable = lambda: False
+    df = read_csv(stream)
+    assert list(df.index) == [0, 1]
+    assert df.equals(_pandas_read_csv(content).astype(np.float64))
+
+    for content in (b",a,b\nx,text,1\n", b",x,x\n0,1,2\n"):
+        stream = io.BufferedReader(io.BytesIO(content))
+        stream.seekable = lambda: False
+        with pytest.raises(ValueError):
+            read_csv(stream)
+
+
+@pytest.mark.parametrize("seekable", [True, False])
+def test_read_empty(seekable):
+    stream = io.BufferedReader(io.BytesIO(b""))
+    stream.seekable = lambda: seekable
+    with pytest.raises(ValueError):
+        read_csv(stream)
@@ -0,0 +1,103 @@
+import json
+from enum import Enum, IntEnum
+
+import numpy as np
+import pytest
+
+from ert_storage.ext import json_codec
+
+
+class Color(Enum):
+    red = 1
+
+
+class Size(IntEnum):
+    small = 1
+
+
+@pytest.fixture(params=[True, False], ids=["orjson", "stdlib"])
+def codec(request, monkeypatch):
+    if request.param and not json_codec.HAS_ORJSON:
+        pytest.skip("orjson is not installed")
+    monkeypatch.setattr(json_codec, "HAS_ORJSON", request.param)
+    return json_codec
+
+
+def test_dumps_numpy(codec):
+    obj = {
+        "data": np.arange(6, dtype=np.float64).reshape(2, 3),
+        "column": np.arange(6, dtype=np.float64).reshape(2, 3)[:, 1],
+        "realizations": np.array([0, 2], dtype=np.int64),
+        "scalar": np.float32(1.5),
+    }
+    assert json.loads(codec.dumps(obj)) == {
+        "data": [[0.0, 1.0, 2.0], [3.0, 4.0, 5.0]],
+        "column": [1.0, 4.0],
+        "realizations": [0, 2],
+        "scalar": 1.5,
+    }
+
+
+def test_dumps_nonfinite(codec):
+    content = codec.dumps({"data": np.array([1.0, np.nan, np.inf]), "none": None})
+    assert content == b'{"data":[1.0,NaN,Infinity],"none":null}'
+    assert codec.dumps([float("-inf")]) == b"[-Infinity]"
+
+
+def test_dumps_enum_by_name(codec):
+    assert json_codec.JSONEncoder().encode({"color": Color.red}) == '{"color": "red"}'
+    assert codec.dumps({"color": Color.red}) == b'{"color":"red"}'
+    assert codec.dumps([[1.5, {"a": (Color.red,)}]]) == b'[[1.5,{"a":["red"]}]]'
+    assert codec.dumps({"size": Size.small, "data": [1]}) == b'{"size":1,"data":[1]}'
+
+
+def test_loads_nonfinite(codec):
+    assert codec.loads(b'{"a":[1,2]}') == {"a": [1, 2]}
+    values = codec.loads(b"[NaN, Infinity, -Infinity]")
+    assert np.isnan(values[0]) and values[1:] == [float("inf"), float("-inf")]
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "[1, 2, 3.5]",
+        "[[1e3, -2], [3E-2, 4]]",
+        " [[[1], [2]],\n  [[3], [4]]] ",
+        "[[NaN, Infinity], [-Infinity, 0]]",
+        "[[1, null], [3, 4]]",
+        "[]",
+        "[[], []]",
+        "3",
+    ],
+)
+def test_loads_array(codec, content):
+    expected = np.array(json.loads(content.replace("null", "NaN")), dtype=np.float64)
+    array = codec.loads_array(content.encode())
+    assert array.dtype == np.float64
+    assert array.shape == expected.shape
+    assert np.array_equal(array, expected, equal_nan=True)
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        '["a", "b"]',
+        "[[1, 2], [3]]",
+        "[1, 2",
+        "[1 2]",
+        "[1], [2]",
+        "[1, 2, 3-4]",
+        "[1.5.7]",
+        "[tiny]",
+        "[1, 2e]",
+        "[01, 2]",
+        "[+1]",
+        "[.5]",
+        "[nan]",
+        '{"a": 1}',
+        "1e",
+    ],
+)
+def test_loads_array_invalid(codec, content):
+    with pytest.raises(ValueError):
+        codec.loads_array(content.encode())
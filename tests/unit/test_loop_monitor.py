@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+from ert_storage import loop_monitor
+
+
+def blocking_endpoint():
+    time.sleep(0.3)
+
+
+async def app(scope, receive, send):
+    # Yield so that the monitor has ticked before the loop is blocked
+    await asyncio.sleep(0.05)
+    blocking_endpoint()
+
+
+def test_blocking_request(monkeypatch):
+    monkeypatch.setenv(loop_monitor.ENV_INTERVAL, "0.01")
+    monkeypatch.setenv(loop_monitor.ENV_THRESHOLD, "0.1")
+    middleware = loop_monitor.LoopMonitorMiddleware(app)
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/slow",
+        "endpoint": blocking_endpoint,
+    }
+
+    async def run():
+        monitor = loop_monitor.start_loop_monitor()
+        try:
+            await middleware(scope, None, None)
+            await asyncio.sleep(0.05)
+            return monitor.stats()
+        finally:
+            loop_monitor.stop_loop_monitor()
+
+    stats = asyncio.run(run())
+    assert stats["samples"] > 0
+    assert stats["max_lag_seconds"] >= 0.2
+    assert stats["active_requests"] == 0
+    assert stats["blocking_count"] == 1
+    (event,) = stats["blocking_events"]
+    assert event["method"] == "GET" and event["path"] == "/slow"
+    assert event["endpoint"] == "blocking_endpoint"
+    assert event["seconds"] >= 0.2
+    assert any("blocking_endpoint" in frame for frame in event["stack"])
+    assert loop_monitor.get_loop_monitor() is None
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setenv(loop_monitor.ENV_INTERVAL, "0")
+
+    async def run():
+        return loop_monitor.start_loop_monitor()
+
+    assert asyncio.run(run()) is None
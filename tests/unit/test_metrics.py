@@ -0,0 +1,57 @@
+from ert_storage.metrics import Counter, Histogram, Registry
+
+
+def test_render():
+    registry = Registry()
+    counter = registry.register(Counter("requests_total", "Requests", ["route"]))
+    histogram = registry.register(
+        Histogram("duration_seconds", "Duration", ["route"], buckets=[0.1, 1.0])
+    )
+    registry.add_collector(lambda: ["# TYPE pool gauge", "pool 3"])
+
+    counter.inc(route='/a"b')
+    counter.inc(2, route='/a"b')
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, route="/c")
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a\\"b"} 3.0',
+        "# HELP duration_seconds Duration",
+        "# TYPE duration_seconds histogram",
+        'duration_seconds_bucket{route="/c",le="0.1"} 1',
+        'duration_seconds_bucket{route="/c",le="1.0"} 2',
+        'duration_seconds_bucket{route="/c",le="+Inf"} 3',
+        'duration_seconds_count{route="/c"} 3',
+        'duration_seconds_sum{route="/c"} 5.55',
+        "# TYPE pool gauge",
+        "pool 3",
+    ]
+
+
+def test_timer():
+    histogram = Histogram("duration_seconds", "Duration", buckets=[60.0])
+    with histogram.timer():
+        pass
+    assert histogram.samples()[:2] == [
+        'duration_seconds_bucket{le="60.0"} 1',
+        'duration_seconds_bucket{le="+Inf"} 1',
+    ]
+
+
+def test_pool_samples():
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import QueuePool
+
+    from ert_storage.metrics import _pool_samples
+
+    engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=3)
+    with engine.connect():
+        samples = [line for line in _pool_samples(engine) if not line.startswith("#")]
+    assert samples == [
+        "ert_storage_db_pool_size 3",
+        "ert_storage_db_pool_checked_out 1",
+        "ert_storage_db_pool_overflow -2",
+        "ert_storage_db_pool_checked_in 0",
+    ]
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import time
+import tracemalloc
+
+import pytest
+
+from ert_storage import profiling
+from ert_storage.profiling import Profile, _current_profile, run_profiled
+
+
+def _leaf(n):
+    time.sleep(0.001)
+    return n
+
+
+def _branch(n):
+    return sum(_leaf(i) for i in range(n))
+
+
+def test_run_profiled():
+    assert run_profiled(_branch, 3) == 3
+
+    profile = Profile("GET", "/", trace_memory=False)
+    token = _current_profile.set(profile)
+    try:
+        assert run_profiled(_branch, 3) == 3
+    finally:
+        _current_profile.reset(token)
+
+    functions = {name: row for (_, _, name), row in profile.stats.stats.items()}
+    assert functions["_leaf"][1] == 3
+    assert "_branch" in profile.to_text()
+
+
+def test_speedscope():
+    profile = Profile("GET", "/", trace_memory=False)
+    profile.run(_branch, 5)
+    document = json.loads(profile.to_speedscope())
+    frames = [frame["name"] for frame in document["shared"]["frames"]]
+    (sampled,) = document["profiles"]
+    assert sampled["type"] == "sampled"
+    assert sampled["endValue"] == sum(sampled["weights"])
+
+    stacks = [[frames[i] for i in sample] for sample in sampled["samples"]]
+    leaf_stacks = [stack for stack in stacks if "_leaf" in stack]
+    assert leaf_stacks
+    assert all(stack.index("_branch") < stack.index("_leaf") for stack in leaf_stacks)
+
+
+@pytest.mark.parametrize("tracing", [True, False])
+def test_middleware_memory_without_reset_peak(monkeypatch, tracing):
+    # Python 3.8 has no tracemalloc.reset_peak
+    monkeypatch.delattr(tracemalloc, "reset_peak", raising=False)
+    monkeypatch.setenv(profiling.ENV_TOKEN, "secret")
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": bytes(1000)})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [
+            (b"x-ert-profile", b"1,memory"),
+            (b"x-ert-profile-token", b"secret"),
+        ],
+    }
+    if tracing:
+        tracemalloc.start()
+    try:
+        asyncio.run(profiling.ProfilingMiddleware(app)(scope, None, send))
+    finally:
+        if tracing:
+            tracemalloc.stop()
+    headers = dict(messages[0]["headers"])
+    profile = profiling.get_profile(headers[b"x-ert-profile-id"].decode())
+    assert profile.allocations is not None
+    # The peak includes allocations from before the request if tracing was
+    # already on
+    assert (profile.peak_memory is None) == tracing
+    assert "Largest allocations" in profile.to_text()
@@ -0,0 +1,91 @@
+import asyncio
+import contextvars
+import threading
+
+import pytest
+
+from ert_storage.workers import WorkerPool, get_worker_count
+
+
+request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id")
+
+
+def _square(x):
+    return x * x, threading.current_thread().name
+
+
+def _fail():
+    raise KeyError("fail")
+
+
+def _request_id():
+    return request_id.get()
+
+
+def test_run():
+    pool = WorkerPool(2)
+
+    async def run():
+        return await asyncio.gather(*(pool.run(_square, x) for x in range(5)))
+
+    results = asyncio.run(run())
+    assert [value for value, _ in results] == [0, 1, 4, 9, 16]
+    assert all(name.startswith("ert-storage-worker") for _, name in results)
+
+    stats = pool.stats()
+    assert stats["workers"] == 2
+    assert stats["running"] == stats["queued"] == 0
+    task = stats["tasks"][f"{__name__}._square"]
+    assert task["count"] == 5 and task["failures"] == 0
+    assert task["max_run_seconds"] <= task["run_seconds"]
+    pool.shutdown()
+
+
+def test_run_failure():
+    pool = WorkerPool(1)
+    with pytest.raises(KeyError):
+        asyncio.run(pool.run(_fail))
+    assert pool.stats()["tasks"][f"{__name__}._fail"]["failures"] == 1
+    pool.shutdown()
+
+
+def test_run_context():
+    pool = WorkerPool(1)
+
+    async def run():
+        request_id.set("abc")
+        return await pool.run(_request_id)
+
+    assert asyncio.run(run()) == "abc"
+    pool.shutdown()
+
+
+def test_cancelled_before_start():
+    pool = WorkerPool(1)
+    started = threading.Event()
+    release = threading.Event()
+
+    def block():
+        started.set()
+        release.wait()
+
+    async def run():
+        blocking = asyncio.ensure_future(pool.run(block))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        queued = asyncio.ensure_future(pool.run(_square, 2))
+        await asyncio.sleep(0)
+        assert pool.stats()["queued"] == 1
+        queued.cancel()
+        release.set()
+        await blocking
+
+    asyncio.run(run())
+    assert pool.stats()["queued"] == 0
+    pool.shutdown()
+
+
+def test_worker_count(monkeypatch):
+    monkeypatch.setenv("ERT_STORAGE_WORKERS", "3")
+    assert get_worker_count() == 3
+    monkeypatch.delenv("ERT_STORAGE_WORKERS")
+    assert get_worker_count() >= 1